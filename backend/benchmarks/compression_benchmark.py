@@ -0,0 +1,103 @@
+"""Compare on-the-fly compression with precompressed cached bodies.
+
+Usage: python benchmarks/compression_benchmark.py [--products 300] [--reviews 500] [--requests 1000]
+Reports bytes saved per encoding and the CPU each strategy spends to serve
+--requests responses of the same payload. Brotli rows need the optional
+brotli package.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "gsn_benchmark")
+
+from gameshop.compression import (  # noqa: E402
+    ON_THE_FLY_LEVELS, PRECOMPRESS_LEVELS, cached_body, compress, supported_encodings,
+)
+from gameshop.core import encode_json  # noqa: E402
+from gameshop.indexes import product_list_adapter  # noqa: E402
+
+NAMES = ["Netflix Premium", "PUBG UC", "Free Fire Diamonds", "Steam Wallet", "Spotify Premium", "Canva Pro",
+         "ChatGPT Plus", "Valorant Points", "Xbox Game Pass", "Discord Nitro", "YouTube Premium", "Prime Video"]
+WORDS = "instant delivery official top up account region nepal months screen plan gift card code".split()
+
+
+def make_products(count):
+    products = []
+    for i in range(count):
+        name = f"{random.choice(NAMES)} {i}"
+        products.append({
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "slug": f"product-{i}",
+            "description": "".join(f"<p>{' '.join(random.choices(WORDS, k=12))}</p>" for _ in range(4)),
+            "image_url": f"/api/uploads/{uuid.uuid4()}.webp",
+            "category_id": f"cat-{i % 12}",
+            "variations": [
+                {"id": str(uuid.uuid4()), "name": f"{n} {unit}", "price": n * 150, "original_price": n * 180}
+                for n, unit in ((1, "Month"), (3, "Months"), (6, "Months"), (12, "Months"))
+            ],
+            "tags": random.sample(WORDS, 2),
+            "sort_order": i,
+            "is_active": True,
+        })
+    return products
+
+
+def make_reviews(count):
+    return [{
+        "id": str(uuid.uuid4()),
+        "reviewer_name": f"Customer {i}",
+        "rating": random.choice([4, 5, 5, 5]),
+        "comment": " ".join(random.choices(WORDS, k=random.randint(8, 30))),
+        "review_date": "2026-01-01T00:00:00+00:00",
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "source": random.choice([None, "trustpilot"]),
+    } for i in range(count)]
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+def report(label, body, requests):
+    print(f"\n{label}: {len(body):,} bytes uncompressed")
+    print(f"{'encoding':<9}{'on-the-fly':>14}{'ms/req':>9}{'precompressed':>15}{'ms once':>9}"
+          f"{'CPU on-the-fly':>16}{'CPU cached':>12}")
+    for encoding in supported_encodings():
+        fly, fly_ms = timed(lambda: compress(body, encoding, ON_THE_FLY_LEVELS[encoding]), 20)
+        pre, pre_ms = timed(lambda: compress(body, encoding, PRECOMPRESS_LEVELS[encoding]), 3)
+        cached = cached_body(body)
+        cached.build_variants()
+        _, lookup_ms = timed(lambda: cached.variant(encoding), 1000)
+        print(f"{encoding:<9}{len(fly):>10,} {100 - len(fly) * 100 / len(body):>2.0f}%{fly_ms:>9.2f}"
+              f"{len(pre):>11,} {100 - len(pre) * 100 / len(body):>2.0f}%{pre_ms:>9.2f}"
+              f"{fly_ms * requests:>13.0f} ms{pre_ms + lookup_ms * requests:>9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=300)
+    parser.add_argument("--reviews", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    random.seed(7)
+    products = make_products(args.products)
+    listing = product_list_adapter.dump_json(product_list_adapter.validate_python(products))
+    report(f"GET /api/products ({args.products} products)", listing, args.requests)
+    report(f"GET /api/reviews ({args.reviews} reviews)", encode_json(make_reviews(args.reviews)), args.requests)
+    print(f"\nCPU columns: total compression time to serve {args.requests} requests of that payload.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Measure import time and memory of the full and storefront-only apps.
+
+Usage: python benchmarks/import_benchmark.py [--runs 5]
+Each run is a fresh interpreter that imports server.py, so nothing is cached
+between runs. No database is needed; the Motor client connects lazily.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import server
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "routes": len(server.app.routes),
+    "lazy_loaded": sorted(m for m in ("httpx", "jwt", "PIL") if m in sys.modules),
+}))
+"""
+
+
+def probe(mode: str) -> dict:
+    env = {**os.environ, "APP_MODE": mode}
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "gsn_benchmark")
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for mode in ("full", "storefront"):
+        results = [probe(mode) for _ in range(args.runs)]
+        seconds = statistics.median(r["seconds"] for r in results) * 1000
+        rss = statistics.median(r["max_rss_mb"] for r in results)
+        last = results[-1]
+        print(f"{mode:<11} import {seconds:7.1f} ms  rss {rss:6.1f} MB  modules {last['modules']:5d}  "
+              f"routes {last['routes']:3d}  loaded {', '.join(last['lazy_loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Time the bulk product import against one-at-a-time creates on a real MongoDB.
+
+Usage: MONGO_URL=mongodb://localhost:27017 python benchmarks/product_import_benchmark.py [--products 5000] [--baseline 500]
+
+Runs in its own database (BENCHMARK_DB_NAME, default gsn_benchmark), whose
+products, summaries and slug counters are dropped before and after. The
+baseline replays what create_product did per product (max sort_order
+lookup, slug counter, insert) for --baseline products and extrapolates.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ["DB_NAME"] = os.environ.get("BENCHMARK_DB_NAME", "gsn_benchmark")
+
+from gameshop.core import client, db  # noqa: E402
+from gameshop.models import Product  # noqa: E402
+from gameshop.product_io import ProductImporter, iter_ndjson_rows  # noqa: E402
+from gameshop.slugs import allocate_slug  # noqa: E402
+
+COLLECTIONS = ("products", "products_summary", "slug_counters")
+
+
+def make_rows(count):
+    return [{
+        "name": f"Game {i % 400} Top Up {i}",
+        "description": "<p>Instant delivery, official top up.</p>" * 4,
+        "image_url": f"/api/uploads/{i}.webp",
+        "category_id": "",
+        "tags": ["topup", f"game-{i % 400}"],
+        "variations": [{"name": f"{n * 60} UC", "price": n * 150} for n in (1, 2, 5, 10)],
+    } for i in range(count)]
+
+
+async def chunks(body: bytes, size: int = 64 * 1024):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+async def reset():
+    for name in COLLECTIONS:
+        await db[name].drop()
+    await db.products.create_index("id")
+    await db.products.create_index("slug", unique=True, partialFilterExpression={"slug": {"$type": "string"}})
+    await db.products_summary.create_index("id", unique=True)
+
+
+async def bulk_import(rows):
+    body = "\n".join(json.dumps(row) for row in rows).encode()
+    started = time.perf_counter()
+    importer = ProductImporter()
+    await importer.start()
+    async for row_number, data, error in iter_ndjson_rows(chunks(body)):
+        await importer.add(row_number, data, error)
+    await importer.flush()
+    written = time.perf_counter() - started
+    report = await importer.finish()
+    return report, written, time.perf_counter() - started
+
+
+async def one_at_a_time(rows):
+    started = time.perf_counter()
+    for row in rows:
+        max_order = await db.products.find_one(sort=[("sort_order", -1)])
+        product = Product(**row, sort_order=(max_order.get("sort_order", 0) + 1) if max_order else 0)
+        product.slug = await allocate_slug("products", product.name)
+        await db.products.insert_one(product.model_dump())
+    return time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--baseline", type=int, default=500)
+    args = parser.parse_args()
+
+    try:
+        await reset()
+        report, written, total = await bulk_import(make_rows(args.products))
+        print(f"bulk import   {args.products} products: written in {written:.2f}s, "
+              f"{total:.2f}s with index refresh ({report['inserted']} inserted, {report['failed']} failed)")
+
+        await reset()
+        seconds = await one_at_a_time(make_rows(args.baseline))
+        print(f"one at a time {args.baseline} products: {seconds:.2f}s, "
+              f"~{seconds / args.baseline * args.products:.1f}s extrapolated to {args.products}")
+    finally:
+        for name in COLLECTIONS:
+            await db[name].drop()
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
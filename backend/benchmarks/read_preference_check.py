@@ -0,0 +1,83 @@
+"""Check per-router read preferences against a replica set.
+
+Usage: MONGO_URL=mongodb://localhost:27017/?replicaSet=rs0 python benchmarks/read_preference_check.py [--writes 200]
+
+A throwaway single-node set works for the routing checks:
+    mongod --replSet rs0 --dbpath /tmp/rs0 --port 27017 &
+    mongosh --eval 'rs.initiate()'
+Use two or more members to see stale secondary reads in the first check.
+
+For each router, prints the configured read preference and which member
+served a query. It then writes documents on the primary and reads each one
+back through the catalog handle twice: directly, where lagging secondaries
+may miss the write, and through cache.fresh_read_db after publishing the
+change as the product routes do, which must always see it.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017/?replicaSet=rs0")
+os.environ.setdefault("DB_NAME", "gsn_benchmark")
+
+from gameshop.cache import fresh_read_db, invalidate  # noqa: E402
+from gameshop.core import client, database_for, db  # noqa: E402
+
+ROUTERS = ["catalog", "content", "orders", "integrations", "admin"]
+
+
+async def served_by(handle) -> str:
+    # isWritablePrimary tells primary and secondary apart for the member that answered
+    hello = await handle.command("hello", read_preference=handle.read_preference)
+    role = "primary" if hello.get("isWritablePrimary") else "secondary"
+    return f"{hello.get('me', '?')} ({role})"
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    hello = await db.command("hello")
+    if "setName" not in hello:
+        raise SystemExit("MONGO_URL does not point at a replica set")
+    print(f"Replica set {hello['setName']}: {', '.join(hello.get('hosts', []))}")
+
+    for name in ROUTERS:
+        handle = database_for(name)
+        print(f"{name:<13} {handle.read_preference.mongos_mode:<20} served by {await served_by(handle)}")
+
+    collection = db["read_preference_check"]
+    catalog_db = database_for("catalog")
+    catalog = catalog_db["read_preference_check"]
+    await collection.drop()
+    stale = 0
+    fresh_misses = 0
+    try:
+        for _ in range(args.writes):
+            doc_id = str(uuid.uuid4())
+            await collection.insert_one({"id": doc_id})
+            if await catalog.find_one({"id": doc_id}) is None:
+                stale += 1
+
+            doc_id = str(uuid.uuid4())
+            await collection.insert_one({"id": doc_id})
+            await invalidate("read_preference_check")
+            if await fresh_read_db("read_preference_check", catalog_db)["read_preference_check"].find_one({"id": doc_id}) is None:
+                fresh_misses += 1
+    finally:
+        await collection.drop()
+
+    print(f"Read right after write via catalog handle: {stale}/{args.writes} missed (allowed, bounded staleness)")
+    print(f"Same through fresh_read_db after the invalidation: {fresh_misses}/{args.writes} missed (must be 0)")
+    client.close()
+    if fresh_misses:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""Benchmark the in-memory product search index against a MongoDB $text index.
+
+Usage: python benchmarks/search_benchmark.py [--products 10000] [--mongo]
+The --mongo baseline needs MONGO_URL and DB_NAME; it uses a scratch collection.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "gsn_benchmark")
+
+from gameshop.core import db  # noqa: E402
+from gameshop.indexes import ProductSearchIndex  # noqa: E402
+
+WORDS = ["netflix", "spotify", "pubg", "uc", "free", "fire", "diamonds", "steam", "wallet", "gift", "card",
+         "youtube", "premium", "canva", "pro", "chatgpt", "plus", "valorant", "points", "xbox", "game", "pass",
+         "playstation", "plus", "discord", "nitro", "apple", "music", "prime", "video", "windows", "office"]
+FILLER = ["".join(random.choices("abcdefghijklmnopqrstuvwxyz", k=random.randint(4, 9))) for _ in range(5000)]
+QUERIES = ["netflix", "pubg uc", "steam wal", "gift card", "prem", "valorant points", "disc", "xbox game pass"]
+
+def make_products(count):
+    products = []
+    for i in range(count):
+        name = " ".join(random.sample(WORDS, 2) + random.sample(FILLER, 2)).title()
+        products.append({
+            "id": str(uuid.uuid4()),
+            "name": f"{name} {i}",
+            "slug": f"product-{i}",
+            "description": " ".join(random.choices(WORDS, k=3) + random.choices(FILLER, k=30)),
+            "tags": random.sample(WORDS, 1),
+            "category_id": f"cat-{i % 12}",
+            "is_active": True,
+            "sort_order": i,
+        })
+    return products
+
+def time_calls(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            started = time.perf_counter()
+            fn(query)
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples)
+
+async def mongo_baseline(products, rounds):
+    collection = db["search_benchmark_products"]
+    await collection.drop()
+    await collection.insert_many([dict(p) for p in products])
+    await collection.create_index([("name", "text"), ("description", "text"), ("tags", "text")])
+    samples = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            started = time.perf_counter()
+            await collection.find({"$text": {"$search": query}}, {"score": {"$meta": "textScore"}, "_id": 0}) \
+                .sort([("score", {"$meta": "textScore"})]).limit(20).to_list(20)
+            samples.append((time.perf_counter() - started) * 1000)
+    await collection.drop()
+    return statistics.median(samples), max(samples)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--mongo", action="store_true")
+    args = parser.parse_args()
+
+    products = make_products(args.products)
+    index = ProductSearchIndex()
+    started = time.perf_counter()
+    index.build(products)
+    print(f"build: {(time.perf_counter() - started) * 1000:.1f} ms for {args.products} products")
+
+    median, worst = time_calls(lambda q: index.search(q), args.rounds)
+    print(f"inverted index: median {median:.3f} ms, max {worst:.3f} ms")
+
+    if args.mongo:
+        median, worst = asyncio.run(mongo_baseline(products, args.rounds))
+        print(f"mongo $text:    median {median:.3f} ms, max {worst:.3f} ms")
+
+if __name__ == "__main__":
+    main()
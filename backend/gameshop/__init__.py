@@ -0,0 +1 @@
+"""GameShop Nepal API: shared services in the package root, HTTP routes in routers/."""
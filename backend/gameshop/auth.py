@@ -0,0 +1,82 @@
+"""Admin authentication."""
+from fastapi import HTTPException, Depends, Query
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import os
+from typing import Optional
+from datetime import datetime, timezone, timedelta
+import hashlib
+import secrets
+
+# JWT Config
+JWT_SECRET = os.environ.get('JWT_SECRET', secrets.token_hex(32))
+JWT_ALGORITHM = "HS256"
+JWT_EXPIRATION_HOURS = 24
+# Stream tokens travel in URLs, which end up in access logs, so they only open the order stream and expire quickly
+STREAM_TOKEN_SCOPE = "orders_stream"
+STREAM_TOKEN_EXPIRATION_SECONDS = 300
+
+security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# ==================== HELPERS ====================
+
+def hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+# jwt is imported on first use so the storefront app, which never checks a token, skips it
+def create_token(user_id: str) -> str:
+    import jwt
+
+    payload = {
+        "user_id": user_id,
+        "exp": datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+def create_stream_token(user_id: str) -> str:
+    import jwt
+
+    payload = {
+        "user_id": user_id,
+        "scope": STREAM_TOKEN_SCOPE,
+        "exp": datetime.now(timezone.utc) + timedelta(seconds=STREAM_TOKEN_EXPIRATION_SECONDS)
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+# ==================== ADMIN CREDENTIALS FROM ENV ====================
+ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "gsnadmin")
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "gsnadmin")
+
+def verify_token(token: str, scope: Optional[str] = None) -> dict:
+    """Admin user for a token; scope selects a scoped token, which is only valid where that scope is asked for"""
+    import jwt
+
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        if payload.get("scope") != scope:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        user_id = payload.get("user_id")
+        if user_id == "admin-fixed":
+            return {
+                "id": "admin-fixed",
+                "email": ADMIN_USERNAME,
+                "name": "Admin",
+                "is_admin": True
+            }
+        raise HTTPException(status_code=401, detail="Invalid user")
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return verify_token(credentials.credentials)
+
+async def get_stream_user(token: Optional[str] = Query(None),
+                          credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    """Like get_current_user, but also accepts a stream token in ?token= since EventSource cannot send headers"""
+    if credentials:
+        return verify_token(credentials.credentials)
+    if token:
+        return verify_token(token, scope=STREAM_TOKEN_SCOPE)
+    raise HTTPException(status_code=403, detail="Not authenticated")
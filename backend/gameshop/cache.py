@@ -0,0 +1,400 @@
+"""Cross-worker cache invalidation, config snapshots and request coalescing."""
+from abc import ABC, abstractmethod
+import os
+from pathlib import Path
+from typing import List, Optional, Dict, Callable, Awaitable, Mapping
+import uuid
+from datetime import datetime, timezone
+import asyncio
+import time
+from types import MappingProxyType
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from collections import OrderedDict
+
+from .compression import cached_body
+from .core import MAX_STALENESS_SECONDS, ROOT_DIR, db, encode_json, logger
+from .scheduler import scheduler
+from .snapshots import SnapshotBuilder, SnapshotWorker
+
+# ==================== CACHE INVALIDATION ====================
+# Every worker keeps a version counter per collection. Writes bump the version
+# locally and broadcast it so that other workers (uvicorn/gunicorn processes)
+# can drop their in-memory copies instead of serving stale data.
+#
+# Listeners reload whole collections, so remote changes are coalesced: a burst
+# of events for one collection (a bulk import writes thousands) marks it
+# dirty, and a single reload task per collection runs the listeners once after
+# CACHE_BUS_DEBOUNCE_SECONDS, then again only if more events came in meanwhile.
+#
+# Prices, promo codes and config are cached with no TTL, so a bus that reaches
+# the other workers is the default; "local" is for a single worker process.
+
+CACHE_BUS_BACKEND = os.environ.get("CACHE_BUS_BACKEND", "events")
+CACHE_BUS_DEBOUNCE_SECONDS = float(os.environ.get("CACHE_BUS_DEBOUNCE_SECONDS", "0.2"))
+CACHE_EVENTS_COLLECTION = "cache_events"
+CACHE_EVENTS_SIZE_BYTES = 1024 * 1024
+
+class InvalidationBus(ABC):
+    """Base bus: tracks collection versions and reloads listeners on remote changes"""
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self.versions: Dict[str, int] = {}
+        # Monotonic time of the latest local or remote change per collection
+        self.changed_at: Dict[str, float] = {}
+        self.watched = set()
+        # Per collection, a position in the change history this worker's caches already reflect
+        self.applied: Dict[str, object] = {}
+        self._listeners: List[tuple] = []
+        self._dirty = set()
+        self._reloads: Dict[str, asyncio.Task] = {}
+
+    def version(self, collection: str) -> int:
+        return self.versions.get(collection, 0)
+
+    def changed_within(self, collection: str, seconds: float) -> bool:
+        changed_at = self.changed_at.get(collection)
+        return changed_at is not None and time.monotonic() - changed_at < seconds
+
+    def subscribe(self, listener: Callable[[str], Awaitable[None]], *collections: str):
+        """Register an async callback fired when another worker changes one of collections"""
+        self._listeners.append((listener, set(collections)))
+        self.watched.update(collections)
+
+    async def checkpoint(self):
+        """Position that a read started now is guaranteed to see, or None where the backend has none"""
+        return None
+
+    def mark_applied(self, collection: str, position):
+        if position is not None and (self.applied.get(collection) is None or position > self.applied[collection]):
+            self.applied[collection] = position
+
+    async def publish(self, collection: str, applied_through=None):
+        """Bump the local version and broadcast the change to the other workers.
+
+        applied_through is a checkpoint taken before the caller reloaded the
+        whole collection; this worker then skips change events up to it.
+        """
+        self.versions[collection] = self.version(collection) + 1
+        self.changed_at[collection] = time.monotonic()
+        self.mark_applied(collection, applied_through)
+        await self._broadcast(collection)
+
+    async def _receive(self, collection: str, position=None):
+        self.changed_at[collection] = time.monotonic()
+        applied = self.applied.get(collection)
+        if position is not None and applied is not None and position <= applied:
+            return
+        self.versions[collection] = self.version(collection) + 1
+        if collection not in self.watched:
+            return
+        self._dirty.add(collection)
+        if collection not in self._reloads:
+            self._reloads[collection] = asyncio.create_task(self._reload(collection))
+
+    async def _reload(self, collection: str):
+        try:
+            while collection in self._dirty:
+                await asyncio.sleep(CACHE_BUS_DEBOUNCE_SECONDS)
+                self._dirty.discard(collection)
+                position = await self.checkpoint()
+                for listener, collections in self._listeners:
+                    if collection in collections:
+                        try:
+                            await listener(collection)
+                        except Exception as e:
+                            logger.error(f"Cache listener failed for {collection}: {e}")
+                self.mark_applied(collection, position)
+        finally:
+            self._reloads.pop(collection, None)
+
+    async def drain(self):
+        """Wait until pending reloads have run"""
+        while self._reloads:
+            await asyncio.gather(*list(self._reloads.values()), return_exceptions=True)
+
+    @abstractmethod
+    async def _broadcast(self, collection: str):
+        """Tell the other workers that collection changed"""
+
+    async def prepare(self):
+        """Set up what publishing needs; enough for a process that only publishes"""
+
+    async def start(self):
+        await self.prepare()
+
+    async def stop(self):
+        for task in list(self._reloads.values()):
+            task.cancel()
+
+class LocalInvalidationBus(InvalidationBus):
+    """In-process stand-in; buses sharing a hub behave like separate workers"""
+
+    def __init__(self, hub: Optional[list] = None):
+        super().__init__()
+        self.hub = hub if hub is not None else []
+        self.hub.append(self)
+
+    async def _broadcast(self, collection: str):
+        for peer in self.hub:
+            if peer is not self:
+                await peer._receive(collection)
+
+class EventsCollectionInvalidationBus(InvalidationBus):
+    """Broadcasts through a capped collection that every worker tails"""
+
+    def __init__(self, database):
+        super().__init__()
+        self.collection = database[CACHE_EVENTS_COLLECTION]
+        self._database = database
+        self._task = None
+
+    async def _broadcast(self, collection: str):
+        await self.collection.insert_one({
+            "collection": collection,
+            "worker_id": self.worker_id,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
+
+    async def prepare(self):
+        try:
+            await self._database.create_collection(CACHE_EVENTS_COLLECTION, capped=True, size=CACHE_EVENTS_SIZE_BYTES)
+        except CollectionInvalid:
+            pass
+
+    async def start(self):
+        await self.prepare()
+        # A tailable cursor on an empty capped collection dies immediately
+        last = await self.collection.find_one(sort=[("$natural", -1)])
+        if not last:
+            await self._broadcast("__start__")
+            last = await self.collection.find_one(sort=[("$natural", -1)])
+        self._task = asyncio.create_task(self._tail(last["_id"]))
+
+    async def _tail(self, last_id):
+        while True:
+            cursor = self.collection.find({"_id": {"$gt": last_id}}, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                async for event in cursor:
+                    last_id = event["_id"]
+                    if event.get("worker_id") != self.worker_id and event["collection"] != "__start__":
+                        await self._receive(event["collection"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache events cursor lost, retrying: {e}")
+            await asyncio.sleep(1)
+
+    async def stop(self):
+        await super().stop()
+        if self._task:
+            self._task.cancel()
+
+class ChangeStreamInvalidationBus(InvalidationBus):
+    """Relies on MongoDB change streams (replica set required); no explicit broadcast"""
+
+    def __init__(self, database):
+        super().__init__()
+        self._database = database
+        self._task = None
+
+    async def _broadcast(self, collection: str):
+        # The write itself shows up on the change stream of every worker
+        pass
+
+    async def checkpoint(self):
+        # operationTime is the cluster time of the latest write the node has applied;
+        # a reload from the primary that starts afterwards includes everything up to it
+        try:
+            return (await self._database.command("ping")).get("operationTime")
+        except Exception as e:
+            logger.warning(f"Change stream checkpoint failed, events will not be skipped: {e}")
+            return None
+
+    async def start(self):
+        if self.watched:
+            self._task = asyncio.create_task(self._watch())
+
+    async def _watch(self):
+        resume_token = None
+        # Only collections someone caches; writes to orders and the like never reach this worker
+        pipeline = [{"$match": {"ns.coll": {"$in": sorted(self.watched)}}}]
+        while True:
+            try:
+                async with self._database.watch(pipeline, resume_after=resume_token) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        await self._receive(change["ns"]["coll"], change.get("clusterTime"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Change stream interrupted, retrying: {e}")
+            await asyncio.sleep(1)
+
+    async def stop(self):
+        await super().stop()
+        if self._task:
+            self._task.cancel()
+
+def create_invalidation_bus(backend: str) -> InvalidationBus:
+    if backend == "events":
+        return EventsCollectionInvalidationBus(db)
+    if backend == "changestream":
+        return ChangeStreamInvalidationBus(db)
+    if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+        raise RuntimeError("CACHE_BUS_BACKEND=local only invalidates its own worker; use events or changestream with WEB_CONCURRENCY > 1")
+    return LocalInvalidationBus()
+
+cache_bus = create_invalidation_bus(CACHE_BUS_BACKEND)
+
+def fresh_read_db(collection: str, read_db):
+    """read_db, or the primary while a write to collection may not have reached the secondaries.
+
+    Secondaries are picked at most MAX_STALENESS_SECONDS behind, so for that
+    long after any worker changed the collection its reads go to the primary
+    and an admin sees their own write.
+    """
+    return db if cache_bus.changed_within(collection, MAX_STALENESS_SECONDS) else read_db
+
+# Static page snapshots are regenerated by the worker that made the change,
+# once it holds the snapshots job lease
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "")
+SNAPSHOT_SHELL = Path(os.environ.get("SNAPSHOT_SHELL", ROOT_DIR.parent / "frontend" / "build" / "index.html"))
+snapshot_builder = SnapshotBuilder(db, Path(SNAPSHOT_DIR), SNAPSHOT_SHELL) if SNAPSHOT_DIR else None
+snapshot_worker = SnapshotWorker(snapshot_builder, scheduler) if snapshot_builder else None
+if snapshot_worker is not None:
+    scheduler.add_job(snapshot_worker.job)
+
+async def invalidate(*collections: str, applied_through=None, ids: Optional[List[str]] = None):
+    """Tell every worker that the given collections changed; see InvalidationBus.publish for applied_through.
+
+    ids, when known, are the changed documents, so snapshots only re-render those.
+    """
+    for collection in collections:
+        try:
+            await cache_bus.publish(collection, applied_through)
+        except Exception as e:
+            logger.error(f"Failed to broadcast invalidation for {collection}: {e}")
+        if snapshot_worker is not None:
+            snapshot_worker.mark(collection, ids)
+
+# ==================== CONFIG STORE ====================
+# site_settings, notification_bar and pages change rarely but are read on
+# almost every page view, so they are served from pre-encoded snapshots.
+
+DEFAULT_SITE_SETTINGS = {
+    "id": "main",
+    "notification_bar_enabled": True,
+    "chat_enabled": True,
+    "service_charge": 0,
+    "tax_percentage": 0,
+    "tax_label": "Tax"
+}
+
+DEFAULT_PAGES = {
+    "about": {"title": "About Us", "content": "<p>Welcome to GameShop Nepal - Your trusted source for digital products since 2021.</p>"},
+    "terms": {"title": "Terms and Conditions", "content": "<p>Terms and conditions content here.</p>"},
+    "faq": {"title": "FAQ", "content": ""}
+}
+
+class ConfigStore:
+    """Immutable in-memory snapshots of the singleton config documents"""
+
+    COLLECTIONS = ("site_settings", "notification_bar", "pages")
+
+    def __init__(self, database):
+        self._db = database
+        self._loaded = False
+        self.settings: Mapping = MappingProxyType(dict(DEFAULT_SITE_SETTINGS))
+        self._settings_body = cached_body(encode_json(DEFAULT_SITE_SETTINGS))
+        self._notification_body = cached_body(encode_json(None))
+        self._page_bodies: Mapping[str, bytes] = MappingProxyType({})
+
+    async def load(self):
+        for collection in self.COLLECTIONS:
+            await self.reload(collection)
+        self._loaded = True
+
+    async def ensure_loaded(self):
+        if not self._loaded:
+            await self.load()
+
+    async def reload(self, collection: str):
+        """Rebuild the snapshot backed by the given collection; other names are ignored"""
+        if collection == "site_settings":
+            settings = await self._db.site_settings.find_one({"id": "main"}, {"_id": 0}) or dict(DEFAULT_SITE_SETTINGS)
+            self.settings = MappingProxyType(settings)
+            self._settings_body = cached_body(encode_json(settings))
+        elif collection == "notification_bar":
+            notification = await self._db.notification_bar.find_one({"is_active": True}, {"_id": 0})
+            self._notification_body = cached_body(encode_json(notification))
+        elif collection == "pages":
+            pages = await self._db.pages.find({}, {"_id": 0}).to_list(100)
+            self._page_bodies = MappingProxyType({p["page_key"]: cached_body(encode_json(p)) for p in pages})
+
+    def settings_body(self) -> bytes:
+        return self._settings_body
+
+    def notification_body(self) -> bytes:
+        return self._notification_body
+
+    def page_body(self, page_key: str) -> bytes:
+        body = self._page_bodies.get(page_key)
+        if body is None:
+            default = DEFAULT_PAGES.get(page_key, {"title": page_key.title(), "content": ""})
+            body = encode_json({"page_key": page_key, **default})
+        return body
+
+config_store = ConfigStore(db)
+cache_bus.subscribe(config_store.reload, *ConfigStore.COLLECTIONS)
+
+# ==================== REQUEST COALESCING ====================
+
+SINGLE_FLIGHT_MAX_TRACKED_KEYS = 1000
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight computation.
+
+    The computation runs in its own task and every caller, the first one
+    included, waits on it through a shield, so a caller that is cancelled
+    (a client disconnecting) leaves the query running for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.metrics: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def _record(self, key: str, shared: bool):
+        stats = self.metrics.get(key)
+        if stats is None:
+            stats = self.metrics[key] = {"calls": 0, "executions": 0, "shared": 0}
+            if len(self.metrics) > SINGLE_FLIGHT_MAX_TRACKED_KEYS:
+                self.metrics.popitem(last=False)
+        stats["calls"] += 1
+        stats["shared" if shared else "executions"] += 1
+
+    def _finished(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the outcome retrieved even when every caller has gone away
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is not None:
+            self._record(key, shared=True)
+        else:
+            self._record(key, shared=False)
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+single_flight = SingleFlight()
+
+def flight_key(route: str, **params) -> str:
+    """Route plus sorted, non-empty parameters so equivalent requests share a key"""
+    normalized = "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
+    return f"{route}?{normalized}"
@@ -0,0 +1,170 @@
+"""Response compression that reuses compressed variants of cached bodies.
+
+Bodies held in the response caches are wrapped in CachedBody, which builds
+its compressed variants at a high level in a worker thread as soon as it is
+created on the event loop; the variants live as long as the cached body does.
+Until they are ready, requests get a cheap on-the-fly compression, so a
+cache rebuild never blocks the loop on brotli 11. Everything else is compressed on the
+fly by CompressionMiddleware at a cheaper level, and only above a size
+threshold. Brotli is used when the optional brotli package is installed.
+"""
+import asyncio
+import gzip
+import os
+from contextvars import ContextVar
+from typing import Dict, Optional, Set
+
+from fastapi.responses import Response
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/css", "text/xml",
+                      "application/xml", "application/javascript", "image/svg+xml")
+# Cached bodies are compressed once, so they get the slow, small settings
+PRECOMPRESS_LEVELS = {"br": 11, "gzip": 9}
+ON_THE_FLY_LEVELS = {"br": 4, "gzip": 6}
+
+accepted_encodings: ContextVar[str] = ContextVar("accepted_encodings", default="")
+# Strong references to running precompression tasks
+_precompressing: Set[asyncio.Task] = set()
+
+def supported_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Best encoding we support from an Accept-Encoding header, brotli first"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    candidates = [(weights.get(e, weights.get("*", 0.0)), -i, e) for i, e in enumerate(supported_encodings())]
+    q, _, encoding = max(candidates)
+    return encoding if q > 0 else None
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+class CachedBody(bytes):
+    """Encoded response body kept in a cache, with its compressed variants"""
+
+    def build_variants(self):
+        """Compress into every supported encoding at the precompress levels; blocking"""
+        variants = self.__dict__.setdefault("variants", {})
+        for encoding in supported_encodings():
+            if encoding not in variants:
+                variants[encoding] = compress(self, encoding, PRECOMPRESS_LEVELS[encoding])
+
+    def precompress(self):
+        """Start build_variants in a worker thread; a no-op outside the event loop or once started"""
+        if "variants" in self.__dict__ or len(self) < COMPRESSION_MIN_BYTES:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.__dict__["variants"] = {}
+        task = loop.create_task(asyncio.to_thread(self.build_variants))
+        _precompressing.add(task)
+        task.add_done_callback(_precompressing.discard)
+
+    def variant(self, encoding: str) -> bytes:
+        body = self.__dict__.get("variants", {}).get(encoding)
+        if body is None:
+            self.precompress()
+            body = compress(self, encoding, ON_THE_FLY_LEVELS[encoding])
+        return body
+
+def cached_body(body: bytes) -> CachedBody:
+    if isinstance(body, CachedBody):
+        return body
+    body = CachedBody(body)
+    body.precompress()
+    return body
+
+def compressed_response(body: bytes, media_type: str = "application/json") -> Response:
+    """Response for body, using a stored compressed variant when body is a CachedBody"""
+    encoding = negotiate(accepted_encodings.get())
+    if isinstance(body, CachedBody) and encoding and len(body) >= COMPRESSION_MIN_BYTES:
+        return Response(content=body.variant(encoding), media_type=media_type,
+                        headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+    # Left to CompressionMiddleware, which compresses it on the fly if it is large enough
+    headers = {"Vary": "Accept-Encoding"} if isinstance(body, CachedBody) else None
+    return Response(content=body, media_type=media_type, headers=headers)
+
+class CompressionMiddleware:
+    """Negotiates Accept-Encoding and compresses large uncompressed single-part responses
+
+    Responses that already carry a Content-Encoding (precompressed cached
+    bodies) and streamed responses (uploads, server-sent events) pass through.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate(accept_encoding)
+        token = accepted_encodings.set(accept_encoding)
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "").split(";")[0].strip()
+                passthrough = (encoding is None or "content-encoding" in headers
+                               or content_type not in COMPRESSIBLE_TYPES)
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            if start_message is None:
+                # Already decided on an earlier body chunk
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            initial, start_message = start_message, None
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                await send(initial)
+                await send(message)
+                passthrough = True
+                return
+            compressed = compress(body, encoding, ON_THE_FLY_LEVELS[encoding])
+            headers = MutableHeaders(raw=initial["headers"])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(initial)
+            await send({**message, "body": compressed})
+
+        try:
+            await self.app(scope, receive, send_compressed)
+        finally:
+            accepted_encodings.reset(token)
@@ -0,0 +1,73 @@
+"""Configuration, database handle and shared response helpers."""
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi.responses import Response
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+import os
+import logging
+from pathlib import Path
+import json
+
+from .compression import compressed_response
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Create uploads directory
+UPLOADS_DIR = ROOT_DIR / "uploads"
+UPLOADS_DIR.mkdir(exist_ok=True)
+
+# MongoDB connection; the client connects lazily, the lifespan warmup pings it
+mongo_url = os.environ['MONGO_URL']
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=int(os.environ.get("MONGO_MAX_POOL_SIZE", "100")),
+    minPoolSize=int(os.environ.get("MONGO_MIN_POOL_SIZE", "10")),
+    maxIdleTimeMS=int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000")),
+    serverSelectionTimeoutMS=int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    connectTimeoutMS=int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+    socketTimeoutMS=int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "30000")),
+    waitQueueTimeoutMS=int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+)
+DB_NAME = os.environ['DB_NAME']
+db = client[DB_NAME]
+
+# Per-router read preferences, overridable with READ_PREFERENCE_<ROUTER>=<mode>.
+# Public catalog/content reads tolerate bounded staleness and can go to
+# secondaries; everything else reads from the primary. Writes always go to
+# the primary whatever the read preference.
+READ_PREFERENCE_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+DEFAULT_READ_PREFERENCES = {"catalog": "secondaryPreferred", "content": "secondaryPreferred"}
+# MongoDB rejects a max staleness below 90 seconds
+MAX_STALENESS_SECONDS = max(90, int(os.environ.get("MONGO_MAX_STALENESS_SECONDS", "90")))
+
+def read_preference_for(router_name: str):
+    mode = os.environ.get(f"READ_PREFERENCE_{router_name.upper()}", DEFAULT_READ_PREFERENCES.get(router_name, "primary"))
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"Unknown read preference {mode!r} for {router_name}, expected one of {sorted(READ_PREFERENCE_MODES)}")
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCE_MODES[mode](max_staleness=MAX_STALENESS_SECONDS)
+
+def database_for(router_name: str):
+    """Database handle whose reads follow the router's configured read preference"""
+    return client.get_database(DB_NAME, read_preference=read_preference_for(router_name))
+
+# Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("server")
+
+def encode_json(data) -> bytes:
+    return json.dumps(data, separators=(",", ":"), default=str).encode()
+
+def json_bytes_response(body: bytes) -> Response:
+    return compressed_response(body)
@@ -0,0 +1,408 @@
+"""In-memory product indexes and denormalized product summaries."""
+from pydantic import TypeAdapter
+from typing import List, Optional, Dict
+import re
+import math
+import bisect
+import heapq
+from array import array
+from pymongo import ReplaceOne
+
+from .cache import cache_bus, invalidate
+from .compression import CachedBody, cached_body
+from .core import db, logger
+from .models import Product, UNCATEGORIZED_ID
+
+# ==================== PRODUCT INDEXES ====================
+# In-memory structures derived from the products collection. Each index
+# exposes build(products), upsert(product) and remove(product_id); writes
+# refresh a single product and other workers rebuild on a cache bus bump.
+
+SEARCH_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+SEARCH_FIELD_WEIGHTS = {"name": 3.0, "tags": 2.0, "description": 1.0}
+SEARCH_MAX_PREFIX_EXPANSIONS = 50
+
+def tokenize(text: str) -> List[str]:
+    return SEARCH_TOKEN_RE.findall(text.lower()) if text else []
+
+class ProductSearchIndex:
+    """Inverted index over product name, description and tags"""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._docs: Dict[str, dict] = {}
+        self._meta: Dict[str, tuple] = {}
+        self._sorted_terms: List[str] = []
+        self._terms_dirty = False
+
+    def build(self, products: List[dict]):
+        self._postings = {}
+        self._doc_terms = {}
+        self._docs = {}
+        self._meta = {}
+        for product in products:
+            self._add(product)
+        self._terms_dirty = True
+
+    def upsert(self, product: dict):
+        self.remove(product["id"])
+        self._add(product)
+        self._terms_dirty = True
+
+    def remove(self, product_id: str):
+        for term in self._doc_terms.pop(product_id, []):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._terms_dirty = True
+        self._docs.pop(product_id, None)
+        self._meta.pop(product_id, None)
+
+    def _add(self, product: dict):
+        weights: Dict[str, float] = {}
+        fields = {
+            "name": product.get("name", ""),
+            "tags": " ".join(product.get("tags") or []),
+            "description": product.get("description", "")
+        }
+        for field, text in fields.items():
+            for term in tokenize(text):
+                weights[term] = weights.get(term, 0) + SEARCH_FIELD_WEIGHTS[field]
+        for term, weight in weights.items():
+            self._postings.setdefault(term, {})[product["id"]] = weight
+        self._doc_terms[product["id"]] = list(weights)
+        self._docs[product["id"]] = product
+        self._meta[product["id"]] = (product.get("category_id", ""), product.get("is_active", True))
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        if self._terms_dirty:
+            self._sorted_terms = sorted(self._postings)
+            self._terms_dirty = False
+        start = bisect.bisect_left(self._sorted_terms, prefix)
+        terms = []
+        for term in self._sorted_terms[start:start + SEARCH_MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query: str, category_id: Optional[str] = None, active_only: bool = True, limit: int = 20):
+        """Rank products matching every query term; the last term also matches as a prefix"""
+        terms = tokenize(query)
+        if not terms:
+            return [], {}
+        total_docs = max(len(self._docs), 1)
+        groups = []
+        for position, term in enumerate(terms):
+            candidates = [term]
+            if position == len(terms) - 1:
+                candidates = self._expand_prefix(term) or [term]
+            group = []
+            for candidate in candidates:
+                postings = self._postings.get(candidate)
+                if postings:
+                    # Exact hits outrank prefix-only hits
+                    factor = math.log(1 + total_docs / len(postings)) * (1.0 if candidate == term else 0.5)
+                    group.append((postings, factor))
+            if not group:
+                return [], {}
+            groups.append(group)
+
+        # Start from the rarest term so later terms only probe surviving candidates
+        groups.sort(key=lambda g: sum(len(postings) for postings, _ in g))
+        scores: Dict[str, float] = {}
+        for postings, factor in groups[0]:
+            for product_id, weight in postings.items():
+                score = weight * factor
+                if score > scores.get(product_id, 0):
+                    scores[product_id] = score
+        for group in groups[1:]:
+            narrowed = {}
+            for product_id, score in scores.items():
+                best = 0
+                for postings, factor in group:
+                    weight = postings.get(product_id)
+                    if weight and weight * factor > best:
+                        best = weight * factor
+                if best:
+                    narrowed[product_id] = score + best
+            scores = narrowed
+            if not scores:
+                return [], {}
+
+        facets: Dict[str, int] = {}
+        matches = {}
+        meta = self._meta
+        for product_id, score in scores.items():
+            product_category, is_active = meta[product_id]
+            if active_only and not is_active:
+                continue
+            facets[product_category] = facets.get(product_category, 0) + 1
+            if category_id and product_category != category_id:
+                continue
+            matches[product_id] = score
+        top = heapq.nlargest(limit, matches, key=matches.__getitem__)
+        return [self._docs[product_id] for product_id in top], facets
+
+class VariationPriceTable:
+    """Flat, array-backed index of variation id -> (product id, price, original price, flags)"""
+
+    SOLD_OUT = 1
+    ACTIVE = 2
+
+    def __init__(self):
+        self.build([])
+
+    def build(self, products: List[dict]):
+        self._slots: Dict[str, int] = {}
+        self._by_product: Dict[str, List[int]] = {}
+        self._free: List[int] = []
+        self._variation_ids: List[Optional[str]] = []
+        self._product_ids: List[Optional[str]] = []
+        self._names: List[Optional[tuple]] = []
+        self._prices = array("d")
+        self._original_prices = array("d")
+        self._flags = array("B")
+        for product in products:
+            self._add(product)
+
+    def upsert(self, product: dict):
+        self.remove(product["id"])
+        self._add(product)
+
+    def remove(self, product_id: str):
+        for slot in self._by_product.pop(product_id, []):
+            self._slots.pop(self._variation_ids[slot], None)
+            self._variation_ids[slot] = None
+            self._product_ids[slot] = None
+            self._names[slot] = None
+            self._free.append(slot)
+
+    def _add(self, product: dict):
+        flags = (self.SOLD_OUT if product.get("is_sold_out", False) else 0) | (self.ACTIVE if product.get("is_active", True) else 0)
+        slots = []
+        for variation in product.get("variations") or []:
+            original_price = variation.get("original_price")
+            values = (
+                variation["id"],
+                product["id"],
+                (product.get("name", ""), variation.get("name", "")),
+                float(variation.get("price", 0)),
+                float(original_price) if original_price is not None else math.nan,
+                flags
+            )
+            if self._free:
+                slot = self._free.pop()
+                (self._variation_ids[slot], self._product_ids[slot], self._names[slot],
+                 self._prices[slot], self._original_prices[slot], self._flags[slot]) = values
+            else:
+                slot = len(self._variation_ids)
+                self._variation_ids.append(values[0])
+                self._product_ids.append(values[1])
+                self._names.append(values[2])
+                self._prices.append(values[3])
+                self._original_prices.append(values[4])
+                self._flags.append(values[5])
+            self._slots[variation["id"]] = slot
+            slots.append(slot)
+        self._by_product[product["id"]] = slots
+
+    def _entry(self, slot: int) -> dict:
+        original_price = self._original_prices[slot]
+        product_name, variation_name = self._names[slot]
+        return {
+            "variation_id": self._variation_ids[slot],
+            "product_id": self._product_ids[slot],
+            "product_name": product_name,
+            "variation_name": variation_name,
+            "price": self._prices[slot],
+            "original_price": None if math.isnan(original_price) else original_price,
+            "is_sold_out": bool(self._flags[slot] & self.SOLD_OUT),
+            "is_active": bool(self._flags[slot] & self.ACTIVE)
+        }
+
+    def get(self, variation_id: str) -> Optional[dict]:
+        slot = self._slots.get(variation_id)
+        return None if slot is None else self._entry(slot)
+
+    def get_many(self, variation_ids: List[str]) -> Dict[str, Optional[dict]]:
+        """Resolve a batch of ids in one pass; unknown ids map to None"""
+        slots = self._slots
+        return {vid: (self._entry(slots[vid]) if vid in slots else None) for vid in variation_ids}
+
+product_list_adapter = TypeAdapter(List[Product])
+
+EMPTY_LISTING = CachedBody(b"[]")
+
+class CatalogView:
+    """Products grouped by category in display order, with per-category counts.
+
+    Listings are encoded lazily per (category, active_only, sold_out_last) and
+    a product write only drops the slices of the categories it touches. Only
+    categories that exist, or that some product is in, get a cached slice, so
+    arbitrary ?category_id= values cannot grow the cache.
+    """
+
+    def __init__(self):
+        self._products: Dict[str, dict] = {}
+        self._slices: Dict[tuple, bytes] = {}
+        self._counts: Optional[Dict[str, int]] = None
+        self._known: Optional[set] = None
+        self.categories: List[dict] = []
+
+    def build(self, products: List[dict]):
+        self._products = {p["id"]: p for p in products}
+        self._slices = {}
+        self._counts = None
+        self._known = None
+
+    def upsert(self, product: dict):
+        previous = self._products.get(product["id"])
+        self._products[product["id"]] = product
+        self._invalidate(product.get("category_id"), previous.get("category_id") if previous else None)
+
+    def remove(self, product_id: str):
+        previous = self._products.pop(product_id, None)
+        if previous:
+            self._invalidate(previous.get("category_id"))
+
+    def _invalidate(self, *category_ids):
+        affected = {None, *category_ids}
+        self._slices = {key: body for key, body in self._slices.items() if key[0] not in affected}
+        self._counts = None
+        self._known = None
+
+    def set_categories(self, categories: List[dict]):
+        self.categories = categories
+        self._known = None
+        known = self._known_category_ids()
+        self._slices = {key: body for key, body in self._slices.items() if key[0] is None or key[0] in known}
+
+    def _known_category_ids(self) -> set:
+        if self._known is None:
+            self._known = {c["id"] for c in self.categories} | {p.get("category_id") for p in self._products.values()}
+            self._known.add(UNCATEGORIZED_ID)
+        return self._known
+
+    def listing(self, category_id: Optional[str] = None, active_only: bool = True, sold_out_last: bool = False) -> bytes:
+        key = (category_id, active_only, sold_out_last)
+        body = self._slices.get(key)
+        if body is None and category_id and category_id not in self._known_category_ids():
+            return EMPTY_LISTING
+        if body is None:
+            products = [
+                p for p in self._products.values()
+                if (not category_id or p.get("category_id") == category_id) and (not active_only or p.get("is_active", True))
+            ]
+            # Same order as the old Mongo sort: sort_order asc, then newest first
+            products.sort(key=lambda p: p.get("created_at", ""), reverse=True)
+            if sold_out_last:
+                products.sort(key=lambda p: (p.get("is_sold_out", False), p.get("sort_order", 0)))
+            else:
+                products.sort(key=lambda p: p.get("sort_order", 0))
+            body = cached_body(product_list_adapter.dump_json(product_list_adapter.validate_python(products)))
+            self._slices[key] = body
+        return body
+
+    def category_counts(self) -> Dict[str, int]:
+        """Active product count per category id"""
+        if self._counts is None:
+            counts: Dict[str, int] = {}
+            for product in self._products.values():
+                if product.get("is_active", True):
+                    counts[product.get("category_id", "")] = counts.get(product.get("category_id", ""), 0) + 1
+            self._counts = counts
+        return self._counts
+
+product_search_index = ProductSearchIndex()
+variation_price_table = VariationPriceTable()
+catalog_view = CatalogView()
+product_indexes = [product_search_index, variation_price_table, catalog_view]
+product_indexes_loaded = False
+
+async def load_product_indexes():
+    global product_indexes_loaded
+    products = await db.products.find({}, {"_id": 0}).to_list(None)
+    for index in product_indexes:
+        index.build(products)
+    await load_catalog_categories()
+    product_indexes_loaded = True
+    logger.info(f"Product indexes built for {len(products)} products")
+    return products
+
+async def ensure_product_indexes():
+    if not product_indexes_loaded:
+        await load_product_indexes()
+
+async def load_catalog_categories():
+    catalog_view.set_categories(await db.categories.find({}, {"_id": 0}).to_list(100))
+
+async def refresh_product_indexes(product_id: str):
+    product = await db.products.find_one({"id": product_id}, {"_id": 0})
+    for index in product_indexes:
+        if product:
+            index.upsert(product)
+        else:
+            index.remove(product_id)
+    return product
+
+def summarize_product(product: dict) -> dict:
+    """Card-sized projection of a product with precomputed pricing fields"""
+    variations = product.get("variations") or []
+    prices = [float(v.get("price") or 0) for v in variations]
+    discounts = [
+        (v["original_price"] - v["price"]) / v["original_price"] * 100
+        for v in variations
+        if v.get("original_price") and v["original_price"] > (v.get("price") or 0)
+    ]
+    return {
+        "id": product["id"],
+        "name": product.get("name", ""),
+        "slug": product.get("slug"),
+        "image_url": product.get("image_url", ""),
+        "category_id": product.get("category_id", ""),
+        "tags": product.get("tags") or [],
+        "sort_order": product.get("sort_order", 0),
+        "is_active": product.get("is_active", True),
+        "is_sold_out": product.get("is_sold_out", False),
+        "created_at": product.get("created_at", ""),
+        "min_price": min(prices) if prices else 0,
+        "max_discount_pct": round(max(discounts), 1) if discounts else 0,
+        "variation_count": len(variations)
+    }
+
+async def rebuild_product_summaries(products: List[dict]):
+    operations = [ReplaceOne({"id": p["id"]}, summarize_product(p), upsert=True) for p in products]
+    if operations:
+        await db.products_summary.bulk_write(operations, ordered=False)
+    await db.products_summary.delete_many({"id": {"$nin": [p["id"] for p in products]}})
+
+async def products_changed(product_ids: Optional[List[str]] = None):
+    """Refresh indexes and summaries after a product write, then notify other workers.
+
+    With product_ids only those products are refreshed; without, everything is rebuilt.
+    """
+    applied_through = None
+    if product_ids is None:
+        applied_through = await cache_bus.checkpoint()
+        products = await load_product_indexes()
+        await rebuild_product_summaries(products)
+    else:
+        for product_id in product_ids:
+            product = await refresh_product_indexes(product_id)
+            if product:
+                await db.products_summary.replace_one({"id": product_id}, summarize_product(product), upsert=True)
+            else:
+                await db.products_summary.delete_one({"id": product_id})
+    await invalidate("products", applied_through=applied_through, ids=product_ids)
+
+async def reload_product_indexes_on_change(collection: str):
+    if collection == "products":
+        await load_product_indexes()
+    elif collection == "categories":
+        await load_catalog_categories()
+
+cache_bus.subscribe(reload_product_indexes_on_change, "products", "categories")
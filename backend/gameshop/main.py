@@ -0,0 +1,226 @@
+"""Application factory and startup warmup."""
+from fastapi import FastAPI, APIRouter, status
+from fastapi.responses import Response
+from starlette.middleware.cors import CORSMiddleware
+import os
+from typing import Optional, Dict, Callable, Awaitable
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from .cache import cache_bus, config_store, snapshot_worker
+from .compression import CompressionMiddleware
+from .core import IMPORT_STARTED, client, db, logger
+from .indexes import load_product_indexes, rebuild_product_summaries
+from .order_feed import order_feed
+from .ratelimit import RateLimitMiddleware, rate_limit_backend
+from .scheduler import scheduler
+from .uploads import shutdown_image_pool
+
+# ==================== STARTUP ====================
+
+STARTUP_TARGET_SECONDS = float(os.environ.get("STARTUP_TARGET_SECONDS", "3"))
+STARTUP_PING_RETRY_SECONDS = 2.0
+STARTUP_STEP_RETRY_SECONDS = float(os.environ.get("STARTUP_STEP_RETRY_SECONDS", "15"))
+
+class StartupState:
+    """Warmup progress reported by the health endpoints"""
+
+    def __init__(self):
+        self.ready = False
+        self.steps: Dict[str, float] = {}
+        self.ready_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        # Step name -> error, for steps that failed and have not succeeded on a retry yet
+        self.failed: Dict[str, str] = {}
+        self._retries: Dict[str, Callable[[], Awaitable]] = {}
+
+    @property
+    def healthy(self) -> bool:
+        return self.ready and not self.failed
+
+    async def step(self, name: str, fn: Callable[[], Awaitable]):
+        """Run one warmup step, timing it; a failure is logged and recorded so it can be retried"""
+        started = time.perf_counter()
+        try:
+            result = await fn()
+        except Exception as e:
+            logger.warning(f"Startup step {name} failed: {e}")
+            self.failed[name] = str(e)
+            self._retries[name] = fn
+            return None
+        finally:
+            self.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+        self.failed.pop(name, None)
+        self._retries.pop(name, None)
+        return result
+
+    async def retry_failed(self):
+        """Re-run the failed steps, in their original order, until all of them succeed"""
+        while self.failed:
+            await asyncio.sleep(STARTUP_STEP_RETRY_SECONDS)
+            for name, fn in list(self._retries.items()):
+                await self.step(name, fn)
+            if not self.failed:
+                logger.info(f"Startup steps recovered: {self.steps}")
+
+startup_state = StartupState()
+
+async def ensure_indexes():
+    from .routers.orders import IDEMPOTENCY_TTL_SECONDS
+
+    await db.orders.create_index("id")
+    await db.orders.create_index([("status", 1), ("created_at", -1)])
+    await db.idempotency_keys.create_index("key", unique=True)
+    await db.idempotency_keys.create_index("created_at", expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS)
+    await db.products.create_index("id")
+    await db.products.create_index("sort_order")
+    await db.faqs.create_index("sort_order")
+    await db.products_summary.create_index("id", unique=True)
+    await db.products_summary.create_index([("is_active", 1), ("sort_order", 1), ("created_at", -1)])
+    await db.review_stats.create_index("id", unique=True)
+    for collection in ("products", "categories", "blog_posts"):
+        try:
+            await db[collection].create_index(
+                "slug", unique=True, partialFilterExpression={"slug": {"$type": "string"}}
+            )
+        except Exception as e:
+            logger.error(f"Unique slug index on {collection} not created, run python manage.py dedupe-slugs: {e}")
+
+async def wait_for_database():
+    while True:
+        try:
+            await db.command("ping")
+            startup_state.error = None
+            return
+        except Exception as e:
+            startup_state.error = f"Database unreachable: {e}"
+            logger.warning(f"{startup_state.error}, retrying in {STARTUP_PING_RETRY_SECONDS}s")
+            await asyncio.sleep(STARTUP_PING_RETRY_SECONDS)
+
+async def warm_product_indexes():
+    products = await load_product_indexes()
+    if products and not await db.products_summary.estimated_document_count():
+        await rebuild_product_summaries(products)
+
+async def warm_up(storefront_only: bool):
+    """Connect, ensure indexes and fill caches, then mark the worker ready"""
+    await startup_state.step("ping", wait_for_database)
+    if not storefront_only:
+        await startup_state.step("indexes", ensure_indexes)
+        await startup_state.step("rate_limits", rate_limit_backend.start)
+        await startup_state.step("order_feed", order_feed.start)
+    await startup_state.step("cache_bus", cache_bus.start)
+    await startup_state.step("config", config_store.load)
+    await startup_state.step("catalog", warm_product_indexes)
+    if not storefront_only:
+        from .pricing import promo_code_cache
+        from .routers.content import backfill_blog_rendering, ensure_review_stats
+
+        await startup_state.step("promo_codes", promo_code_cache.reload)
+        await startup_state.step("blog", backfill_blog_rendering)
+        await startup_state.step("review_stats", ensure_review_stats)
+        await startup_state.step("scheduler", scheduler.start)
+        if snapshot_worker is not None:
+            snapshot_worker.start()
+            # Catch up on changes made while workers were down; when several start together
+            # only the one that gets the lease runs it, and unchanged files are skipped
+            await snapshot_worker.run_now("startup")
+
+    startup_state.ready_seconds = round(time.perf_counter() - IMPORT_STARTED, 3)
+    startup_state.ready = True
+    if startup_state.ready_seconds > STARTUP_TARGET_SECONDS:
+        logger.warning(f"Ready {startup_state.ready_seconds}s after import, over the {STARTUP_TARGET_SECONDS}s target: {startup_state.steps}")
+    else:
+        logger.info(f"Ready {startup_state.ready_seconds}s after import: {startup_state.steps}")
+    if startup_state.failed:
+        logger.error(f"Not ready, startup steps failed: {startup_state.failed}")
+        await startup_state.retry_failed()
+
+def lifespan_for(storefront_only: bool):
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Warm up in the background so liveness answers while connections and caches fill
+        warmup = asyncio.create_task(warm_up(storefront_only))
+        yield
+        warmup.cancel()
+        try:
+            await warmup
+        except asyncio.CancelledError:
+            pass
+        await cache_bus.stop()
+        await order_feed.stop()
+        await scheduler.stop()
+        if snapshot_worker is not None:
+            await snapshot_worker.stop()
+        shutdown_image_pool()
+        client.close()
+
+    return lifespan
+
+# ==================== HEALTH ====================
+
+health_router = APIRouter()
+
+@health_router.get("/")
+async def root():
+    return {"message": "GameShop Nepal API"}
+
+@health_router.get("/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+@health_router.get("/health/ready")
+async def health_ready(response: Response):
+    """200 once the database answered and the caches are warm, 503 until then or while a step has failed"""
+    if not startup_state.healthy:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    if not startup_state.ready:
+        state = "starting"
+    else:
+        state = "failed" if startup_state.failed else "ready"
+    return {
+        "status": state,
+        "ready_seconds": startup_state.ready_seconds,
+        "target_seconds": STARTUP_TARGET_SECONDS,
+        "steps": startup_state.steps,
+        "error": startup_state.error,
+        "failed_steps": startup_state.failed,
+    }
+
+# ==================== APP ====================
+
+def create_app(storefront_only: bool = False) -> FastAPI:
+    """Full API, or with storefront_only just the public catalog and content reads"""
+    api_router = APIRouter(prefix="/api")
+    api_router.include_router(health_router)
+    if storefront_only:
+        # Orders, admin and integrations (httpx, jwt, Pillow) are never imported
+        from .routers import catalog, content
+
+        api_router.include_router(catalog.public_router)
+        api_router.include_router(content.public_router)
+    else:
+        from .routers import admin, catalog, content, integrations, orders
+
+        for module in (catalog, content, orders, integrations, admin):
+            api_router.include_router(module.router)
+
+    app = FastAPI(lifespan=lifespan_for(storefront_only))
+    app.include_router(api_router)
+    if not storefront_only:
+        # Innermost, so 429s still get CORS headers
+        app.add_middleware(RateLimitMiddleware)
+    app.add_middleware(CompressionMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return app
+
+def create_storefront_app() -> FastAPI:
+    """Factory for `uvicorn --factory gameshop.main:create_storefront_app`"""
+    return create_app(storefront_only=True)
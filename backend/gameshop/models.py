@@ -0,0 +1,171 @@
+"""Pydantic models shared by the routers."""
+from pydantic import BaseModel, Field, ConfigDict
+from typing import List, Optional
+import uuid
+from datetime import datetime, timezone
+
+# ==================== MODELS ====================
+
+class UserCreate(BaseModel):
+    email: str
+    password: str
+    name: str = "Admin"
+
+class UserLogin(BaseModel):
+    email: str
+    password: str
+
+class User(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    email: str
+    name: str
+    is_admin: bool = True
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+class ProductVariation(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    price: float
+    original_price: Optional[float] = None
+    description: Optional[str] = None
+
+class ProductFormField(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    label: str
+    placeholder: str = ""
+    required: bool = False
+
+class ProductCreate(BaseModel):
+    name: str
+    description: str
+    image_url: str
+    category_id: str
+    variations: List[ProductVariation] = []
+    tags: List[str] = []
+    sort_order: float = 0
+    custom_fields: List[ProductFormField] = []
+    is_active: bool = True
+    is_sold_out: bool = False
+
+class ProductImportRow(ProductCreate):
+    """One imported product; an id that already exists updates that product"""
+    id: Optional[str] = None
+    name: str = Field(min_length=1)
+    slug: Optional[str] = None
+    sort_order: Optional[float] = None
+
+class Product(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    slug: Optional[str] = None
+    description: str
+    image_url: str
+    category_id: str
+    variations: List[ProductVariation] = []
+    tags: List[str] = []
+    sort_order: float = 0
+    custom_fields: List[ProductFormField] = []
+    is_active: bool = True
+    is_sold_out: bool = False
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+class ProductOrderUpdate(BaseModel):
+    product_ids: List[str]
+
+class MoveRequest(BaseModel):
+    """Single move in an ordered list: place the item right after after_id, or first when None"""
+    after_id: Optional[str] = None
+
+class ScheduledJobUpdate(BaseModel):
+    """Admin changes to a scheduled job; schedule is "every 10m" style or a five-field cron expression"""
+    enabled: Optional[bool] = None
+    schedule: Optional[str] = None
+
+class ReviewCreate(BaseModel):
+    reviewer_name: str
+    rating: int = Field(ge=1, le=5)
+    comment: str
+    review_date: Optional[str] = None
+
+class Review(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    reviewer_name: str
+    rating: int
+    comment: str
+    review_date: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    source: Optional[str] = None
+
+class PageContent(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    page_key: str
+    title: str
+    content: str
+    updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+class SocialLinkCreate(BaseModel):
+    platform: str
+    url: str
+    icon: Optional[str] = None
+
+class SocialLink(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    platform: str
+    url: str
+    icon: Optional[str] = None
+
+class CategoryCreate(BaseModel):
+    name: str
+
+class Category(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    slug: str
+
+class CategoryWithCount(Category):
+    product_count: int = 0
+
+# Category id given to products whose category was deleted; a real id so
+# /products?category_id=uncategorized lists them as their own slice
+UNCATEGORIZED_ID = "uncategorized"
+
+class FAQItemCreate(BaseModel):
+    question: str
+    answer: str
+    sort_order: float = 0
+
+class FAQItem(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    question: str
+    answer: str
+    sort_order: float = 0
+
+class FAQReorderRequest(BaseModel):
+    faq_ids: List[str]
+
+# Promo Code Models
+class PromoCodeCreate(BaseModel):
+    code: str
+    discount_type: str = "percentage"  # "percentage" or "fixed"
+    discount_value: float
+    min_order_amount: float = 0
+    max_uses: Optional[int] = None
+    is_active: bool = True
+
+class PromoCode(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    code: str
+    discount_type: str = "percentage"
+    discount_value: float
+    min_order_amount: float = 0
+    max_uses: Optional[int] = None
+    used_count: int = 0
+    is_active: bool = True
+    created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
@@ -0,0 +1,157 @@
+"""Live feed of new and changed orders for the admin dashboard (server-sent events)."""
+import asyncio
+import json
+import os
+import uuid
+from collections import deque
+from typing import AsyncIterator, Deque, List, Optional, Set, Tuple
+
+from .core import db, logger
+
+# ==================== ORDER FEED ====================
+# With ORDER_FEED_BACKEND=changestream every worker watches the orders
+# collection, so an admin connected to any worker sees writes made by all of
+# them; event ids are change stream resume tokens, valid on every worker.
+# The default local feed needs no replica set but only carries the writes of
+# the worker the admin is connected to.
+
+ORDER_FEED_BACKEND = os.environ.get("ORDER_FEED_BACKEND", "local")
+ORDER_FEED_HISTORY = int(os.environ.get("ORDER_FEED_HISTORY", "500"))
+ORDER_FEED_QUEUE_SIZE = 100
+ORDER_FEED_HEARTBEAT_SECONDS = 15
+ORDER_FEED_RETRY_MS = 3000
+
+# (event id, encoded SSE message); None tells a subscriber to resync
+FeedEvent = Optional[Tuple[str, bytes]]
+
+def format_event(event_id: str, event: str, data: dict) -> bytes:
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode()
+
+class OrderFeed:
+    """Fans order events out to subscriber queues and keeps recent ones for Last-Event-ID resumes"""
+
+    def __init__(self, history: int = ORDER_FEED_HISTORY):
+        self.history: Deque[Tuple[str, bytes]] = deque(maxlen=history)
+        self.subscribers: Set[asyncio.Queue] = set()
+
+    def emit(self, event_id: str, operation: str, order: dict):
+        order.pop("_id", None)
+        message = format_event(event_id, "order", {"operation": operation, "order": order})
+        self.history.append((event_id, message))
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait((event_id, message))
+            except asyncio.QueueFull:
+                # Too slow to keep up: end its stream, the browser reconnects and replays from history
+                self.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def replay(self, last_event_id: str) -> Optional[List[bytes]]:
+        """Messages after last_event_id, or None when it is no longer (or never was) in history"""
+        ids = [event_id for event_id, _ in self.history]
+        if last_event_id not in ids:
+            return None
+        return [message for _, message in list(self.history)[ids.index(last_event_id) + 1:]]
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=ORDER_FEED_QUEUE_SIZE)
+        # Subscribe and take the replay together so no event is missed or sent twice
+        self.subscribers.add(queue)
+        missed = self.replay(last_event_id) if last_event_id else []
+        try:
+            yield f"retry: {ORDER_FEED_RETRY_MS}\n\n".encode()
+            if missed is None:
+                # Gap we cannot fill: the dashboard reloads /api/orders
+                yield format_event(self.latest_id(), "reset", {})
+            for message in missed or []:
+                yield message
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), ORDER_FEED_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if item is None:
+                    return
+                yield item[1]
+        finally:
+            self.subscribers.discard(queue)
+
+    def latest_id(self) -> str:
+        return self.history[-1][0] if self.history else ""
+
+    async def publish(self, order_ids: List[str], operation: str = "update"):
+        """Announce writes to these orders; a no-op where the change stream sees them anyway"""
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+class LocalOrderFeed(OrderFeed):
+    """In-process feed: the order routes publish after each write"""
+
+    def __init__(self, database, history: int = ORDER_FEED_HISTORY):
+        super().__init__(history)
+        self._database = database
+        # Ids from another worker or an earlier process must not match ours
+        self.prefix = uuid.uuid4().hex[:8]
+        self.sequence = 0
+
+    async def publish(self, order_ids: List[str], operation: str = "update"):
+        if not order_ids:
+            return
+        try:
+            orders = await self._database.orders.find({"id": {"$in": order_ids}}, {"_id": 0}).to_list(None)
+        except Exception as e:
+            logger.warning(f"Order feed could not load orders {order_ids}: {e}")
+            return
+        for order in orders:
+            self.sequence += 1
+            self.emit(f"{self.prefix}-{self.sequence}", operation, order)
+
+class ChangeStreamOrderFeed(OrderFeed):
+    """Watches the orders collection (replica set required); no explicit publish"""
+
+    def __init__(self, database, history: int = ORDER_FEED_HISTORY):
+        super().__init__(history)
+        self._database = database
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._watch())
+
+    async def _watch(self):
+        resume_token = None
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+        while True:
+            try:
+                async with self._database.orders.watch(
+                    pipeline, full_document="updateLookup", resume_after=resume_token
+                ) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        order = change.get("fullDocument")
+                        if order:
+                            operation = "insert" if change["operationType"] == "insert" else "update"
+                            self.emit(change["_id"]["_data"], operation, order)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Order change stream interrupted, retrying: {e}")
+            await asyncio.sleep(1)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+def create_order_feed(backend: str) -> OrderFeed:
+    if backend == "changestream":
+        return ChangeStreamOrderFeed(db)
+    return LocalOrderFeed(db)
+
+order_feed = create_order_feed(ORDER_FEED_BACKEND)
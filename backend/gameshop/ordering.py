@@ -0,0 +1,99 @@
+"""Gapped sort orders for admin-ordered lists (products, FAQs)."""
+from fastapi import HTTPException
+from typing import List, Optional
+import math
+from pymongo import ReturnDocument, UpdateOne
+
+from .core import db
+
+# ==================== SORT ORDER ====================
+# New items are appended at counter * SORT_ORDER_GAP, the counter being one
+# $inc per create. Moving an item takes the midpoint between its new
+# neighbours, so a move writes one document; the list is renumbered only once
+# repeated moves into the same spot have used up the gap.
+
+SORT_ORDER_GAP = 1024.0
+# About 30 moves into the same spot before that part of the list is renumbered
+SORT_ORDER_MIN_GAP = 2.0 ** -20
+
+def sort_counter_id(collection: str) -> str:
+    return f"{collection}.sort_order"
+
+async def raise_sort_counter(collection: str, sort_order: float):
+    """Make sure positions handed out later come after sort_order"""
+    await db.counters.update_one(
+        {"_id": sort_counter_id(collection)},
+        {"$max": {"seq": math.ceil(sort_order / SORT_ORDER_GAP)}},
+        upsert=True
+    )
+
+async def allocate_sort_orders(collection: str, count: int = 1) -> List[float]:
+    """count positions after every item in collection, from one counter round trip"""
+    if count <= 0:
+        return []
+    counter = await db.counters.find_one_and_update(
+        {"_id": sort_counter_id(collection)}, {"$inc": {"seq": count}}, return_document=ReturnDocument.AFTER
+    )
+    if counter is None:
+        # First allocation: start past positions written before the counter existed
+        last = await db[collection].find_one({}, {"sort_order": 1}, sort=[("sort_order", -1)])
+        await raise_sort_counter(collection, last.get("sort_order", 0) if last else 0)
+        counter = await db.counters.find_one_and_update(
+            {"_id": sort_counter_id(collection)}, {"$inc": {"seq": count}}, return_document=ReturnDocument.AFTER
+        )
+    first = counter["seq"] - count + 1
+    return [(first + i) * SORT_ORDER_GAP for i in range(count)]
+
+async def next_sort_order(collection: str) -> float:
+    return (await allocate_sort_orders(collection))[0]
+
+async def renumber_sort_orders(collection: str, ids: Optional[List[str]] = None):
+    """Space items SORT_ORDER_GAP apart in the order of ids (default: current order) with one bulk write"""
+    if ids is None:
+        items = await db[collection].find({}, {"_id": 0, "id": 1}).sort([("sort_order", 1), ("created_at", -1)]).to_list(None)
+        ids = [item["id"] for item in items]
+    if ids:
+        await db[collection].bulk_write([
+            UpdateOne({"id": item_id}, {"$set": {"sort_order": (index + 1) * SORT_ORDER_GAP}})
+            for index, item_id in enumerate(ids)
+        ], ordered=False)
+    last = await db[collection].find_one({}, {"sort_order": 1}, sort=[("sort_order", -1)])
+    await raise_sort_counter(collection, max(len(ids) * SORT_ORDER_GAP, last.get("sort_order", 0) if last else 0))
+
+async def move_after(collection: str, item_id: str, after_id: Optional[str]) -> float:
+    """Place item_id directly after after_id, or first when after_id is None; returns its new sort order"""
+    items = db[collection]
+    for _ in range(2):
+        item = await items.find_one({"id": item_id}, {"_id": 0, "sort_order": 1})
+        if item is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        if after_id == item_id:
+            return item.get("sort_order", 0)
+
+        low = None
+        others = {"id": {"$ne": item_id}}
+        if after_id:
+            after = await items.find_one({"id": after_id}, {"_id": 0, "sort_order": 1})
+            if after is None:
+                raise HTTPException(status_code=404, detail="Item to move after not found")
+            low = after.get("sort_order", 0)
+            # Items sharing after's position would keep the moved item from landing right behind it
+            if await items.find_one({"sort_order": low, "id": {"$nin": [item_id, after_id]}}, {"_id": 1}):
+                await renumber_sort_orders(collection)
+                continue
+            others["sort_order"] = {"$gt": low}
+        following = await items.find_one(others, {"_id": 0, "sort_order": 1}, sort=[("sort_order", 1)])
+        high = following.get("sort_order", 0) if following else None
+
+        if high is None:
+            position = await next_sort_order(collection) if low is not None else item.get("sort_order", 0)
+        elif low is None:
+            position = high - SORT_ORDER_GAP
+        else:
+            position = (low + high) / 2
+            if high - low < SORT_ORDER_MIN_GAP:
+                await renumber_sort_orders(collection)
+                continue
+        await items.update_one({"id": item_id}, {"$set": {"sort_order": position}})
+        return position
+    raise HTTPException(status_code=409, detail="Could not place item, try again")
@@ -0,0 +1,148 @@
+"""Promo codes and server-side cart pricing."""
+from fastapi import HTTPException
+from pydantic import BaseModel, Field
+from pymongo import ReturnDocument
+from typing import List, Optional, Dict
+
+from .cache import cache_bus, config_store, single_flight
+from .core import db
+from .indexes import ensure_product_indexes, variation_price_table
+
+# ==================== PRICING ====================
+
+class PromoCodeCache:
+    """Active promo codes keyed by upper-cased code"""
+
+    def __init__(self, database):
+        self._db = database
+        self._codes: Optional[Dict[str, dict]] = None
+
+    async def reload(self, collection: str = "promo_codes"):
+        if collection == "promo_codes":
+            codes = await self._db.promo_codes.find({"is_active": True}, {"_id": 0}).to_list(1000)
+            self._codes = {c["code"]: c for c in codes}
+
+    async def get(self, code: str) -> Optional[dict]:
+        if self._codes is None:
+            await self.reload()
+        return self._codes.get(code.strip().upper())
+
+    def update(self, promo: Optional[dict]):
+        """Replace one cached code with a fresh copy of its document"""
+        if self._codes is None or not promo:
+            return
+        if promo.get("is_active"):
+            self._codes[promo["code"]] = promo
+        else:
+            self._codes.pop(promo["code"], None)
+
+promo_code_cache = PromoCodeCache(db)
+cache_bus.subscribe(promo_code_cache.reload, "promo_codes")
+
+async def reserve_promo_use(code: str):
+    """Atomically count one use of a promo code, failing once max_uses is reached.
+
+    The cached used_count only drives the early check in calculate_promo_discount;
+    this write is what enforces the limit, so other workers are not told to reload.
+    """
+    promo = await db.promo_codes.find_one_and_update(
+        {
+            "code": code,
+            "is_active": True,
+            "$or": [{"max_uses": {"$in": [None, 0]}}, {"$expr": {"$lt": ["$used_count", "$max_uses"]}}]
+        },
+        {"$inc": {"used_count": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    if promo is None:
+        raise HTTPException(status_code=400, detail="Promo code has reached maximum uses")
+    # The document before the $inc: the one taking the last use no longer matches the filter afterwards
+    promo["used_count"] = promo.get("used_count", 0) + 1
+    promo_code_cache.update(promo)
+
+async def release_promo_use(code: str):
+    """Give back a use taken by reserve_promo_use for an order that was not placed"""
+    promo = await db.promo_codes.find_one_and_update(
+        {"code": code, "used_count": {"$gt": 0}},
+        {"$inc": {"used_count": -1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    promo_code_cache.update(promo)
+
+def calculate_promo_discount(promo: Optional[dict], subtotal: float) -> float:
+    """Discount for a promo code; raises HTTPException when the code cannot be applied"""
+    if not promo:
+        raise HTTPException(status_code=404, detail="Invalid promo code")
+
+    if promo.get("min_order_amount", 0) > subtotal:
+        raise HTTPException(status_code=400, detail=f"Minimum order amount is Rs {promo['min_order_amount']}")
+
+    if promo.get("max_uses") and promo.get("used_count", 0) >= promo["max_uses"]:
+        raise HTTPException(status_code=400, detail="Promo code has reached maximum uses")
+
+    if promo["discount_type"] == "percentage":
+        discount = subtotal * (promo["discount_value"] / 100)
+    else:
+        discount = promo["discount_value"]
+    return min(discount, subtotal)
+
+class CartItem(BaseModel):
+    variation_id: str
+    quantity: int = Field(default=1, ge=1)
+
+class CartQuoteRequest(BaseModel):
+    items: List[CartItem]
+    promo_code: Optional[str] = None
+
+async def price_cart(items: List[CartItem], promo_code: Optional[str] = None) -> dict:
+    """Resolve items against the price table and apply promo, tax and service charge"""
+    await config_store.ensure_loaded()
+    await single_flight.do("product-indexes", ensure_product_indexes)
+    lines = []
+    subtotal = 0.0
+    entries = variation_price_table.get_many([item.variation_id for item in items])
+    for item in items:
+        entry = entries[item.variation_id]
+        if not entry or not entry["is_active"]:
+            raise HTTPException(status_code=400, detail=f"Product variation {item.variation_id} not found")
+        if entry["is_sold_out"]:
+            raise HTTPException(status_code=400, detail=f"{entry['product_name']} is sold out")
+        line_total = entry["price"] * item.quantity
+        subtotal += line_total
+        lines.append({
+            "variation_id": item.variation_id,
+            "product_id": entry["product_id"],
+            "name": entry["product_name"],
+            "variation": entry["variation_name"],
+            "price": entry["price"],
+            "quantity": item.quantity,
+            "line_total": round(line_total, 2)
+        })
+
+    discount = 0.0
+    applied_code = None
+    if promo_code:
+        promo = await promo_code_cache.get(promo_code)
+        discount = calculate_promo_discount(promo, subtotal)
+        applied_code = promo["code"]
+
+    settings = config_store.settings
+    after_discount = subtotal - discount
+    service_charge = float(settings.get("service_charge") or 0)
+    tax_percentage = float(settings.get("tax_percentage") or 0)
+    tax_amount = after_discount * (tax_percentage / 100)
+    total = after_discount + service_charge + tax_amount
+
+    return {
+        "items": lines,
+        "subtotal": round(subtotal, 2),
+        "promo_code": applied_code,
+        "discount_amount": round(discount, 2),
+        "service_charge": round(service_charge, 2),
+        "tax_label": settings.get("tax_label", "Tax"),
+        "tax_percentage": tax_percentage,
+        "tax_amount": round(tax_amount, 2),
+        "total": round(total, 2)
+    }
@@ -0,0 +1,331 @@
+"""Bulk product import and export as NDJSON, CSV or a JSON array."""
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .core import db
+from .indexes import products_changed
+from .models import ProductImportRow, UNCATEGORIZED_ID
+from .ordering import allocate_sort_orders, raise_sort_counter
+from .slugs import allocate_slugs, generate_slug, slug_has_base, write_with_unique_slug
+
+# ==================== FORMATS ====================
+
+IMPORT_BATCH_SIZE = 1000
+MAX_IMPORT_ERRORS = 500
+EXPORT_CHUNK_BYTES = 64 * 1024
+FORMAT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv", "json": "application/json"}
+CONTENT_TYPE_FORMATS = {
+    "application/x-ndjson": "ndjson", "application/ndjson": "ndjson", "application/jsonl": "ndjson",
+    "text/csv": "csv", "application/json": "json",
+}
+CSV_COLUMNS = ["id", "name", "slug", "description", "image_url", "category_id", "tags", "variations",
+               "custom_fields", "sort_order", "is_active", "is_sold_out"]
+CSV_JSON_COLUMNS = ("variations", "custom_fields")
+CSV_TAG_SEPARATOR = "|"
+# An empty cell in these columns means "not given" rather than an empty string
+CSV_OPTIONAL_COLUMNS = ("id", "slug", "sort_order", "is_active", "is_sold_out", "tags", *CSV_JSON_COLUMNS)
+
+# Row number in the upload, the parsed row, and the error when it could not be parsed
+ImportRow = Tuple[int, Optional[dict], Optional[str]]
+
+def import_format(content_type: str, requested: Optional[str] = None) -> str:
+    fmt = requested or CONTENT_TYPE_FORMATS.get(content_type.split(";")[0].strip().lower())
+    if fmt not in FORMAT_MEDIA_TYPES:
+        raise HTTPException(status_code=415, detail="Send NDJSON, CSV or a JSON array, or pass format=ndjson|csv|json")
+    return fmt
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decoded lines of a byte stream, without line endings"""
+    buffer = b""
+    first = True
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            text = line.decode("utf-8", "replace").rstrip("\r")
+            yield text.lstrip("\ufeff") if first else text
+            first = False
+    if buffer:
+        text = buffer.decode("utf-8", "replace").rstrip("\r")
+        yield text.lstrip("\ufeff") if first else text
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(data, dict):
+            yield line_number, data, None
+        else:
+            yield line_number, None, "Expected a JSON object"
+
+def csv_row(header: List[str], cells: List[str]) -> dict:
+    data = {}
+    for column, value in zip(header, cells):
+        if value == "" and column in CSV_OPTIONAL_COLUMNS:
+            continue
+        if column == "tags":
+            value = [tag.strip() for tag in value.split(CSV_TAG_SEPARATOR) if tag.strip()]
+        elif column in CSV_JSON_COLUMNS:
+            try:
+                value = json.loads(value)
+            except ValueError as e:
+                raise ValueError(f"{column} is not valid JSON: {e}")
+        data[column] = value
+    return data
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    """Rows of a CSV upload with a header line; quoted cells may span lines"""
+    header = None
+    record: List[str] = []
+    quotes = 0
+    start = line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not record:
+            start = line_number
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            # Inside a quoted cell that continues on the next line
+            continue
+        text = "\n".join(record)
+        record, quotes = [], 0
+        if not text.strip():
+            continue
+        cells = next(csv.reader(io.StringIO(text)))
+        if header is None:
+            header = [cell.strip().lower() for cell in cells]
+            if "name" not in header:
+                raise HTTPException(status_code=400, detail=f"CSV header must include name; columns are {', '.join(CSV_COLUMNS)}")
+            continue
+        try:
+            yield start, csv_row(header, cells), None
+        except ValueError as e:
+            yield start, None, str(e)
+    if record:
+        yield start, None, "Unterminated quoted cell"
+
+async def iter_json_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    # A JSON array cannot be parsed incrementally with the standard library; use NDJSON for large imports
+    try:
+        data = json.loads(b"".join([chunk async for chunk in chunks]) or b"null")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of products")
+    for number, item in enumerate(data, 1):
+        if isinstance(item, dict):
+            yield number, item, None
+        else:
+            yield number, None, "Expected a JSON object"
+
+ROW_READERS = {"ndjson": iter_ndjson_rows, "csv": iter_csv_rows, "json": iter_json_rows}
+
+# ==================== IMPORT ====================
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}" for e in error.errors())
+
+class ProductImporter:
+    """Validates rows as they stream in and upserts them in unordered bulk batches.
+
+    Rows with an id that already exists update that product and keep its slug
+    and position unless the row sets them. New rows get sort orders and slugs
+    from one counter round trip each per batch.
+    """
+
+    def __init__(self, dry_run: bool = False):
+        self.dry_run = dry_run
+        self.batch: List[Tuple[int, ProductImportRow]] = []
+        self.categories: Dict[str, str] = {}
+        self.received = self.valid = self.inserted = self.updated = self.failed = 0
+        self.errors: List[dict] = []
+
+    async def start(self):
+        categories = await db.categories.find({}, {"_id": 0, "id": 1, "slug": 1, "name": 1}).to_list(None)
+        # Rows may name their category by id, slug or name; ids take precedence
+        for key in ("name", "slug", "id"):
+            for category in categories:
+                if category.get(key):
+                    self.categories[category[key].lower() if key == "name" else category[key]] = category["id"]
+
+    def fail(self, row_number: int, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_IMPORT_ERRORS:
+            self.errors.append({"row": row_number, "error": error})
+
+    async def add(self, row_number: int, data: Optional[dict], error: Optional[str] = None):
+        self.received += 1
+        if error:
+            self.fail(row_number, error)
+            return
+        try:
+            row = ProductImportRow.model_validate(data)
+        except ValidationError as e:
+            self.fail(row_number, validation_message(e))
+            return
+        if row.category_id in ("", UNCATEGORIZED_ID):
+            row.category_id = UNCATEGORIZED_ID
+        else:
+            category_id = self.categories.get(row.category_id) or self.categories.get(row.category_id.lower())
+            if category_id is None:
+                self.fail(row_number, f"Unknown category: {row.category_id}")
+                return
+            row.category_id = category_id
+        self.valid += 1
+        if not self.dry_run:
+            self.batch.append((row_number, row))
+            if len(self.batch) >= IMPORT_BATCH_SIZE:
+                await self.flush()
+
+    async def flush(self):
+        batch, self.batch = self.batch, []
+        if not batch:
+            return
+        existing: Dict[str, Optional[str]] = {}
+        ids = [row.id for _, row in batch if row.id]
+        if ids:
+            async for product in db.products.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "slug": 1}):
+                existing[product["id"]] = product.get("slug")
+
+        slugs: List[Optional[str]] = []
+        for _, row in batch:
+            if row.slug and generate_slug(row.slug):
+                slugs.append(generate_slug(row.slug))
+            elif row.id in existing and slug_has_base(existing[row.id], generate_slug(row.name) or "item"):
+                slugs.append(existing[row.id])
+            else:
+                slugs.append(None)
+        missing = [i for i, slug in enumerate(slugs) if slug is None]
+        for i, slug in zip(missing, await allocate_slugs("products", [batch[i][1].name for i in missing])):
+            slugs[i] = slug
+
+        unplaced = sum(1 for _, row in batch if row.sort_order is None and row.id not in existing)
+        positions = iter(await allocate_sort_orders("products", unplaced))
+        placed = [row.sort_order for _, row in batch if row.sort_order is not None]
+        if placed:
+            # Later creates must still land after explicitly placed rows
+            await raise_sort_counter("products", max(placed))
+
+        now = datetime.now(timezone.utc).isoformat()
+        writes = []
+        for (_, row), slug in zip(batch, slugs):
+            fields = {**row.model_dump(exclude={"id", "slug", "sort_order"}), "slug": slug}
+            on_insert = {"created_at": now}
+            if row.sort_order is not None:
+                fields["sort_order"] = row.sort_order
+            elif row.id not in existing:
+                on_insert["sort_order"] = next(positions)
+            writes.append(({"id": row.id or str(uuid.uuid4())}, {"$set": fields, "$setOnInsert": on_insert}))
+
+        retry = []
+        try:
+            result = await db.products.bulk_write(
+                [UpdateOne(query, update, upsert=True) for query, update in writes], ordered=False
+            )
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for write_error in details.get("writeErrors", []):
+                index = write_error["index"]
+                if write_error.get("code") == 11000 and "slug" in write_error.get("errmsg", ""):
+                    retry.append(index)
+                else:
+                    self.fail(batch[index][0], write_error.get("errmsg", "Write failed"))
+        self.inserted += details.get("nUpserted", 0)
+        self.updated += details.get("nMatched", 0)
+        # Slug taken by a document the counters do not know about: allocate one row at a time
+        for index in retry:
+            await self.write_one(batch[index], *writes[index])
+
+    async def write_one(self, item: Tuple[int, ProductImportRow], query: dict, update: dict):
+        row_number, row = item
+        results = []
+
+        async def write(slug):
+            update["$set"]["slug"] = slug
+            results.append(await db.products.update_one(query, update, upsert=True))
+
+        try:
+            await write_with_unique_slug("products", row.name, write)
+        except HTTPException as e:
+            self.fail(row_number, e.detail)
+            return
+        if results[-1].upserted_id is not None:
+            self.inserted += 1
+        else:
+            self.updated += 1
+
+    async def finish(self) -> dict:
+        """Refresh the catalog indexes for whatever was written and return the report"""
+        if self.inserted or self.updated:
+            await products_changed()
+        return {
+            "dry_run": self.dry_run,
+            "received": self.received,
+            "valid": self.valid,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+# ==================== EXPORT ====================
+
+def csv_cells(product: dict) -> list:
+    cells = []
+    for column in CSV_COLUMNS:
+        value = product.get(column)
+        if column == "tags":
+            value = CSV_TAG_SEPARATOR.join(value or [])
+        elif column in CSV_JSON_COLUMNS:
+            value = json.dumps(value or [], separators=(",", ":"), ensure_ascii=False)
+        elif isinstance(value, bool):
+            value = "true" if value else "false"
+        cells.append("" if value is None else value)
+    return cells
+
+async def export_chunks(fmt: str) -> AsyncIterator[bytes]:
+    """All products in catalog order, serialized as fmt in chunks of about EXPORT_CHUNK_BYTES"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(CSV_COLUMNS)
+    elif fmt == "json":
+        buffer.write("[")
+    first = True
+    cursor = db.products.find({}, {"_id": 0}).sort([("sort_order", 1), ("created_at", -1)]).batch_size(IMPORT_BATCH_SIZE)
+    async for product in cursor:
+        if fmt == "csv":
+            writer.writerow(csv_cells(product))
+        else:
+            if fmt == "json" and not first:
+                buffer.write(",")
+            buffer.write(json.dumps(product, separators=(",", ":"), default=str, ensure_ascii=False))
+            if fmt == "ndjson":
+                buffer.write("\n")
+        first = False
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if fmt == "json":
+        buffer.write("]")
+    yield buffer.getvalue().encode()
@@ -0,0 +1,260 @@
+"""Per-client rate limits for the public write endpoints.
+
+Each limited route has a policy of `limit` requests per `window_seconds` per
+client IP; login attempts are counted per IP and username, so one client
+guessing passwords cannot lock the real admin out. The default backend is an
+in-process token bucket per key, in an LRU so memory stays bounded; every
+worker counts on its own, so with N workers a client gets up to N times the
+limit. RATE_LIMIT_BACKEND=mongo shares a sliding-window counter in MongoDB
+between workers; requests are still checked against the local bucket first,
+so a flood that is already over the limit never reaches the database.
+
+The client IP is the socket peer unless RATE_LIMIT_PROXY_HOPS is set, in
+which case it is read from X-Forwarded-For that many entries from the right.
+Only set it behind a proxy that overwrites the header (1 for a single
+ingress), otherwise clients can pick their own IP.
+"""
+from abc import ABC, abstractmethod
+import json
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+from pymongo import ReturnDocument
+from starlette.datastructures import Headers
+
+from .core import db, logger
+
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "local")
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "50000"))
+# Reverse proxies in front of the app; the client IP is read that many hops from the right of X-Forwarded-For
+RATE_LIMIT_PROXY_HOPS = int(os.environ.get("RATE_LIMIT_PROXY_HOPS", "0"))
+RATE_LIMITS_COLLECTION = "rate_limits"
+# Bodies read for a key_field are small JSON logins; anything bigger is refused rather than buffered
+RATE_LIMIT_MAX_BODY_BYTES = 16 * 1024
+
+class RateLimitPolicy(NamedTuple):
+    name: str
+    limit: int
+    window_seconds: float
+    # JSON body field added to the client IP in the key
+    key_field: Optional[str] = None
+
+# The cart quote checks promo codes too, so both routes draw on one budget
+PROMO_VALIDATE_POLICY = RateLimitPolicy("promo_validate", 20, 60)
+
+# Keyed by (method, path) so the check on most requests is one dict lookup;
+# paths with {parameters} are matched by pattern, keyed per route rather than per value
+RATE_LIMIT_POLICIES: Dict[Tuple[str, str], RateLimitPolicy] = {
+    ("POST", "/api/orders/create"): RateLimitPolicy("orders_create", 10, 60),
+    ("POST", "/api/orders/{order_id}/payment-screenshot"): RateLimitPolicy("payment_screenshot", 10, 600),
+    ("POST", "/api/promo-codes/validate"): PROMO_VALIDATE_POLICY,
+    ("POST", "/api/cart/quote"): PROMO_VALIDATE_POLICY,
+    ("POST", "/api/auth/login"): RateLimitPolicy("auth_login", 10, 300, key_field="email"),
+    ("POST", "/api/seed"): RateLimitPolicy("seed", 3, 3600),
+}
+
+class RateLimitBackend(ABC):
+    """Counts hits per key; hit() returns 0 when allowed, else seconds until retry"""
+
+    @abstractmethod
+    async def hit(self, key: str, policy: RateLimitPolicy) -> float:
+        ...
+
+    async def start(self):
+        pass
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Token bucket per key: `limit` burst, refilled evenly over the window"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        # key -> [tokens, last refill time], least recently used first
+        self.buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def hit(self, key: str, policy: RateLimitPolicy) -> float:
+        now = time.monotonic()
+        rate = policy.limit / policy.window_seconds
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [float(policy.limit), now]
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(float(policy.limit), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0
+        return (1 - bucket[0]) / rate
+
+class MongoRateLimitBackend(RateLimitBackend):
+    """Sliding window shared by all workers: one $inc per hit on a per-window counter
+
+    The estimate weights the previous window's count by how much of it still
+    overlaps the sliding window. Counters expire through a TTL index. A local
+    token bucket answers first: this worker's own count never exceeds the
+    shared one, so whatever it rejects would be rejected here too.
+    """
+
+    def __init__(self, database, local: Optional[MemoryRateLimitBackend] = None):
+        self.collection = database[RATE_LIMITS_COLLECTION]
+        self.local = local or MemoryRateLimitBackend()
+
+    async def start(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def hit(self, key: str, policy: RateLimitPolicy) -> float:
+        retry_after = await self.local.hit(key, policy)
+        if retry_after:
+            return retry_after
+        now = time.time()
+        window = policy.window_seconds
+        index = int(now // window)
+        elapsed = now - index * window
+        expires_at = datetime.fromtimestamp((index + 2) * window, timezone.utc)
+        current = await self.collection.find_one_and_update(
+            {"_id": f"{key}:{index}"},
+            {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": expires_at}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        count = current["count"]
+        previous = await self.collection.find_one({"_id": f"{key}:{index - 1}"})
+        previous_count = previous["count"] if previous else 0
+        overlap = 1 - elapsed / window
+        if previous_count * overlap + count <= policy.limit:
+            return 0
+        # Wait until the next hit fits: enough of the previous window has slid out,
+        # or, past the boundary, enough of this one has
+        if count < policy.limit and previous_count:
+            return max(1.0, window * (1 - (policy.limit - count - 1) / previous_count) - elapsed)
+        return window - elapsed + window * max(0.0, 1 - (policy.limit - 1) / count)
+
+def client_ip(scope) -> str:
+    if RATE_LIMIT_PROXY_HOPS:
+        forwarded = Headers(scope=scope).get("x-forwarded-for", "")
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if len(hops) >= RATE_LIMIT_PROXY_HOPS:
+            return hops[-RATE_LIMIT_PROXY_HOPS]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def body_field(body: bytes, field: str) -> str:
+    try:
+        value = json.loads(body).get(field)
+    except (ValueError, AttributeError):
+        return ""
+    return value.strip().lower() if isinstance(value, str) else ""
+
+class BodyTooLarge(Exception):
+    pass
+
+async def buffer_body(receive, max_bytes: int = RATE_LIMIT_MAX_BODY_BYTES) -> Tuple[bytes, Callable]:
+    """Read the request body and return it with a receive that hands it to the app again.
+
+    Raises BodyTooLarge as soon as more than max_bytes have arrived.
+    """
+    chunks = []
+    received = 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunk = message.get("body", b"")
+        received += len(chunk)
+        if received > max_bytes:
+            raise BodyTooLarge()
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            break
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if replayed:
+            return await receive()
+        replayed = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return body, replay
+
+def create_rate_limit_backend() -> RateLimitBackend:
+    if RATE_LIMIT_BACKEND == "mongo":
+        return MongoRateLimitBackend(db)
+    return MemoryRateLimitBackend()
+
+rate_limit_backend = create_rate_limit_backend()
+
+def path_pattern(path: str) -> Pattern:
+    """Regex for a route path, with each {parameter} matching one path segment"""
+    parts = re.split(r"\{[^/}]+\}", path)
+    return re.compile("[^/]+".join(re.escape(part) for part in parts) + "$")
+
+class RateLimitMiddleware:
+    """Answers 429 with Retry-After once a client exceeds the policy for a route"""
+
+    def __init__(self, app, backend: Optional[RateLimitBackend] = None,
+                 policies: Optional[Dict[Tuple[str, str], RateLimitPolicy]] = None):
+        self.app = app
+        self.backend = backend or rate_limit_backend
+        policies = RATE_LIMIT_POLICIES if policies is None else policies
+        self.policies = {key: policy for key, policy in policies.items() if "{" not in key[1]}
+        self.patterns: List[Tuple[str, Pattern, RateLimitPolicy]] = [
+            (method, path_pattern(path), policy) for (method, path), policy in policies.items() if "{" in path
+        ]
+
+    def policy_for(self, method: str, path: str) -> Optional[RateLimitPolicy]:
+        policy = self.policies.get((method, path))
+        if policy is None:
+            for pattern_method, pattern, pattern_policy in self.patterns:
+                if pattern_method == method and pattern.match(path):
+                    return pattern_policy
+        return policy
+
+    async def __call__(self, scope, receive, send):
+        policy = self.policy_for(scope.get("method"), scope.get("path")) if scope["type"] == "http" else None
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{policy.name}:{client_ip(scope)}"
+        if policy.key_field:
+            try:
+                if int(Headers(scope=scope).get("content-length") or 0) > RATE_LIMIT_MAX_BODY_BYTES:
+                    raise BodyTooLarge()
+                body, receive = await buffer_body(receive)
+            except (BodyTooLarge, ValueError):
+                await send_error(send, 413, "Request body too large")
+                return
+            key = f"{key}:{body_field(body, policy.key_field)}"
+        try:
+            retry_after = await self.backend.hit(key, policy)
+        except Exception as e:
+            # A limiter outage must not take the shop down with it
+            logger.warning(f"Rate limit check failed for {policy.name}, allowing request: {e}")
+            retry_after = 0
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+        await send_error(send, 429, "Too many requests, please try again later",
+                         [(b"retry-after", str(math.ceil(retry_after)).encode())])
+
+async def send_error(send, status_code: int, detail: str, headers: Optional[List[Tuple[bytes, bytes]]] = None):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *(headers or []),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
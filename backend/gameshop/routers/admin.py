@@ -0,0 +1,159 @@
+"""Admin authentication routes, uploads, data maintenance and metrics."""
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+import uuid
+from datetime import datetime, timezone
+
+from ..auth import ADMIN_PASSWORD, ADMIN_USERNAME, create_token, get_current_user
+from ..cache import invalidate, single_flight, snapshot_worker
+from ..core import UPLOADS_DIR, database_for
+from ..indexes import products_changed
+from ..models import ScheduledJobUpdate, UserCreate, UserLogin
+from ..scheduler import scheduler
+from ..uploads import ALLOWED_IMAGE_TYPES, save_upload
+from .content import rebuild_review_stats
+
+router = APIRouter()
+
+# Primary unless READ_PREFERENCE_ADMIN says otherwise
+db = database_for("admin")
+
+# ==================== AUTH ROUTES ====================
+
+@router.post("/auth/register")
+async def register(user_data: UserCreate):
+    raise HTTPException(status_code=403, detail="Registration disabled. Use admin credentials.")
+
+@router.post("/auth/login")
+async def login(credentials: UserLogin):
+    if credentials.email == ADMIN_USERNAME and credentials.password == ADMIN_PASSWORD:
+        token = create_token("admin-fixed")
+        return {
+            "token": token,
+            "user": {
+                "id": "admin-fixed",
+                "email": ADMIN_USERNAME,
+                "name": "Admin",
+                "is_admin": True
+            }
+        }
+    raise HTTPException(status_code=401, detail="Invalid credentials")
+
+@router.get("/auth/me")
+async def get_me(current_user: dict = Depends(get_current_user)):
+    return current_user
+
+@router.post("/upload")
+async def upload_image(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+    if file.content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid file type. Only JPEG, PNG, WebP, GIF allowed.")
+
+    file_ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
+    filename = f"{uuid.uuid4()}.{file_ext}"
+    file_path = UPLOADS_DIR / filename
+
+    await save_upload(file, file_path)
+
+    return {"url": f"/api/uploads/{filename}"}
+
+# ==================== CLEAR DATA ====================
+
+@router.post("/clear-products")
+async def clear_products(current_user: dict = Depends(get_current_user)):
+    await db.products.delete_many({})
+    await db.categories.delete_many({})
+    await products_changed()
+    await invalidate("categories")
+    return {"message": "All products and categories cleared"}
+
+# ==================== SEED DATA ====================
+
+@router.post("/seed")
+async def seed_data():
+    social_data = [
+        {"id": "fb", "platform": "Facebook", "url": "https://facebook.com/gameshopnepal", "icon": "facebook"},
+        {"id": "ig", "platform": "Instagram", "url": "https://instagram.com/gameshopnepal", "icon": "instagram"},
+        {"id": "tt", "platform": "TikTok", "url": "https://tiktok.com/@gameshopnepal", "icon": "tiktok"},
+        {"id": "wa", "platform": "WhatsApp", "url": "https://wa.me/9779743488871", "icon": "whatsapp"},
+    ]
+
+    for link in social_data:
+        await db.social_links.update_one({"id": link["id"]}, {"$set": link}, upsert=True)
+
+    reviews_data = [
+        {"id": "rev1", "reviewer_name": "Sujan Thapa", "rating": 5, "comment": "Fast delivery and genuine products. Got my Netflix subscription within minutes!", "review_date": "2025-01-10T10:00:00Z", "created_at": datetime.now(timezone.utc).isoformat()},
+        {"id": "rev2", "reviewer_name": "Anisha Sharma", "rating": 5, "comment": "Best prices in Nepal for digital products. Highly recommended!", "review_date": "2025-01-08T14:30:00Z", "created_at": datetime.now(timezone.utc).isoformat()},
+        {"id": "rev3", "reviewer_name": "Rohan KC", "rating": 5, "comment": "Bought PUBG UC, instant delivery. Will buy again!", "review_date": "2025-01-05T09:15:00Z", "created_at": datetime.now(timezone.utc).isoformat()},
+    ]
+
+    for rev in reviews_data:
+        await db.reviews.update_one({"id": rev["id"]}, {"$set": rev}, upsert=True)
+    await rebuild_review_stats()
+
+    default_faqs = [
+        {"id": "faq1", "question": "How do I place an order?", "answer": "Simply browse our products, select the plan you want, and click 'Order Now'. This will redirect you to WhatsApp where you can complete your order.", "sort_order": 0},
+        {"id": "faq2", "question": "How long does delivery take?", "answer": "Most products are delivered instantly within minutes after payment confirmation.", "sort_order": 1},
+        {"id": "faq3", "question": "What payment methods do you accept?", "answer": "We accept eSewa, Khalti, bank transfer, and other local payment methods.", "sort_order": 2},
+        {"id": "faq4", "question": "Are your products genuine?", "answer": "Yes! All our products are 100% genuine and sourced directly from authorized channels.", "sort_order": 3},
+    ]
+
+    for faq in default_faqs:
+        await db.faqs.update_one({"id": faq["id"]}, {"$set": faq}, upsert=True)
+
+    await invalidate("social_links", "reviews", "faqs")
+    return {"message": "Data seeded successfully"}
+
+# ==================== SNAPSHOTS ====================
+
+@router.post("/snapshots/rebuild", status_code=202)
+async def rebuild_snapshots(current_user: dict = Depends(get_current_user)):
+    """Regenerate every static page snapshot and the sitemap; the result lands in the snapshots job history"""
+    if snapshot_worker is None:
+        raise HTTPException(status_code=400, detail="Snapshots are not configured, set SNAPSHOT_DIR")
+    snapshot_worker.mark_all()
+    if not await snapshot_worker.run_now("manual"):
+        # The marks stay pending and run once the current refresh lets go of the lease
+        raise HTTPException(status_code=409, detail="A snapshot refresh is already running, try again shortly")
+    return {"message": "Snapshot rebuild started"}
+
+# ==================== METRICS ====================
+
+@router.get("/metrics/single-flight")
+async def get_single_flight_metrics(current_user: dict = Depends(get_current_user)):
+    """Per-key counts of executed versus shared (coalesced) reads"""
+    return {
+        "in_flight": len(single_flight._inflight),
+        "keys": dict(single_flight.metrics)
+    }
+
+# ==================== SCHEDULED JOBS ====================
+
+def get_job_name(name: str) -> str:
+    if name not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return name
+
+@router.get("/jobs")
+async def list_scheduled_jobs(current_user: dict = Depends(get_current_user)):
+    """Registered jobs with their schedule, last run and duration stats"""
+    return await scheduler.list_jobs()
+
+@router.get("/jobs/{name}/runs")
+async def list_job_runs(name: str, limit: int = 50, current_user: dict = Depends(get_current_user)):
+    """Most recent runs of one job, newest first"""
+    return await scheduler.runs(get_job_name(name), min(max(limit, 1), 500))
+
+@router.post("/jobs/{name}/run", status_code=202)
+async def run_scheduled_job(name: str, current_user: dict = Depends(get_current_user)):
+    """Start a job now in the background; its result lands in the run history"""
+    if not await scheduler.claim_and_run(get_job_name(name), "manual"):
+        raise HTTPException(status_code=409, detail="Job is already running or all job slots are busy")
+    return {"message": f"Job {name} started"}
+
+@router.put("/jobs/{name}")
+async def update_scheduled_job(name: str, update: ScheduledJobUpdate, current_user: dict = Depends(get_current_user)):
+    try:
+        doc = await scheduler.update_job(get_job_name(name), update.enabled, update.schedule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid schedule: {e}")
+    doc["name"] = doc.pop("_id")
+    return doc
@@ -0,0 +1,232 @@
+"""Categories, products and variation prices."""
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import time
+
+from ..auth import get_current_user
+from ..cache import flight_key, fresh_read_db, invalidate, single_flight
+from ..core import database_for, db, encode_json, json_bytes_response
+from ..indexes import (
+    catalog_view, ensure_product_indexes, load_catalog_categories, product_search_index,
+    products_changed, variation_price_table,
+)
+from ..models import (
+    Category, CategoryCreate, CategoryWithCount, MoveRequest, Product, ProductCreate, ProductOrderUpdate,
+    UNCATEGORIZED_ID,
+)
+from ..ordering import move_after, next_sort_order, renumber_sort_orders
+from ..product_io import FORMAT_MEDIA_TYPES, ROW_READERS, ProductImporter, export_chunks, import_format
+from ..slugs import category_slug_text, unchanged_slug, write_with_unique_slug
+
+router = APIRouter()
+public_router = APIRouter()
+
+# Public reads may be served by a secondary, admin reads and all writes use the primary db
+read_db = database_for("catalog")
+
+# ==================== CATEGORY ROUTES ====================
+
+@public_router.get("/categories", response_model=List[CategoryWithCount])
+async def get_categories():
+    await single_flight.do("product-indexes", ensure_product_indexes)
+    counts = catalog_view.category_counts()
+    return [{**c, "product_count": counts.get(c["id"], 0)} for c in catalog_view.categories]
+
+@router.post("/categories", response_model=Category)
+async def create_category(category_data: CategoryCreate, current_user: dict = Depends(get_current_user)):
+    category = Category(name=category_data.name, slug="")
+
+    async def insert(slug):
+        category.slug = slug
+        await db.categories.insert_one(category.model_dump())
+
+    await write_with_unique_slug("categories", category_slug_text(category_data.name), insert)
+    await load_catalog_categories()
+    await invalidate("categories")
+    return category
+
+@router.put("/categories/{category_id}", response_model=Category)
+async def update_category(category_id: str, category_data: CategoryCreate, current_user: dict = Depends(get_current_user)):
+    existing = await db.categories.find_one({"id": category_id})
+    if not existing:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    async def update(slug):
+        await db.categories.update_one({"id": category_id}, {"$set": {"name": category_data.name, "slug": slug}})
+
+    await write_with_unique_slug(
+        "categories", category_slug_text(category_data.name), update, unchanged_slug(existing, "name", category_data.name)
+    )
+    await load_catalog_categories()
+    await invalidate("categories")
+    updated = await db.categories.find_one({"id": category_id}, {"_id": 0})
+    return updated
+
+@router.delete("/categories/{category_id}")
+async def delete_category(category_id: str, current_user: dict = Depends(get_current_user)):
+    result = await db.categories.delete_one({"id": category_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    # Move orphaned products to uncategorized in one write instead of leaving dangling ids
+    orphans = await db.products.update_many({"category_id": category_id}, {"$set": {"category_id": UNCATEGORIZED_ID}})
+    if orphans.modified_count:
+        await products_changed()
+    else:
+        await load_catalog_categories()
+    await invalidate("categories")
+    return {"message": "Category deleted", "uncategorized_products": orphans.modified_count}
+
+# ==================== PRODUCT ROUTES ====================
+
+@public_router.get("/products", response_model=List[Product])
+async def get_products(category_id: Optional[str] = None, active_only: bool = True, sold_out_last: bool = False):
+    await single_flight.do("product-indexes", ensure_product_indexes)
+    return json_bytes_response(catalog_view.listing(category_id or None, active_only, sold_out_last))
+
+@router.put("/products/reorder")
+async def reorder_products(order_data: ProductOrderUpdate, current_user: dict = Depends(get_current_user)):
+    """Renumber the whole list; single drags should use /products/{product_id}/move"""
+    await renumber_sort_orders("products", order_data.product_ids)
+    await products_changed()
+    return {"message": "Products reordered successfully"}
+
+@router.put("/products/{product_id}/move")
+async def move_product(product_id: str, move: MoveRequest, current_user: dict = Depends(get_current_user)):
+    sort_order = await move_after("products", product_id, move.after_id)
+    await products_changed([product_id])
+    return {"id": product_id, "sort_order": sort_order}
+
+@public_router.get("/products/summary")
+async def get_product_summaries(category_id: Optional[str] = None, active_only: bool = True):
+    """Lightweight listing for product cards; full documents come from /products/{product_id}"""
+    query = {}
+    if category_id:
+        query["category_id"] = category_id
+    if active_only:
+        query["is_active"] = True
+
+    async def fetch():
+        summaries = await fresh_read_db("products", read_db).products_summary.find(query, {"_id": 0}).sort([("sort_order", 1), ("created_at", -1)]).to_list(None)
+        return encode_json(summaries)
+
+    body = await single_flight.do(flight_key("/products/summary", category_id=category_id or None, active_only=active_only), fetch)
+    return json_bytes_response(body)
+
+@public_router.get("/products/search")
+async def search_products(q: str, category_id: Optional[str] = None, active_only: bool = True, limit: int = 20):
+    """Ranked full-text search with prefix matching on the last term for autocomplete"""
+    await single_flight.do("product-indexes", ensure_product_indexes)
+    started = time.perf_counter()
+    results, facets = product_search_index.search(q, category_id=category_id, active_only=active_only, limit=min(max(limit, 1), 100))
+    return {
+        "query": q,
+        "results": results,
+        "facets": {"category_id": facets},
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+@public_router.get("/products/{product_id}", response_model=Product)
+async def get_product(product_id: str):
+    async def fetch():
+        # First try to find by slug
+        products = fresh_read_db("products", read_db).products
+        product = await products.find_one({"slug": product_id}, {"_id": 0})
+        if not product:
+            # Then try by ID
+            product = await products.find_one({"id": product_id}, {"_id": 0})
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return Product(**product).model_dump_json().encode()
+
+    body = await single_flight.do(flight_key("/products/{product_id}", product_id=product_id), fetch)
+    return json_bytes_response(body)
+
+@router.post("/products", response_model=Product)
+async def create_product(product_data: ProductCreate, current_user: dict = Depends(get_current_user)):
+    product_dict = product_data.model_dump()
+    product_dict["sort_order"] = await next_sort_order("products")
+    product = Product(**product_dict)
+
+    async def insert(slug):
+        product.slug = slug
+        await db.products.insert_one(product.model_dump())
+
+    await write_with_unique_slug("products", product_data.name, insert)
+    await products_changed([product.id])
+    return product
+
+@router.post("/products/import")
+async def import_products(request: Request, format: Optional[str] = None, dry_run: bool = False,
+                          current_user: dict = Depends(get_current_user)):
+    """Create or update products from NDJSON, CSV or a JSON array streamed in the request body.
+
+    The format comes from ?format= or the Content-Type. Rows are validated as
+    they arrive; invalid rows are reported by row number and skipped.
+    """
+    started = time.perf_counter()
+    fmt = import_format(request.headers.get("content-type", ""), format)
+    importer = ProductImporter(dry_run=dry_run)
+    await importer.start()
+    try:
+        async for row_number, data, error in ROW_READERS[fmt](request.stream()):
+            await importer.add(row_number, data, error)
+        await importer.flush()
+    finally:
+        report = await importer.finish()
+    report["took_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+@router.get("/products/export")
+async def export_products(format: str = "ndjson", current_user: dict = Depends(get_current_user)):
+    """Stream every product in catalog order, in a format /products/import accepts"""
+    if format not in FORMAT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMAT_MEDIA_TYPES)}")
+    return StreamingResponse(
+        export_chunks(format),
+        media_type=FORMAT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'}
+    )
+
+@router.put("/products/{product_id}", response_model=Product)
+async def update_product(product_id: str, product_data: ProductCreate, current_user: dict = Depends(get_current_user)):
+    existing = await db.products.find_one({"id": product_id})
+    if not existing:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    update_data = product_data.model_dump()
+
+    async def update(slug):
+        await db.products.update_one({"id": product_id}, {"$set": {**update_data, "slug": slug}})
+
+    await write_with_unique_slug("products", product_data.name, update, unchanged_slug(existing, "name", product_data.name))
+    await products_changed([product_id])
+    updated = await db.products.find_one({"id": product_id}, {"_id": 0})
+    return updated
+
+@router.delete("/products/{product_id}")
+async def delete_product(product_id: str, current_user: dict = Depends(get_current_user)):
+    result = await db.products.delete_one({"id": product_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Product not found")
+    await products_changed([product_id])
+    return {"message": "Product deleted"}
+
+MAX_VARIATION_PRICE_IDS = 500
+
+@public_router.get("/variations/prices")
+async def get_variation_prices(ids: str):
+    """Batch price lookup: ids is a comma-separated list of variation ids"""
+    variation_ids = [vid for vid in dict.fromkeys(v.strip() for v in ids.split(",")) if vid]
+    if len(variation_ids) > MAX_VARIATION_PRICE_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_VARIATION_PRICE_IDS} ids per request")
+    await single_flight.do("product-indexes", ensure_product_indexes)
+    entries = variation_price_table.get_many(variation_ids)
+    return {
+        "prices": {vid: entry for vid, entry in entries.items() if entry},
+        "missing": [vid for vid, entry in entries.items() if not entry]
+    }
+
+# Public reads are also served by the storefront-only app
+router.include_router(public_router)
@@ -0,0 +1,497 @@
+"""Reviews, FAQs, CMS pages, social links, payment methods, notification bar, blog and site settings."""
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, TypeAdapter
+from typing import List, Optional
+import uuid
+from datetime import datetime, timezone
+from pymongo import ReturnDocument, UpdateOne
+from collections import OrderedDict
+
+from ..auth import get_current_user
+from ..cache import config_store, flight_key, invalidate, single_flight
+from ..compression import cached_body
+from ..core import UPLOADS_DIR, database_for, db, encode_json, json_bytes_response, logger
+from ..models import FAQItem, FAQItemCreate, MoveRequest, Review, ReviewCreate, SocialLink, SocialLinkCreate
+from ..ordering import move_after, next_sort_order, renumber_sort_orders
+from ..sanitize import render_blog_content
+from ..scheduler import Job, scheduler
+from ..slugs import unchanged_slug, write_with_unique_slug
+
+router = APIRouter()
+public_router = APIRouter()
+
+# Public reads may be served by a secondary, admin reads and all writes use the primary db
+read_db = database_for("content")
+
+# ==================== REVIEW ROUTES ====================
+
+review_list_adapter = TypeAdapter(List[Review])
+
+REVIEW_STATS_ID = "main"
+MANUAL_REVIEW_SOURCE = "manual"
+
+def review_source(review: dict) -> str:
+    return review.get("source") or MANUAL_REVIEW_SOURCE
+
+def review_stats_delta(review: dict, sign: int = 1) -> dict:
+    """$inc fields that add (sign=1) or remove (sign=-1) one review from the stats counters"""
+    prefix = f"by_source.{review_source(review)}"
+    rating = int(review["rating"])
+    return {
+        f"{prefix}.count": sign,
+        f"{prefix}.rating_sum": sign * rating,
+        f"{prefix}.histogram.{rating}": sign,
+    }
+
+def merge_stats_delta(total: dict, delta: dict):
+    for field, value in delta.items():
+        total[field] = total.get(field, 0) + value
+
+async def apply_review_stats_delta(delta: dict):
+    delta = {field: value for field, value in delta.items() if value}
+    if delta:
+        await db.review_stats.update_one({"id": REVIEW_STATS_ID}, {"$inc": delta}, upsert=True)
+
+async def compute_review_stats(database) -> dict:
+    """Review stats counters aggregated from the reviews collection of database, without storing them"""
+    pipeline = [
+        {"$group": {
+            "_id": {"source": {"$ifNull": ["$source", MANUAL_REVIEW_SOURCE]}, "rating": "$rating"},
+            "count": {"$sum": 1},
+        }},
+    ]
+    by_source = {}
+    async for row in database.reviews.aggregate(pipeline):
+        source, rating, count = row["_id"]["source"], int(row["_id"]["rating"]), row["count"]
+        entry = by_source.setdefault(source, {"count": 0, "rating_sum": 0, "histogram": {}})
+        entry["count"] += count
+        entry["rating_sum"] += rating * count
+        entry["histogram"][str(rating)] = entry["histogram"].get(str(rating), 0) + count
+    return {"id": REVIEW_STATS_ID, "by_source": by_source, "rebuilt_at": datetime.now(timezone.utc).isoformat()}
+
+async def rebuild_review_stats() -> dict:
+    """Recompute the review stats counters from the reviews collection and store them"""
+    doc = await compute_review_stats(db)
+    await db.review_stats.replace_one({"id": REVIEW_STATS_ID}, doc, upsert=True)
+    return doc
+
+async def ensure_review_stats():
+    """Startup step: build the stats counters if they were never stored"""
+    if not await db.review_stats.find_one({"id": REVIEW_STATS_ID}, {"_id": 1}):
+        await rebuild_review_stats()
+
+def summarize_review_counts(entry: dict) -> dict:
+    count = entry.get("count", 0)
+    histogram = entry.get("histogram", {})
+    return {
+        "count": count,
+        "average_rating": round(entry.get("rating_sum", 0) / count, 2) if count else 0,
+        "histogram": {str(star): histogram.get(str(star), 0) for star in range(5, 0, -1)},
+    }
+
+def format_review_stats(doc: dict) -> dict:
+    by_source = doc.get("by_source", {})
+    total = {}
+    for entry in by_source.values():
+        merge_stats_delta(total, {
+            "count": entry.get("count", 0),
+            "rating_sum": entry.get("rating_sum", 0),
+        })
+        for star, count in entry.get("histogram", {}).items():
+            merge_stats_delta(total.setdefault("histogram", {}), {star: count})
+    return {
+        **summarize_review_counts(total),
+        "by_source": {source: summarize_review_counts(entry) for source, entry in by_source.items()},
+    }
+
+@public_router.get("/reviews/stats")
+async def get_review_stats():
+    """Average rating and star histogram, overall and per source"""
+    doc = await read_db.review_stats.find_one({"id": REVIEW_STATS_ID}, {"_id": 0})
+    if doc is None:
+        # Not stored yet: aggregate without writing, this read may be on a secondary or the storefront app.
+        # Startup, the nightly job and the admin route store the counters.
+        doc = await single_flight.do("review-stats", lambda: compute_review_stats(read_db))
+    return format_review_stats(doc)
+
+# Nightly repair in case a counter update was lost
+scheduler.add_job(Job(
+    "review_stats", rebuild_review_stats, "30 3 * * *",
+    description="Recompute the review stats counters from all reviews"
+))
+
+@router.post("/reviews/stats/rebuild")
+async def rebuild_review_stats_route(current_user: dict = Depends(get_current_user)):
+    """Repair the stats counters by recomputing them from all reviews"""
+    doc = await rebuild_review_stats()
+    return format_review_stats(doc)
+
+@public_router.get("/reviews", response_model=List[Review])
+async def get_reviews():
+    async def fetch():
+        reviews = await read_db.reviews.find({}, {"_id": 0}).sort("review_date", -1).to_list(1000)
+        return review_list_adapter.dump_json(review_list_adapter.validate_python(reviews))
+
+    body = await single_flight.do(flight_key("/reviews"), fetch)
+    return json_bytes_response(body)
+
+@router.post("/reviews", response_model=Review)
+async def create_review(review_data: ReviewCreate, current_user: dict = Depends(get_current_user)):
+    review = Review(
+        reviewer_name=review_data.reviewer_name,
+        rating=review_data.rating,
+        comment=review_data.comment,
+        review_date=review_data.review_date or datetime.now(timezone.utc).isoformat()
+    )
+    await db.reviews.insert_one(review.model_dump())
+    await apply_review_stats_delta(review_stats_delta(review.model_dump()))
+    await invalidate("reviews")
+    return review
+
+@router.put("/reviews/{review_id}", response_model=Review)
+async def update_review(review_id: str, review_data: ReviewCreate, current_user: dict = Depends(get_current_user)):
+    update_data = review_data.model_dump(exclude_none=True)
+    # The stats delta comes from the document this write replaced, so concurrent edits never subtract the same rating twice
+    previous = await db.reviews.find_one_and_update(
+        {"id": review_id}, {"$set": update_data}, return_document=ReturnDocument.BEFORE
+    )
+    if not previous:
+        raise HTTPException(status_code=404, detail="Review not found")
+    if update_data["rating"] != previous.get("rating"):
+        delta = review_stats_delta(previous, -1)
+        merge_stats_delta(delta, review_stats_delta({**previous, **update_data}))
+        await apply_review_stats_delta(delta)
+    await invalidate("reviews")
+    updated = await db.reviews.find_one({"id": review_id}, {"_id": 0})
+    return updated
+
+@router.delete("/reviews/{review_id}")
+async def delete_review(review_id: str, current_user: dict = Depends(get_current_user)):
+    deleted = await db.reviews.find_one_and_delete({"id": review_id})
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Review not found")
+    await apply_review_stats_delta(review_stats_delta(deleted, -1))
+    await invalidate("reviews")
+    return {"message": "Review deleted"}
+
+@public_router.get("/faqs", response_model=List[FAQItem])
+async def get_faqs():
+    faqs = await read_db.faqs.find({}, {"_id": 0}).sort("sort_order", 1).to_list(100)
+    return faqs
+
+@router.post("/faqs", response_model=FAQItem)
+async def create_faq(faq_data: FAQItemCreate, current_user: dict = Depends(get_current_user)):
+    faq = FAQItem(question=faq_data.question, answer=faq_data.answer, sort_order=await next_sort_order("faqs"))
+    await db.faqs.insert_one(faq.model_dump())
+    await invalidate("faqs")
+    return faq
+
+@router.put("/faqs/reorder")
+async def reorder_faqs(request: Request, current_user: dict = Depends(get_current_user)):
+    faq_ids = await request.json()
+    await renumber_sort_orders("faqs", faq_ids)
+    await invalidate("faqs")
+    return {"message": "FAQs reordered successfully"}
+
+@router.put("/faqs/{faq_id}/move")
+async def move_faq(faq_id: str, move: MoveRequest, current_user: dict = Depends(get_current_user)):
+    sort_order = await move_after("faqs", faq_id, move.after_id)
+    await invalidate("faqs")
+    return {"id": faq_id, "sort_order": sort_order}
+
+@router.put("/faqs/{faq_id}", response_model=FAQItem)
+async def update_faq(faq_id: str, faq_data: FAQItemCreate, current_user: dict = Depends(get_current_user)):
+    existing = await db.faqs.find_one({"id": faq_id})
+    if not existing:
+        raise HTTPException(status_code=404, detail="FAQ not found")
+
+    await db.faqs.update_one({"id": faq_id}, {"$set": faq_data.model_dump()})
+    await invalidate("faqs")
+    updated = await db.faqs.find_one({"id": faq_id}, {"_id": 0})
+    return updated
+
+@router.delete("/faqs/{faq_id}")
+async def delete_faq(faq_id: str, current_user: dict = Depends(get_current_user)):
+    result = await db.faqs.delete_one({"id": faq_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="FAQ not found")
+    await invalidate("faqs")
+    return {"message": "FAQ deleted"}
+
+# ==================== PAGE ROUTES ====================
+
+@public_router.get("/pages/{page_key}")
+async def get_page(page_key: str):
+    await config_store.ensure_loaded()
+    return json_bytes_response(config_store.page_body(page_key))
+
+@router.put("/pages/{page_key}")
+async def update_page(page_key: str, title: str, content: str, current_user: dict = Depends(get_current_user)):
+    page_data = {
+        "page_key": page_key,
+        "title": title,
+        "content": content,
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.pages.update_one({"page_key": page_key}, {"$set": page_data}, upsert=True)
+    await config_store.reload("pages")
+    await invalidate("pages")
+    return page_data
+
+# ==================== SOCIAL LINK ROUTES ====================
+
+@public_router.get("/social-links", response_model=List[SocialLink])
+async def get_social_links():
+    links = await read_db.social_links.find({}, {"_id": 0}).to_list(100)
+    return links
+
+@router.post("/social-links", response_model=SocialLink)
+async def create_social_link(link_data: SocialLinkCreate, current_user: dict = Depends(get_current_user)):
+    link = SocialLink(**link_data.model_dump())
+    await db.social_links.insert_one(link.model_dump())
+    await invalidate("social_links")
+    return link
+
+@router.put("/social-links/{link_id}", response_model=SocialLink)
+async def update_social_link(link_id: str, link_data: SocialLinkCreate, current_user: dict = Depends(get_current_user)):
+    existing = await db.social_links.find_one({"id": link_id})
+    if not existing:
+        raise HTTPException(status_code=404, detail="Social link not found")
+
+    await db.social_links.update_one({"id": link_id}, {"$set": link_data.model_dump()})
+    await invalidate("social_links")
+    updated = await db.social_links.find_one({"id": link_id}, {"_id": 0})
+    return updated
+
+@router.delete("/social-links/{link_id}")
+async def delete_social_link(link_id: str, current_user: dict = Depends(get_current_user)):
+    result = await db.social_links.delete_one({"id": link_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Social link not found")
+    await invalidate("social_links")
+    return {"message": "Social link deleted"}
+
+# ==================== PAYMENT METHODS ====================
+
+class PaymentMethod(BaseModel):
+    id: Optional[str] = None
+    name: str
+    image_url: str
+    is_active: bool = True
+    sort_order: int = 0
+
+@public_router.get("/payment-methods")
+async def get_payment_methods():
+    methods = await read_db.payment_methods.find({"is_active": True}).sort("sort_order", 1).to_list(100)
+    for m in methods:
+        m.pop("_id", None)
+    return methods
+
+@router.get("/payment-methods/all")
+async def get_all_payment_methods(current_user: dict = Depends(get_current_user)):
+    methods = await db.payment_methods.find().sort("sort_order", 1).to_list(100)
+    for m in methods:
+        m.pop("_id", None)
+    return methods
+
+@router.post("/payment-methods")
+async def create_payment_method(method: PaymentMethod, current_user: dict = Depends(get_current_user)):
+    method_dict = method.model_dump()
+    method_dict["id"] = str(uuid.uuid4())
+    await db.payment_methods.insert_one(method_dict)
+    await invalidate("payment_methods")
+    method_dict.pop("_id", None)
+    return method_dict
+
+@router.put("/payment-methods/{method_id}")
+async def update_payment_method(method_id: str, method: PaymentMethod, current_user: dict = Depends(get_current_user)):
+    method_dict = method.model_dump()
+    method_dict["id"] = method_id
+    await db.payment_methods.update_one({"id": method_id}, {"$set": method_dict})
+    await invalidate("payment_methods")
+    return method_dict
+
+@router.delete("/payment-methods/{method_id}")
+async def delete_payment_method(method_id: str, current_user: dict = Depends(get_current_user)):
+    await db.payment_methods.delete_one({"id": method_id})
+    await invalidate("payment_methods")
+    return {"message": "Payment method deleted"}
+
+# ==================== NOTIFICATION BAR ====================
+
+class NotificationBar(BaseModel):
+    id: Optional[str] = None
+    text: str
+    link: Optional[str] = None
+    is_active: bool = True
+    bg_color: Optional[str] = "#F5A623"
+    text_color: Optional[str] = "#000000"
+
+@public_router.get("/notification-bar")
+async def get_notification_bar():
+    await config_store.ensure_loaded()
+    return json_bytes_response(config_store.notification_body())
+
+@router.put("/notification-bar")
+async def update_notification_bar(notification: NotificationBar, current_user: dict = Depends(get_current_user)):
+    notification_dict = notification.model_dump()
+    notification_dict["id"] = "main"
+    await db.notification_bar.update_one({"id": "main"}, {"$set": notification_dict}, upsert=True)
+    await config_store.reload("notification_bar")
+    await invalidate("notification_bar")
+    return notification_dict
+
+# ==================== BLOG POSTS ====================
+
+class BlogPost(BaseModel):
+    id: Optional[str] = None
+    title: str
+    slug: Optional[str] = None
+    excerpt: str
+    content: str
+    image_url: Optional[str] = None
+    is_published: bool = True
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+# List cards never need the body, public post pages only need the rendered one
+BLOG_CARD_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "slug": 1, "excerpt": 1, "image_url": 1,
+    "reading_time_minutes": 1, "created_at": 1, "updated_at": 1,
+}
+BLOG_POST_PROJECTION = {"_id": 0, "content": 0}
+BLOG_POST_CACHE_SIZE = 256
+
+class BlogPostCache:
+    """Pre-encoded public post bodies keyed by slug, valid while updated_at matches"""
+
+    def __init__(self, max_entries: int = BLOG_POST_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, slug: str, updated_at: Optional[str]) -> Optional[bytes]:
+        entry = self._entries.get(slug)
+        if entry is None or entry[0] != updated_at:
+            return None
+        self._entries.move_to_end(slug)
+        return entry[1]
+
+    def put(self, slug: str, updated_at: Optional[str], body: bytes):
+        self._entries[slug] = (updated_at, body)
+        self._entries.move_to_end(slug)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+blog_post_cache = BlogPostCache()
+
+async def backfill_blog_rendering():
+    """Render posts saved before the write path precomputed their HTML"""
+    updates = []
+    async for post in db.blog_posts.find({"content_html": {"$exists": False}}, {"_id": 0, "id": 1, "content": 1, "excerpt": 1}):
+        updates.append(UpdateOne({"id": post["id"]}, {"$set": render_blog_content(post.get("content", ""), post.get("excerpt", ""))}))
+    if updates:
+        await db.blog_posts.bulk_write(updates, ordered=False)
+        logger.info(f"Rendered {len(updates)} blog posts")
+
+@public_router.get("/blog")
+async def get_blog_posts():
+    posts = await read_db.blog_posts.find({"is_published": True}, BLOG_CARD_PROJECTION).sort("created_at", -1).to_list(100)
+    return posts
+
+@router.get("/blog/all/admin")
+async def get_all_blog_posts(current_user: dict = Depends(get_current_user)):
+    posts = await db.blog_posts.find().sort("created_at", -1).to_list(100)
+    for p in posts:
+        p.pop("_id", None)
+    return posts
+
+@public_router.get("/blog/{slug}")
+async def get_blog_post(slug: str):
+    head = await read_db.blog_posts.find_one({"slug": slug, "is_published": True}, {"_id": 0, "updated_at": 1})
+    if not head:
+        raise HTTPException(status_code=404, detail="Blog post not found")
+
+    updated_at = head.get("updated_at")
+    body = blog_post_cache.get(slug, updated_at)
+    if body is None:
+        async def fetch():
+            post = await read_db.blog_posts.find_one({"slug": slug, "is_published": True}, BLOG_POST_PROJECTION)
+            if not post:
+                raise HTTPException(status_code=404, detail="Blog post not found")
+            encoded = cached_body(encode_json(post))
+            blog_post_cache.put(slug, post.get("updated_at"), encoded)
+            return encoded
+
+        body = await single_flight.do(flight_key("/blog", slug=slug, updated_at=updated_at), fetch)
+    return json_bytes_response(body)
+
+@router.post("/blog")
+async def create_blog_post(post: BlogPost, current_user: dict = Depends(get_current_user)):
+    post_dict = post.model_dump()
+    post_dict.update(render_blog_content(post.content, post.excerpt))
+    post_dict["id"] = str(uuid.uuid4())
+    post_dict["created_at"] = datetime.now(timezone.utc).isoformat()
+    post_dict["updated_at"] = post_dict["created_at"]
+
+    async def insert(slug):
+        post_dict["slug"] = slug
+        await db.blog_posts.insert_one(post_dict)
+        post_dict.pop("_id", None)
+
+    await write_with_unique_slug("blog_posts", post.slug or post.title, insert)
+    await invalidate("blog_posts")
+    post_dict.pop("_id", None)
+    return post_dict
+
+@router.put("/blog/{post_id}")
+async def update_blog_post(post_id: str, post: BlogPost, current_user: dict = Depends(get_current_user)):
+    existing = await db.blog_posts.find_one({"id": post_id}, {"_id": 0, "slug": 1, "title": 1})
+    if not existing:
+        raise HTTPException(status_code=404, detail="Blog post not found")
+
+    post_dict = post.model_dump()
+    post_dict.update(render_blog_content(post.content, post.excerpt))
+    post_dict["id"] = post_id
+    post_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+
+    async def update(slug):
+        post_dict["slug"] = slug
+        await db.blog_posts.update_one({"id": post_id}, {"$set": post_dict})
+
+    # An empty slug field keeps the stored slug while the title is unchanged
+    current_slug = unchanged_slug(existing, "slug", post.slug) if post.slug else unchanged_slug(existing, "title", post.title)
+    await write_with_unique_slug("blog_posts", post.slug or post.title, update, current_slug)
+    await invalidate("blog_posts")
+    return post_dict
+
+@router.delete("/blog/{post_id}")
+async def delete_blog_post(post_id: str, current_user: dict = Depends(get_current_user)):
+    await db.blog_posts.delete_one({"id": post_id})
+    await invalidate("blog_posts")
+    return {"message": "Blog post deleted"}
+
+# ==================== SITE SETTINGS ====================
+
+@public_router.get("/settings")
+async def get_site_settings():
+    await config_store.ensure_loaded()
+    return json_bytes_response(config_store.settings_body())
+
+@router.put("/settings")
+async def update_site_settings(settings: dict, current_user: dict = Depends(get_current_user)):
+    settings["id"] = "main"
+    await db.site_settings.update_one({"id": "main"}, {"$set": settings}, upsert=True)
+    await config_store.reload("site_settings")
+    await invalidate("site_settings")
+    return settings
+
+@public_router.get("/uploads/{filename}")
+async def get_uploaded_image(filename: str):
+    file_path = UPLOADS_DIR / filename
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(file_path)
+
+# Public reads are also served by the storefront-only app
+router.include_router(public_router)
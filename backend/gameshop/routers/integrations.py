@@ -0,0 +1,463 @@
+"""Trustpilot and Take.app integrations."""
+from fastapi import APIRouter, HTTPException, Depends
+import os
+import uuid
+from datetime import datetime, timezone
+import hashlib
+import json
+import time
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError
+
+from ..auth import get_current_user
+from ..cache import invalidate
+from ..core import database_for, logger
+from ..indexes import load_catalog_categories, products_changed
+from ..models import Product
+from ..ordering import allocate_sort_orders
+from ..scheduler import Job, scheduler
+from ..slugs import allocate_slugs, category_slug_text, write_with_unique_slug
+from .content import apply_review_stats_delta, merge_stats_delta, review_stats_delta
+
+router = APIRouter()
+
+# Primary unless READ_PREFERENCE_INTEGRATIONS says otherwise
+db = database_for("integrations")
+
+# ==================== TRUSTPILOT SYNC ====================
+
+TRUSTPILOT_DOMAIN = "gameshopnepal.com"
+TRUSTPILOT_API_KEY = os.environ.get("TRUSTPILOT_API_KEY", "")
+TRUSTPILOT_SITE_URL = os.environ.get("TRUSTPILOT_SITE_URL", "https://www.trustpilot.com")
+TRUSTPILOT_API_URL = os.environ.get("TRUSTPILOT_API_URL", "https://api.trustpilot.com")
+TRUSTPILOT_TIMEOUT_SECONDS = float(os.environ.get("TRUSTPILOT_TIMEOUT_SECONDS", "15"))
+
+async def get_trustpilot_business_unit_id(refresh: bool = False):
+    """Get the business unit ID from Trustpilot using the domain; refresh skips the cached one"""
+    import httpx
+
+    if not refresh:
+        cached = await db.trustpilot_config.find_one({"key": "business_unit_id"})
+        if cached and cached.get("value"):
+            return cached["value"]
+    
+    # Try to find business unit ID via API or scraping
+    async with httpx.AsyncClient() as client:
+        try:
+            # First try the public find endpoint (may need API key)
+            if TRUSTPILOT_API_KEY:
+                response = await client.get(
+                    f"{TRUSTPILOT_API_URL}/v1/business-units/find?name={TRUSTPILOT_DOMAIN}",
+                    headers={"apikey": TRUSTPILOT_API_KEY},
+                    timeout=TRUSTPILOT_TIMEOUT_SECONDS
+                )
+                if response.status_code == 200:
+                    data = response.json()
+                    buid = data.get("id")
+                    if buid:
+                        await db.trustpilot_config.update_one(
+                            {"key": "business_unit_id"},
+                            {"$set": {"key": "business_unit_id", "value": buid}},
+                            upsert=True
+                        )
+                        return buid
+        except Exception as e:
+            logger.error(f"Error getting business unit ID: {e}")
+    
+    return None
+
+async def fetch_trustpilot_reviews_from_page():
+    """Scrape reviews from Trustpilot page as fallback; raises 502/504 when the page cannot be fetched"""
+    import httpx
+    import re
+    import json
+
+    async with httpx.AsyncClient(timeout=TRUSTPILOT_TIMEOUT_SECONDS) as client:
+        try:
+            response = await client.get(
+                f"{TRUSTPILOT_SITE_URL}/review/{TRUSTPILOT_DOMAIN}",
+                headers={
+                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+                }
+            )
+        except httpx.TimeoutException:
+            raise HTTPException(status_code=504, detail="Trustpilot did not respond in time")
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=502, detail=f"Could not reach Trustpilot: {e}")
+    if response.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"Trustpilot returned {response.status_code}")
+
+    reviews = []
+    # Try to find JSON-LD data in the page
+    html = response.text
+    
+    # Look for review data in script tags
+    json_ld_pattern = r'<script type="application/ld\+json"[^>]*>(.*?)</script>'
+    matches = re.findall(json_ld_pattern, html, re.DOTALL)
+    
+    for match in matches:
+        try:
+            data = json.loads(match)
+            if isinstance(data, dict) and data.get("@type") == "LocalBusiness":
+                if "review" in data:
+                    for review in data["review"]:
+                        reviews.append({
+                            "reviewer_name": review.get("author", {}).get("name", "Anonymous"),
+                            "rating": int(review.get("reviewRating", {}).get("ratingValue", 5)),
+                            "comment": review.get("reviewBody", ""),
+                            "review_date": review.get("datePublished", datetime.now(timezone.utc).isoformat())
+                        })
+        except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+            continue
+    
+    # Also try to parse from __NEXT_DATA__
+    next_data_pattern = r'<script id="__NEXT_DATA__"[^>]*>(.*?)</script>'
+    next_matches = re.findall(next_data_pattern, html, re.DOTALL)
+    
+    for match in next_matches:
+        try:
+            data = json.loads(match)
+            props = data.get("props", {}).get("pageProps", {})
+            review_list = props.get("reviews", [])
+            
+            for review in review_list:
+                consumer = review.get("consumer", {})
+                # Get the published date from dates object
+                dates = review.get("dates", {})
+                published_date = dates.get("publishedDate") or dates.get("experiencedDate")
+                
+                reviews.append({
+                    "reviewer_name": consumer.get("displayName", "Anonymous"),
+                    "rating": review.get("rating", 5),
+                    "comment": review.get("text", review.get("title", "")),
+                    "review_date": published_date or datetime.now(timezone.utc).isoformat()
+                })
+        except (json.JSONDecodeError, AttributeError, TypeError):
+            continue
+    
+    return reviews
+
+async def sync_trustpilot() -> dict:
+    """Store Trustpilot reviews that are not in the database yet"""
+    synced_count = 0
+    stats_delta = {}
+
+    # Try scraping the Trustpilot page
+    trustpilot_reviews = await fetch_trustpilot_reviews_from_page()
+
+    for tp_review in trustpilot_reviews:
+        # Check if this review already exists (by reviewer name and comment)
+        existing = await db.reviews.find_one({
+            "reviewer_name": tp_review["reviewer_name"],
+            "comment": tp_review["comment"],
+            "source": "trustpilot"
+        })
+
+        if not existing:
+            review = {
+                "id": f"tp-{str(uuid.uuid4())[:8]}",
+                "reviewer_name": tp_review["reviewer_name"],
+                "rating": tp_review["rating"],
+                "comment": tp_review["comment"],
+                "review_date": tp_review["review_date"],
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "source": "trustpilot"
+            }
+            await db.reviews.insert_one(review)
+            merge_stats_delta(stats_delta, review_stats_delta(review))
+            synced_count += 1
+
+    if synced_count:
+        await apply_review_stats_delta(stats_delta)
+        await invalidate("reviews")
+
+    # Update last sync time
+    await db.trustpilot_config.update_one(
+        {"key": "last_sync"},
+        {"$set": {"key": "last_sync", "value": datetime.now(timezone.utc).isoformat()}},
+        upsert=True
+    )
+
+    return {
+        "success": True,
+        "synced_count": synced_count,
+        "total_found": len(trustpilot_reviews),
+        "message": f"Synced {synced_count} new reviews from Trustpilot"
+    }
+
+async def refresh_trustpilot_business_unit() -> dict:
+    return {"business_unit_id": await get_trustpilot_business_unit_id(refresh=True)}
+
+@router.post("/reviews/sync-trustpilot")
+async def sync_trustpilot_reviews(current_user: dict = Depends(get_current_user)):
+    """Sync reviews from Trustpilot to the database"""
+    try:
+        return await sync_trustpilot()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error syncing Trustpilot reviews: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to sync reviews: {str(e)}")
+
+@router.get("/reviews/trustpilot-status")
+async def get_trustpilot_status(current_user: dict = Depends(get_current_user)):
+    """Get Trustpilot sync status"""
+    last_sync = await db.trustpilot_config.find_one({"key": "last_sync"})
+    tp_review_count = await db.reviews.count_documents({"source": "trustpilot"})
+    
+    return {
+        "domain": TRUSTPILOT_DOMAIN,
+        "last_sync": last_sync.get("value") if last_sync else None,
+        "trustpilot_reviews_count": tp_review_count,
+        "api_key_configured": bool(TRUSTPILOT_API_KEY)
+    }
+
+# ==================== TAKE.APP INTEGRATION ====================
+
+TAKEAPP_API_KEY = os.environ.get("TAKEAPP_API_KEY", "")
+TAKEAPP_BASE_URL = os.environ.get("TAKEAPP_BASE_URL", "https://take.app/api/platform")
+TAKEAPP_SYNC_CATEGORY_ID = os.environ.get("TAKEAPP_SYNC_CATEGORY_ID", "takeapp")
+TAKEAPP_SYNC_CATEGORY_NAME = os.environ.get("TAKEAPP_SYNC_CATEGORY_NAME", "Take.app")
+TAKEAPP_TIMEOUT_SECONDS = float(os.environ.get("TAKEAPP_TIMEOUT_SECONDS", "30"))
+# Share of the synced products one sync may delete; more looks like an empty or truncated inventory
+TAKEAPP_SYNC_MAX_REMOVED_FRACTION = float(os.environ.get("TAKEAPP_SYNC_MAX_REMOVED_FRACTION", "0.25"))
+
+async def takeapp_get(path: str, error_detail: str):
+    """GET a Take.app endpoint; raises 504 on timeout, 502 when unreachable and Take.app's status otherwise"""
+    import httpx
+
+    async with httpx.AsyncClient(timeout=TAKEAPP_TIMEOUT_SECONDS) as client:
+        try:
+            response = await client.get(f"{TAKEAPP_BASE_URL}{path}", params={"api_key": TAKEAPP_API_KEY})
+        except httpx.TimeoutException:
+            raise HTTPException(status_code=504, detail=f"{error_detail}: Take.app did not respond in time")
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=502, detail=f"{error_detail}: {e}")
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail=error_detail)
+    return response.json()
+
+@router.get("/takeapp/store")
+async def get_takeapp_store(current_user: dict = Depends(get_current_user)):
+    if not TAKEAPP_API_KEY:
+        raise HTTPException(status_code=400, detail="Take.app API key not configured")
+
+    return await takeapp_get("/me", "Failed to fetch store info")
+
+@router.get("/takeapp/orders")
+async def get_takeapp_orders(current_user: dict = Depends(get_current_user)):
+    if not TAKEAPP_API_KEY:
+        raise HTTPException(status_code=400, detail="Take.app API key not configured")
+
+    return await fetch_takeapp_orders()
+
+async def fetch_takeapp_orders() -> list:
+    """Fetch Take.app orders and upsert them into takeapp_orders"""
+    orders = await takeapp_get("/orders", "Failed to fetch orders")
+    if orders:
+        await db.takeapp_orders.bulk_write([
+            UpdateOne({"id": order["id"]}, {"$set": order}, upsert=True) for order in orders
+        ], ordered=False)
+    return orders
+
+async def sync_takeapp_orders() -> dict:
+    orders = await fetch_takeapp_orders()
+    return {"fetched": len(orders)}
+
+@router.get("/takeapp/inventory")
+async def get_takeapp_inventory(current_user: dict = Depends(get_current_user)):
+    if not TAKEAPP_API_KEY:
+        raise HTTPException(status_code=400, detail="Take.app API key not configured")
+
+    return await fetch_takeapp_inventory()
+
+async def fetch_takeapp_inventory() -> list:
+    return await takeapp_get("/inventory", "Failed to fetch inventory")
+
+def takeapp_item_to_product_fields(item: dict) -> dict:
+    """Map a Take.app inventory item onto the product fields the sync owns"""
+    variants = item.get("variants") or [item]
+    images = item.get("images") or []
+    variations = []
+    for variant in variants:
+        original_price = variant.get("original_price", variant.get("compare_at_price"))
+        variations.append({
+            "id": f"takeapp-{variant.get('id', item['id'])}",
+            "name": variant.get("name") if variant is not item else "Default",
+            "price": float(variant.get("price") or 0),
+            "original_price": float(original_price) if original_price is not None else None,
+            "description": None
+        })
+    quantity = item.get("quantity")
+    return {
+        "name": item.get("name", ""),
+        "description": item.get("description") or "",
+        "image_url": item.get("image_url") or item.get("image") or (images[0] if images else ""),
+        "variations": variations,
+        "is_sold_out": quantity is not None and quantity <= 0
+    }
+
+def content_hash(fields: dict) -> str:
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+async def ensure_takeapp_category():
+    """Create the category synced products are added to, unless it exists"""
+    if await db.categories.find_one({"id": TAKEAPP_SYNC_CATEGORY_ID}, {"_id": 1}):
+        return
+
+    async def insert(slug):
+        # $setOnInsert, so a concurrent sync that created it first wins
+        await db.categories.update_one(
+            {"id": TAKEAPP_SYNC_CATEGORY_ID},
+            {"$setOnInsert": {"id": TAKEAPP_SYNC_CATEGORY_ID, "name": TAKEAPP_SYNC_CATEGORY_NAME, "slug": slug}},
+            upsert=True
+        )
+
+    await write_with_unique_slug("categories", category_slug_text(TAKEAPP_SYNC_CATEGORY_NAME), insert)
+    await load_catalog_categories()
+    await invalidate("categories")
+
+@router.post("/takeapp/sync-products")
+async def sync_takeapp_products(allow_mass_removal: bool = False, current_user: dict = Depends(get_current_user)):
+    """Diff Take.app inventory against local products and apply only the changes.
+
+    Products missing from the inventory are deleted, unless the inventory is
+    empty or more than TAKEAPP_SYNC_MAX_REMOVED_FRACTION of them would go;
+    allow_mass_removal confirms such a removal. Items without an id, or whose
+    fields cannot be read, are skipped and counted.
+    """
+    if not TAKEAPP_API_KEY:
+        raise HTTPException(status_code=400, detail="Take.app API key not configured")
+
+    started = time.perf_counter()
+    inventory = await fetch_takeapp_inventory()
+    fetched = time.perf_counter()
+
+    local = {
+        p["takeapp_id"]: p
+        for p in await db.products.find(
+            {"takeapp_id": {"$exists": True}}, {"_id": 0, "id": 1, "takeapp_id": 1, "takeapp_hash": 1}
+        ).to_list(None)
+    }
+    operations = []
+    new_products = []
+    added = updated = 0
+    malformed = []
+    seen = set()
+    for item in inventory:
+        if not isinstance(item, dict) or item.get("id") in (None, ""):
+            malformed.append(item)
+            continue
+        takeapp_id = str(item["id"])
+        # Seen even when unreadable, so a bad item never deletes the product synced from it
+        seen.add(takeapp_id)
+        try:
+            fields = takeapp_item_to_product_fields(item)
+        except (TypeError, ValueError, AttributeError):
+            malformed.append(item)
+            continue
+        digest = content_hash(fields)
+        existing = local.get(takeapp_id)
+        if existing is None:
+            product = Product(**fields, slug="", category_id=TAKEAPP_SYNC_CATEGORY_ID).model_dump()
+            product.update({"takeapp_id": takeapp_id, "takeapp_hash": digest})
+            new_products.append(product)
+            added += 1
+        elif existing.get("takeapp_hash") != digest:
+            update_fields = {**fields, "takeapp_hash": digest}
+            operations.append(UpdateOne({"id": existing["id"]}, {"$set": update_fields}))
+            updated += 1
+
+    if new_products:
+        await ensure_takeapp_category()
+    slugs = await allocate_slugs("products", [product["name"] for product in new_products])
+    sort_orders = await allocate_sort_orders("products", len(new_products))
+    inserts = {}
+    for product, slug, sort_order in zip(new_products, slugs, sort_orders):
+        product["slug"] = slug
+        product["sort_order"] = sort_order
+        inserts[len(operations)] = product
+        operations.append(InsertOne(product))
+
+    removed_ids = [takeapp_id for takeapp_id in local if takeapp_id not in seen]
+    removal_skipped = 0
+    if removed_ids and not allow_mass_removal and (
+        not inventory or len(removed_ids) > len(local) * TAKEAPP_SYNC_MAX_REMOVED_FRACTION
+    ):
+        logger.warning(
+            f"Take.app sync would remove {len(removed_ids)} of {len(local)} synced products "
+            f"from an inventory of {len(inventory)} items; keeping them"
+        )
+        removal_skipped = len(removed_ids)
+        removed_ids = []
+    for takeapp_id in removed_ids:
+        operations.append(DeleteOne({"id": local[takeapp_id]["id"]}))
+    diffed = time.perf_counter()
+
+    failed = []
+    if operations:
+        try:
+            retry = []
+            try:
+                await db.products.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get("writeErrors", []):
+                    product = inserts.get(write_error["index"])
+                    if product and write_error.get("code") == 11000 and "slug" in write_error.get("errmsg", ""):
+                        retry.append(product)
+                    else:
+                        failed.append(write_error.get("errmsg", "Write failed"))
+            # Slug taken by a product the counters do not know about: allocate one at a time
+            for product in retry:
+                async def insert(slug, product=product):
+                    product["slug"] = slug
+                    await db.products.insert_one(product)
+
+                try:
+                    await write_with_unique_slug("products", product["name"], insert)
+                except HTTPException as e:
+                    failed.append(f"{product['takeapp_id']}: {e.detail}")
+        finally:
+            # Whatever part of the batch was written must reach the indexes
+            await products_changed()
+    finished = time.perf_counter()
+
+    if malformed:
+        logger.warning(f"Take.app sync skipped {len(malformed)} malformed inventory items: {malformed[:3]}")
+    if failed:
+        logger.warning(f"Take.app sync failed to write {len(failed)} products: {failed[:5]}")
+    return {
+        "success": not failed,
+        "total_items": len(inventory),
+        "added": added,
+        "updated": updated,
+        "removed": len(removed_ids),
+        "removal_skipped": removal_skipped,
+        "unchanged": len(inventory) - added - updated - len(malformed),
+        "skipped": len(malformed),
+        "writes": len(operations),
+        "failed": len(failed),
+        "timing_ms": {
+            "fetch": round((fetched - started) * 1000, 1),
+            "diff": round((diffed - fetched) * 1000, 1),
+            "write": round((finished - diffed) * 1000, 1),
+            "total": round((finished - started) * 1000, 1)
+        }
+    }
+
+# ==================== SCHEDULED JOBS ====================
+
+scheduler.add_job(Job(
+    "trustpilot_reviews", sync_trustpilot, "every 6h",
+    description="Import new Trustpilot reviews"
+))
+if TRUSTPILOT_API_KEY:
+    scheduler.add_job(Job(
+        "trustpilot_business_unit", refresh_trustpilot_business_unit, "0 3 * * *",
+        description="Refresh the cached Trustpilot business unit id"
+    ))
+if TAKEAPP_API_KEY:
+    scheduler.add_job(Job(
+        "takeapp_orders", sync_takeapp_orders, "every 10m",
+        description="Fetch Take.app orders into takeapp_orders"
+    ))
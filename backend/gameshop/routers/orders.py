@@ -0,0 +1,578 @@
+"""Order placement, payment screenshots, order admin, promo codes and cart quotes."""
+from fastapi import APIRouter, HTTPException, Depends, Request, Header
+from fastapi.responses import Response, StreamingResponse
+import os
+from pathlib import Path
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional, Dict, Callable, Awaitable
+import uuid
+from datetime import datetime, timedelta, timezone
+import hashlib
+import asyncio
+import time
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from collections import OrderedDict
+
+from ..auth import STREAM_TOKEN_EXPIRATION_SECONDS, create_stream_token, get_current_user, get_stream_user
+from ..cache import invalidate
+from ..core import UPLOADS_DIR, database_for, logger
+from ..models import PromoCode, PromoCodeCreate
+from ..order_feed import order_feed
+from ..pricing import (
+    CartItem, CartQuoteRequest, calculate_promo_discount, price_cart, promo_code_cache, release_promo_use,
+    reserve_promo_use,
+)
+from ..uploads import (
+    ALLOWED_IMAGE_TYPES, MAX_SCREENSHOT_BYTES, compress_screenshot, get_image_pool, receive_multipart_file,
+)
+from .integrations import TAKEAPP_API_KEY, TAKEAPP_BASE_URL
+
+router = APIRouter()
+
+# Primary unless READ_PREFERENCE_ORDERS says otherwise
+db = database_for("orders")
+
+# Order creation models
+class OrderItem(BaseModel):
+    name: str
+    price: float
+    quantity: int = Field(default=1, ge=1)
+    variation: Optional[str] = None
+    variation_id: Optional[str] = None
+
+class CreateOrderRequest(BaseModel):
+    customer_name: str
+    customer_phone: str
+    customer_email: Optional[str] = None
+    items: List[OrderItem]
+    total_amount: float
+    promo_code: Optional[str] = None
+    remark: Optional[str] = None
+
+TAKEAPP_STORE_ALIAS = "gsn"
+
+# ==================== IDEMPOTENCY ====================
+
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60)))
+IDEMPOTENCY_LRU_SIZE = 2048
+IDEMPOTENCY_WAIT_SECONDS = 20
+# A claim older than this belongs to a worker that died mid-request; a retry may take it over
+IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS = int(os.environ.get("IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS", "60"))
+
+class IdempotencyStore:
+    """Stores responses by Idempotency-Key so client retries replay instead of re-running"""
+
+    def __init__(self, database, capacity: int = IDEMPOTENCY_LRU_SIZE):
+        self._db = database
+        self._capacity = capacity
+        self._recent: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _remember(self, key: str, fingerprint: str, response: dict):
+        self._recent[key] = (fingerprint, response)
+        self._recent.move_to_end(key)
+        while len(self._recent) > self._capacity:
+            self._recent.popitem(last=False)
+
+    @staticmethod
+    def _check_fingerprint(stored: str, fingerprint: str):
+        if stored != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+
+    async def run(self, key: str, fingerprint: str, compute: Callable[[], Awaitable[dict]]) -> tuple:
+        """Return (response, replayed); concurrent duplicates share one computation"""
+        recent = self._recent.get(key)
+        if recent:
+            self._check_fingerprint(recent[0], fingerprint)
+            self._recent.move_to_end(key)
+            return recent[1], True
+
+        inflight = self._inflight.get(key)
+        if inflight:
+            stored_fingerprint, response = await asyncio.shield(inflight)
+            self._check_fingerprint(stored_fingerprint, fingerprint)
+            return response, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            stored_fingerprint, response, replayed = await self._claim_and_compute(key, fingerprint, compute)
+            self._remember(key, stored_fingerprint, response)
+            future.set_result((stored_fingerprint, response))
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure is not logged as never retrieved
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self._check_fingerprint(stored_fingerprint, fingerprint)
+        return response, replayed
+
+    async def _claim(self, key: str, fingerprint: str) -> Optional[str]:
+        """Claim the key for this request, or take over a stale claim; returns the claim id"""
+        claim_id = uuid.uuid4().hex
+        now = datetime.now(timezone.utc)
+        try:
+            # The unique index makes the claim atomic across workers
+            await self._db.idempotency_keys.insert_one({
+                "key": key,
+                "fingerprint": fingerprint,
+                "state": "in_progress",
+                "claim_id": claim_id,
+                "claimed_at": now,
+                "created_at": now
+            })
+            return claim_id
+        except DuplicateKeyError:
+            pass
+        taken = await self._db.idempotency_keys.find_one_and_update(
+            {
+                "key": key,
+                "fingerprint": fingerprint,
+                "state": "in_progress",
+                "claimed_at": {"$lt": now - timedelta(seconds=IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS)}
+            },
+            {"$set": {"claim_id": claim_id, "claimed_at": now}}
+        )
+        return claim_id if taken else None
+
+    async def _claim_and_compute(self, key: str, fingerprint: str, compute) -> tuple:
+        claim_id = await self._claim(key, fingerprint)
+        if claim_id is None:
+            stored = await self._wait_for_completion(key)
+            return stored["fingerprint"], stored["response"], True
+
+        try:
+            response = await compute()
+        except BaseException:
+            await self._db.idempotency_keys.delete_one({"key": key, "state": "in_progress", "claim_id": claim_id})
+            raise
+        await self._db.idempotency_keys.update_one(
+            {"key": key},
+            {"$set": {"state": "completed", "response": response}}
+        )
+        return fingerprint, response, False
+
+    async def _wait_for_completion(self, key: str) -> dict:
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            stored = await self._db.idempotency_keys.find_one({"key": key}, {"_id": 0})
+            if stored is None:
+                raise HTTPException(status_code=409, detail="Previous request with this Idempotency-Key failed, please retry")
+            if stored.get("state") == "completed":
+                return stored
+            await asyncio.sleep(0.1)
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
+idempotency_store = IdempotencyStore(db)
+
+@router.post("/orders/create")
+async def create_order(
+    order_data: CreateOrderRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    if not idempotency_key:
+        return await place_order(order_data)
+
+    fingerprint = hashlib.sha256(order_data.model_dump_json().encode()).hexdigest()
+    result, replayed = await idempotency_store.run(
+        f"orders/create:{idempotency_key}", fingerprint, lambda: place_order(order_data)
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+async def place_order(order_data: CreateOrderRequest) -> dict:
+    # Always price server-side; the client's prices and total are ignored
+    if not order_data.items:
+        raise HTTPException(status_code=400, detail="Order has no items")
+    missing = [item.name for item in order_data.items if not item.variation_id]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Items need a product variation: {', '.join(missing)}")
+    cart_items = [CartItem(variation_id=item.variation_id, quantity=item.quantity) for item in order_data.items]
+    pricing = await price_cart(cart_items, order_data.promo_code)
+    for item, line in zip(order_data.items, pricing["items"]):
+        item.price = line["price"]
+    order_data.total_amount = pricing["total"]
+
+    # Take the promo use before the order exists, so concurrent orders cannot go over max_uses
+    if pricing["promo_code"]:
+        await reserve_promo_use(pricing["promo_code"])
+    try:
+        return await submit_order(order_data, pricing)
+    except BaseException:
+        if pricing["promo_code"]:
+            await release_promo_use(pricing["promo_code"])
+        raise
+
+async def submit_order(order_data: CreateOrderRequest, pricing: dict) -> dict:
+    """Create the Take.app order when configured and store the order locally"""
+    import httpx
+
+    order_id = str(uuid.uuid4())
+
+    def format_phone_number(phone):
+        phone = ''.join(filter(str.isdigit, phone))
+        if phone.startswith('0'):
+            phone = phone[1:]
+        if not phone.startswith('977') and len(phone) == 10:
+            phone = '977' + phone
+        return phone
+
+    formatted_phone = format_phone_number(order_data.customer_phone)
+
+    items_text = ", ".join([f"{item.quantity}x {item.name}" + (f" ({item.variation})" if item.variation else "") for item in order_data.items])
+    full_remark = f"Items: {items_text}"
+    if order_data.remark:
+        full_remark += f"\nNote: {order_data.remark}"
+
+    total_amount_rupees = str(int(order_data.total_amount))
+
+    takeapp_order_id = None
+    takeapp_order_number = None
+    payment_url = None
+
+    # Try Take.app integration if API key is configured
+    if TAKEAPP_API_KEY:
+        try:
+            async with httpx.AsyncClient() as client:
+                takeapp_payload = {
+                    "customer_name": order_data.customer_name,
+                    "customer_phone": formatted_phone,
+                    "total_amount": total_amount_rupees,
+                    "remark": full_remark
+                }
+                # Only include email if provided
+                if order_data.customer_email:
+                    takeapp_payload["customer_email"] = order_data.customer_email
+
+                logger.info(f"Creating Take.app order: {takeapp_payload}")
+
+                response = await client.post(
+                    f"{TAKEAPP_BASE_URL}/orders?api_key={TAKEAPP_API_KEY}",
+                    json=takeapp_payload,
+                    timeout=15.0
+                )
+
+                logger.info(f"Take.app response: {response.status_code} - {response.text}")
+
+                if response.status_code in [200, 201]:
+                    takeapp_result = response.json()
+                    takeapp_order_id = takeapp_result.get("id")
+                    takeapp_order_number = takeapp_result.get("number")
+                    payment_url = f"https://take.app/{TAKEAPP_STORE_ALIAS}/orders/{takeapp_order_id}/pay"
+                else:
+                    logger.warning(f"Take.app order creation failed: {response.status_code} - {response.text}")
+                    # Continue without Take.app - order will be saved locally
+        except Exception as e:
+            logger.warning(f"Take.app integration failed, saving order locally: {e}")
+            # Continue without Take.app - order will be saved locally
+
+    # Generate WhatsApp contact URL as fallback when Take.app is not configured
+    whatsapp_number = "9779743488871"  # GameShop Nepal WhatsApp
+    
+    # Use WhatsApp URL as fallback payment method if Take.app is not available
+    if not payment_url:
+        import urllib.parse
+        whatsapp_message = f"Hi! I'd like to place an order:\n\n{items_text}\n\nTotal: Rs {total_amount_rupees}\n\nName: {order_data.customer_name}\nPhone: {order_data.customer_phone}"
+        if order_data.remark:
+            whatsapp_message += f"\nNote: {order_data.remark}"
+        encoded_message = urllib.parse.quote(whatsapp_message)
+        payment_url = f"https://wa.me/{whatsapp_number}?text={encoded_message}"
+
+    local_order = {
+        "id": order_id,
+        "takeapp_order_id": takeapp_order_id,
+        "takeapp_order_number": takeapp_order_number,
+        "customer_name": order_data.customer_name,
+        "customer_phone": order_data.customer_phone,
+        "customer_email": order_data.customer_email,
+        "items": [item.model_dump() for item in order_data.items],
+        "total_amount": order_data.total_amount,
+        "pricing": pricing,
+        "remark": order_data.remark,
+        "items_text": items_text,
+        "status": "pending",
+        "status_history": [],
+        "payment_screenshot": None,
+        "payment_url": payment_url,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+
+    await db.orders.insert_one(local_order)
+    await order_feed.publish([order_id], "insert")
+
+    message = "Order created successfully"
+    if takeapp_order_id:
+        message += " on Take.app"
+    else:
+        message += ". Contact us via WhatsApp to complete payment."
+
+    return {
+        "success": True,
+        "order_id": order_id,
+        "takeapp_order_id": takeapp_order_id,
+        "takeapp_order_number": takeapp_order_number,
+        "payment_url": payment_url,
+        "message": message
+    }
+
+class PaymentScreenshotRequest(BaseModel):
+    screenshot_url: str
+
+def payment_submittable_statuses() -> List[str]:
+    return [status for status, allowed in ORDER_STATUS_TRANSITIONS.items() if "payment_submitted" in allowed]
+
+async def check_payment_submittable(order_id: str):
+    order = await db.orders.find_one({"id": order_id}, {"_id": 0, "status": 1})
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order.get("status", "pending") not in payment_submittable_statuses():
+        raise HTTPException(status_code=409, detail=f"Cannot submit payment for an order that is {order.get('status')}")
+
+@router.post("/orders/{order_id}/payment-screenshot")
+async def upload_payment_screenshot(order_id: str, request: Request):
+    """Attach a payment screenshot, either as a multipart file or an already uploaded URL"""
+    await check_payment_submittable(order_id)
+    uploaded_path = None
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        uploaded_path = UPLOADS_DIR / f"{uuid.uuid4()}.upload"
+        content_type = await receive_multipart_file(request, "file", uploaded_path, MAX_SCREENSHOT_BYTES)
+        if content_type not in ALLOWED_IMAGE_TYPES:
+            uploaded_path.unlink(missing_ok=True)
+            raise HTTPException(status_code=400, detail="Invalid file type. Only JPEG, PNG, WebP, GIF allowed.")
+        source_path = uploaded_path
+    else:
+        try:
+            screenshot_url = PaymentScreenshotRequest.model_validate_json(await request.body()).screenshot_url
+        except ValidationError:
+            raise HTTPException(status_code=422, detail="Expected a JSON body with screenshot_url, or a multipart file")
+        if not screenshot_url.startswith("/api/uploads/"):
+            raise HTTPException(status_code=400, detail="screenshot_url must point to an uploaded image")
+        source_path = UPLOADS_DIR / Path(screenshot_url).name
+        if not source_path.exists():
+            raise HTTPException(status_code=404, detail="Image not found")
+
+    try:
+        loop = asyncio.get_running_loop()
+        full_name, thumb_name = await loop.run_in_executor(get_image_pool(), compress_screenshot, str(source_path), str(uuid.uuid4()))
+    except Exception as e:
+        logger.warning(f"Failed to process payment screenshot for order {order_id}: {e}")
+        raise HTTPException(status_code=400, detail="Invalid image")
+    finally:
+        if uploaded_path:
+            uploaded_path.unlink(missing_ok=True)
+
+    now = datetime.now(timezone.utc).isoformat()
+    screenshot = {
+        "payment_screenshot": f"/api/uploads/{full_name}",
+        "payment_screenshot_thumbnail": f"/api/uploads/{thumb_name}",
+    }
+    # The status filter keeps the transition valid if the order changed while the image was processed
+    result = await db.orders.update_one(
+        {"id": order_id, "status": {"$in": payment_submittable_statuses()}},
+        {
+            "$set": {**screenshot, "status": "payment_submitted", "payment_submitted_at": now},
+            "$push": {"status_history": {"to": "payment_submitted", "at": now, "by": "customer"}}
+        }
+    )
+    if not result.matched_count:
+        (UPLOADS_DIR / full_name).unlink(missing_ok=True)
+        (UPLOADS_DIR / thumb_name).unlink(missing_ok=True)
+        await check_payment_submittable(order_id)
+        raise HTTPException(status_code=409, detail="Order changed, please retry")
+    await order_feed.publish([order_id])
+
+    return {
+        "success": True,
+        "order_id": order_id,
+        "status": "payment_submitted",
+        **screenshot
+    }
+
+@router.get("/orders")
+async def get_local_orders(status: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    query = {"status": status} if status else {}
+    orders = await db.orders.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
+    return orders
+
+@router.post("/orders/stream/token")
+async def issue_stream_token(current_user: dict = Depends(get_current_user)):
+    """Short-lived token for ?token= on /orders/stream, so the admin token never goes in a URL"""
+    return {"token": create_stream_token(current_user["id"]), "expires_in": STREAM_TOKEN_EXPIRATION_SECONDS}
+
+@router.get("/orders/stream")
+async def stream_orders(request: Request, last_event_id: Optional[str] = None,
+                        current_user: dict = Depends(get_stream_user)):
+    """Server-sent events with each new or changed order; load /orders once, then follow this.
+
+    Authenticate with the Authorization header or, from EventSource, with a
+    token from /orders/stream/token in ?token=; it is checked when connecting.
+
+    EventSource resends the last id it saw in Last-Event-ID when it reconnects,
+    and missed events are replayed. An event named reset means they could not
+    be, and the list should be reloaded.
+
+    With the default local order feed this only carries orders written by the
+    worker serving the stream; set ORDER_FEED_BACKEND=changestream to see the
+    writes of every worker.
+    """
+    return StreamingResponse(
+        order_feed.stream(request.headers.get("last-event-id") or last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Allowed order status transitions
+ORDER_STATUS_TRANSITIONS = {
+    "pending": {"payment_submitted", "confirmed", "cancelled"},
+    "payment_submitted": {"pending", "confirmed", "cancelled"},
+    "confirmed": {"processing", "completed", "cancelled"},
+    "processing": {"completed", "cancelled"},
+    "completed": {"refunded"},
+    "cancelled": set(),
+    "refunded": set()
+}
+
+class OrderStatusChange(BaseModel):
+    order_id: str
+    status: str
+    note: Optional[str] = None
+
+class BulkOrderStatusUpdate(BaseModel):
+    updates: List[OrderStatusChange]
+
+@router.patch("/orders/status")
+async def update_order_statuses(update_data: BulkOrderStatusUpdate, current_user: dict = Depends(get_current_user)):
+    """Validate many status changes against the state machine and apply them in one bulk_write"""
+    if not update_data.updates:
+        raise HTTPException(status_code=400, detail="No status updates provided")
+
+    order_ids = list({change.order_id for change in update_data.updates})
+    current = {
+        o["id"]: o.get("status", "pending")
+        for o in await db.orders.find({"id": {"$in": order_ids}}, {"_id": 0, "id": 1, "status": 1}).to_list(None)
+    }
+
+    now = datetime.now(timezone.utc).isoformat()
+    operations = []
+    errors = []
+    changed_ids = set()
+    for change in update_data.updates:
+        from_status = current.get(change.order_id)
+        if from_status is None:
+            errors.append({"order_id": change.order_id, "error": "Order not found"})
+            continue
+        if change.status not in ORDER_STATUS_TRANSITIONS:
+            errors.append({"order_id": change.order_id, "error": f"Unknown status '{change.status}'"})
+            continue
+        if change.status not in ORDER_STATUS_TRANSITIONS.get(from_status, set()):
+            errors.append({"order_id": change.order_id, "error": f"Cannot change status from '{from_status}' to '{change.status}'"})
+            continue
+        # Later changes to the same order in this batch chain from the new status
+        current[change.order_id] = change.status
+        changed_ids.add(change.order_id)
+        operations.append(UpdateOne(
+            {"id": change.order_id, "status": from_status},
+            {
+                "$set": {"status": change.status, "updated_at": now},
+                "$push": {"status_history": {
+                    "from": from_status,
+                    "to": change.status,
+                    "at": now,
+                    "by": current_user["id"],
+                    "note": change.note
+                }}
+            }
+        ))
+
+    modified = 0
+    if operations:
+        # Ordered so that chained changes to one order apply in sequence
+        result = await db.orders.bulk_write(operations, ordered=True)
+        modified = result.modified_count
+        if modified:
+            await order_feed.publish(list(changed_ids))
+
+    return {
+        "success": not errors and modified == len(operations),
+        "updated": modified,
+        "conflicts": len(operations) - modified,
+        "errors": errors
+    }
+
+# ==================== PROMO CODES ====================
+
+@router.get("/promo-codes")
+async def get_promo_codes(current_user: dict = Depends(get_current_user)):
+    codes = await db.promo_codes.find().sort("created_at", -1).to_list(100)
+    for c in codes:
+        c.pop("_id", None)
+    return codes
+
+@router.post("/promo-codes")
+async def create_promo_code(code_data: PromoCodeCreate, current_user: dict = Depends(get_current_user)):
+    # Check if code already exists
+    existing = await db.promo_codes.find_one({"code": code_data.code.upper()})
+    if existing:
+        raise HTTPException(status_code=400, detail="Promo code already exists")
+    
+    code = PromoCode(
+        code=code_data.code.upper(),
+        discount_type=code_data.discount_type,
+        discount_value=code_data.discount_value,
+        min_order_amount=code_data.min_order_amount,
+        max_uses=code_data.max_uses,
+        is_active=code_data.is_active
+    )
+    await db.promo_codes.insert_one(code.model_dump())
+    await promo_code_cache.reload()
+    await invalidate("promo_codes")
+    result = code.model_dump()
+    result.pop("_id", None)
+    return result
+
+@router.put("/promo-codes/{code_id}")
+async def update_promo_code(code_id: str, code_data: PromoCodeCreate, current_user: dict = Depends(get_current_user)):
+    existing = await db.promo_codes.find_one({"id": code_id})
+    if not existing:
+        raise HTTPException(status_code=404, detail="Promo code not found")
+    
+    update_data = code_data.model_dump()
+    update_data["code"] = update_data["code"].upper()
+    await db.promo_codes.update_one({"id": code_id}, {"$set": update_data})
+    await promo_code_cache.reload()
+    await invalidate("promo_codes")
+    updated = await db.promo_codes.find_one({"id": code_id}, {"_id": 0})
+    return updated
+
+@router.delete("/promo-codes/{code_id}")
+async def delete_promo_code(code_id: str, current_user: dict = Depends(get_current_user)):
+    result = await db.promo_codes.delete_one({"id": code_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Promo code not found")
+    await promo_code_cache.reload()
+    await invalidate("promo_codes")
+    return {"message": "Promo code deleted"}
+
+@router.post("/promo-codes/validate")
+async def validate_promo_code(code: str, subtotal: float):
+    """Validate a promo code and return discount info"""
+    promo = await promo_code_cache.get(code)
+    discount = calculate_promo_discount(promo, subtotal)
+    return {
+        "valid": True,
+        "code": promo["code"],
+        "discount_type": promo["discount_type"],
+        "discount_value": promo["discount_value"],
+        "discount_amount": round(discount, 2)
+    }
+
+@router.post("/cart/quote")
+async def quote_cart(quote_request: CartQuoteRequest):
+    if not quote_request.items:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+    return await price_cart(quote_request.items, quote_request.promo_code)
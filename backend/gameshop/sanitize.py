@@ -0,0 +1,144 @@
+"""Allowlist HTML sanitizer for stored rich text: blog posts, CMS pages and product descriptions."""
+import math
+import re
+from html import escape
+from html.parser import HTMLParser
+from typing import List
+
+from .slugs import generate_slug
+
+BLOG_ALLOWED_TAGS = {
+    "p", "br", "hr", "h1", "h2", "h3", "h4", "h5", "h6", "strong", "b", "em", "i", "u", "s", "sub", "sup",
+    "a", "ul", "ol", "li", "blockquote", "code", "pre", "img", "span", "div", "figure", "figcaption",
+    "table", "thead", "tbody", "tr", "th", "td",
+}
+BLOG_VOID_TAGS = {"br", "hr", "img"}
+BLOG_INLINE_TAGS = {"strong", "b", "em", "i", "u", "s", "sub", "sup", "a", "span", "code"}
+BLOG_DROPPED_TAGS = {"script", "style", "iframe", "object", "embed", "noscript", "template"}
+BLOG_ALLOWED_ATTRS = {
+    "*": {"class", "title"},
+    "a": {"href", "target", "rel"},
+    "img": {"src", "alt", "width", "height"},
+    "th": {"colspan", "rowspan"},
+    "td": {"colspan", "rowspan"},
+}
+BLOG_URL_ATTRS = {"href", "src"}
+BLOG_SAFE_URL_RE = re.compile(r"^(https?:|mailto:|tel:|/|#|\.|[^:]*$)", re.IGNORECASE)
+BLOG_TOC_TAGS = {"h2", "h3"}
+BLOG_WORDS_PER_MINUTE = 200
+BLOG_EXCERPT_LENGTH = 160
+
+class BlogHTMLRenderer(HTMLParser):
+    """Allowlist sanitizer that also anchors h2/h3 headings and counts words"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: List[str] = []
+        self.open_tags: List[str] = []
+        self.text: List[str] = []
+        self.toc: List[dict] = []
+        self._dropping = 0
+        self._heading = None
+        self._anchors = set()
+
+    def _attrs(self, tag: str, attrs) -> str:
+        allowed = BLOG_ALLOWED_ATTRS["*"] | BLOG_ALLOWED_ATTRS.get(tag, set())
+        parts = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in BLOG_URL_ATTRS and not BLOG_SAFE_URL_RE.match(value.strip()):
+                continue
+            parts.append(f' {name}="{escape(value)}"')
+        if tag == "a" and dict(attrs).get("target") == "_blank":
+            parts.append(' rel="noopener noreferrer"')
+        return "".join(parts)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOG_DROPPED_TAGS:
+            self._dropping += 1
+            return
+        if self._dropping or tag not in BLOG_ALLOWED_TAGS:
+            return
+        if tag not in BLOG_INLINE_TAGS:
+            self.text.append(" ")
+        if tag == "a":
+            attrs = [(name, value) for name, value in attrs if name != "rel"]
+        if tag in BLOG_TOC_TAGS and self._heading is None:
+            # The id is filled in once the heading text is known
+            self._heading = (tag, len(self.out), self._attrs(tag, attrs), len(self.text))
+            self.out.append("")
+        else:
+            self.out.append(f"<{tag}{self._attrs(tag, attrs)}>")
+        if tag not in BLOG_VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in BLOG_VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in BLOG_DROPPED_TAGS:
+            self._dropping = max(0, self._dropping - 1)
+            return
+        if self._dropping or tag not in self.open_tags:
+            return
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            if self._heading and open_tag == self._heading[0]:
+                self._close_heading()
+            self.out.append(f"</{open_tag}>")
+            if open_tag not in BLOG_INLINE_TAGS:
+                self.text.append(" ")
+            if open_tag == tag:
+                break
+
+    def _close_heading(self):
+        tag, index, attrs, text_start = self._heading
+        self._heading = None
+        title = " ".join("".join(self.text[text_start:]).split())
+        anchor = base = generate_slug(title) or "section"
+        suffix = 2
+        while anchor in self._anchors:
+            anchor = f"{base}-{suffix}"
+            suffix += 1
+        self._anchors.add(anchor)
+        self.out[index] = f'<{tag} id="{anchor}"{attrs}>'
+        if title:
+            self.toc.append({"level": int(tag[1]), "id": anchor, "text": title})
+
+    def handle_data(self, data):
+        if self._dropping:
+            return
+        self.text.append(data)
+        self.out.append(escape(data, quote=False))
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.handle_endtag(self.open_tags[-1])
+
+def render_blog_content(content: str, excerpt: str = "") -> dict:
+    """Sanitized HTML, table of contents, reading time and excerpt for a post body"""
+    renderer = BlogHTMLRenderer()
+    renderer.feed(content or "")
+    renderer.close()
+    plain_text = " ".join("".join(renderer.text).split())
+    word_count = len(plain_text.split())
+    if not excerpt:
+        excerpt = plain_text[:BLOG_EXCERPT_LENGTH].rsplit(" ", 1)[0] if len(plain_text) > BLOG_EXCERPT_LENGTH else plain_text
+    return {
+        "content_html": "".join(renderer.out),
+        "toc": renderer.toc,
+        "word_count": word_count,
+        "reading_time_minutes": max(1, math.ceil(word_count / BLOG_WORDS_PER_MINUTE)),
+        "excerpt": excerpt,
+    }
+
+def sanitize_html(html: str) -> str:
+    """Admin-entered HTML reduced to the allowed tags and attributes"""
+    renderer = BlogHTMLRenderer()
+    renderer.feed(html or "")
+    renderer.close()
+    return "".join(renderer.out)
@@ -0,0 +1,305 @@
+"""Periodic background jobs (integration syncs, maintenance) with a registry and run history in MongoDB."""
+import asyncio
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from .core import db, logger
+
+# ==================== SCHEDULER ====================
+# Every worker runs the same loop. A job's registry document in scheduled_jobs
+# carries its schedule, next_run_at and a lease: a worker runs a job only
+# after claiming that document with one find_one_and_update, which moves
+# next_run_at forward and takes the lease, so each run happens on exactly one
+# worker and a run that is still going is never started a second time. A
+# lease left by a worker that died expires after the job's timeout.
+
+SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_POLL_SECONDS = float(os.environ.get("SCHEDULER_POLL_SECONDS", "15"))
+SCHEDULER_MAX_CONCURRENCY = int(os.environ.get("SCHEDULER_MAX_CONCURRENCY", "2"))
+JOB_RUN_HISTORY_DAYS = int(os.environ.get("JOB_RUN_HISTORY_DAYS", "30"))
+# Added to a job's timeout, so a lease outlives the run that holds it
+JOB_LEASE_GRACE_SECONDS = 60
+
+INTERVAL_PATTERN = re.compile(r"^every\s+(\d+)\s*([smhd])$")
+INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+# (low, high) for minute, hour, day of month, month, day of week (0 and 7 = Sunday)
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+class IntervalTrigger:
+    def __init__(self, seconds: int):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, moment: datetime) -> datetime:
+        return moment + timedelta(seconds=self.seconds)
+
+def parse_cron_field(field: str, low: int, high: int) -> set:
+    values = set()
+    for part in field.split(","):
+        spec, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if spec == "*":
+            start, end = low, high
+        elif "-" in spec:
+            start, end = (int(value) for value in spec.split("-", 1))
+        else:
+            start = end = int(spec)
+            if step > 1:
+                end = high
+        if step <= 0 or start < low or end > high or start > end:
+            raise ValueError(f"Cron field out of range: {part}")
+        values.update(range(start, end + 1, step))
+    return values
+
+class CronTrigger:
+    """Standard five-field cron expression, evaluated in UTC"""
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError("Cron expression needs five fields: minute hour day month weekday")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)
+        )
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        # As in cron, when both day fields are restricted a day matching either one fires
+        self.days_restricted = fields[2] != "*" and fields[4] != "*"
+        self.next_after(datetime.now(timezone.utc))
+
+    def day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = moment.isoweekday() % 7 in self.weekdays
+        return (day or weekday) if self.days_restricted else (day and weekday)
+
+    def next_after(self, moment: datetime) -> datetime:
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Four years covers leap days; an expression like "0 0 30 2 *" never fires
+        limit = moment + timedelta(days=4 * 366)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self.day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression never fires: {self.expression}")
+
+def parse_schedule(schedule: str):
+    """"every 10m" style intervals (s, m, h, d) or a five-field cron expression"""
+    schedule = schedule.strip().lower()
+    match = INTERVAL_PATTERN.match(schedule)
+    if match:
+        return IntervalTrigger(int(match.group(1)) * INTERVAL_UNITS[match.group(2)])
+    return CronTrigger(schedule)
+
+class Job:
+    """A registered job; schedule is the default until an admin changes the stored one"""
+
+    def __init__(self, name: str, func: Callable[[], Awaitable[Optional[dict]]], schedule: str,
+                 description: str = "", timeout_seconds: int = 300):
+        parse_schedule(schedule)
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.description = description
+        self.timeout_seconds = timeout_seconds
+
+class Scheduler:
+    """Claims due jobs from the registry and runs at most max_concurrency of them at once on this worker"""
+
+    def __init__(self, database, max_concurrency: int = SCHEDULER_MAX_CONCURRENCY,
+                 poll_seconds: float = SCHEDULER_POLL_SECONDS):
+        self._database = database
+        self.jobs: Dict[str, Job] = {}
+        self.worker_id = uuid.uuid4().hex
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.poll_seconds = poll_seconds
+        self.running: Dict[str, asyncio.Task] = {}
+        self._task = None
+
+    def add_job(self, job: Job):
+        self.jobs[job.name] = job
+
+    async def start(self):
+        await self._database.job_runs.create_index([("job", 1), ("started_at", -1)])
+        await self._database.job_runs.create_index("started_at", expireAfterSeconds=JOB_RUN_HISTORY_DAYS * 86400)
+        now = datetime.now(timezone.utc)
+        for job in self.jobs.values():
+            await self._database.scheduled_jobs.update_one(
+                {"_id": job.name},
+                {
+                    "$set": {"description": job.description, "default_schedule": job.schedule},
+                    "$setOnInsert": {
+                        "schedule": job.schedule,
+                        "enabled": True,
+                        "next_run_at": parse_schedule(job.schedule).next_after(now),
+                    },
+                },
+                upsert=True
+            )
+        if SCHEDULER_ENABLED and self.jobs:
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Scheduler tick failed, retrying: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def run_due(self):
+        now = datetime.now(timezone.utc)
+        due = await self._database.scheduled_jobs.find(
+            {"_id": {"$in": list(self.jobs)}, "enabled": True, "next_run_at": {"$lte": now}},
+            {"schedule": 1, "next_run_at": 1}
+        ).sort("next_run_at", 1).to_list(None)
+        for doc in due:
+            # Jobs left over stay due and are picked up once a slot frees, here or on another worker
+            if self.slots.locked():
+                break
+            await self.claim_and_run(doc["_id"], "schedule", doc)
+
+    async def claim_and_run(self, name: str, trigger: str, due: Optional[dict] = None) -> bool:
+        """Start name in the background if a slot is free and this worker gets its lease; due claims a scheduled run"""
+        job = self.jobs[name]
+        now = datetime.now(timezone.utc)
+        query = {"_id": name, "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]}
+        claim = {
+            "lease_owner": self.worker_id,
+            "lease_until": now + timedelta(seconds=job.timeout_seconds + JOB_LEASE_GRACE_SECONDS),
+        }
+        if due is not None:
+            # Only one worker can move this next_run_at forward
+            query["next_run_at"] = due["next_run_at"]
+            claim["next_run_at"] = parse_schedule(due.get("schedule") or job.schedule).next_after(now)
+
+        if self.slots.locked():
+            return False
+        await self.slots.acquire()
+        try:
+            claimed = await self._database.scheduled_jobs.find_one_and_update(
+                query, {"$set": claim}, return_document=ReturnDocument.AFTER
+            )
+        except Exception:
+            self.slots.release()
+            raise
+        if claimed is None:
+            self.slots.release()
+            return False
+        self.running[name] = asyncio.create_task(self._run(job, trigger))
+        return True
+
+    async def _run(self, job: Job, trigger: str):
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        status, error, result = "success", None, None
+        try:
+            result = await asyncio.wait_for(job.func(), job.timeout_seconds)
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"Timed out after {job.timeout_seconds}s"
+        except Exception as e:
+            status, error = "error", str(getattr(e, "detail", None) or e)
+        finally:
+            self.slots.release()
+            self.running.pop(job.name, None)
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        if status == "success":
+            logger.info(f"Job {job.name} finished in {duration_ms}ms")
+        else:
+            logger.warning(f"Job {job.name} {status} after {duration_ms}ms: {error}")
+
+        try:
+            await self._database.job_runs.insert_one({
+                "job": job.name,
+                "trigger": trigger,
+                "worker": self.worker_id,
+                "started_at": started_at,
+                "duration_ms": duration_ms,
+                "status": status,
+                "error": error,
+                "result": result if isinstance(result, dict) else None,
+            })
+            await self._database.scheduled_jobs.update_one(
+                {"_id": job.name, "lease_owner": self.worker_id},
+                {
+                    "$set": {
+                        "last_run_at": started_at,
+                        "last_status": status,
+                        "last_duration_ms": duration_ms,
+                        "last_error": error,
+                    },
+                    "$unset": {"lease_owner": "", "lease_until": ""},
+                }
+            )
+        except Exception as e:
+            # The lease still expires on its own
+            logger.warning(f"Could not record run of job {job.name}: {e}")
+
+    async def list_jobs(self) -> List[dict]:
+        """Registry entries with duration stats over the kept run history"""
+        stats = {
+            row["_id"]: row
+            async for row in self._database.job_runs.aggregate([
+                {"$group": {
+                    "_id": "$job",
+                    "runs": {"$sum": 1},
+                    "failures": {"$sum": {"$cond": [{"$eq": ["$status", "success"]}, 0, 1]}},
+                    "avg_duration_ms": {"$avg": "$duration_ms"},
+                    "max_duration_ms": {"$max": "$duration_ms"},
+                }},
+            ])
+        }
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        jobs = []
+        async for doc in self._database.scheduled_jobs.find({"_id": {"$in": list(self.jobs)}}).sort("_id", 1):
+            name = doc.pop("_id")
+            run_stats = stats.get(name, {})
+            jobs.append({
+                "name": name,
+                **doc,
+                "running": doc.get("lease_until") is not None and doc["lease_until"].replace(tzinfo=None) > now,
+                "runs": run_stats.get("runs", 0),
+                "failures": run_stats.get("failures", 0),
+                "avg_duration_ms": round(run_stats["avg_duration_ms"], 1) if run_stats.get("avg_duration_ms") is not None else None,
+                "max_duration_ms": run_stats.get("max_duration_ms"),
+            })
+        return jobs
+
+    async def runs(self, name: str, limit: int = 50) -> List[dict]:
+        return await self._database.job_runs.find({"job": name}, {"_id": 0}).sort("started_at", -1).to_list(limit)
+
+    async def update_job(self, name: str, enabled: Optional[bool] = None, schedule: Optional[str] = None) -> dict:
+        """Change a job's stored settings; a new schedule also resets next_run_at. Raises ValueError for a bad schedule"""
+        changes = {}
+        if enabled is not None:
+            changes["enabled"] = enabled
+        if schedule is not None:
+            changes["schedule"] = schedule
+            changes["next_run_at"] = parse_schedule(schedule).next_after(datetime.now(timezone.utc))
+        if changes:
+            await self._database.scheduled_jobs.update_one({"_id": name}, {"$set": changes})
+        return await self._database.scheduled_jobs.find_one({"_id": name})
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        # Interrupted runs keep their lease until it expires, so another worker does not repeat them at once
+        for task in list(self.running.values()):
+            task.cancel()
+
+scheduler = Scheduler(db)
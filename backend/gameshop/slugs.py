@@ -0,0 +1,142 @@
+"""Slug generation and allocation."""
+from fastapi import HTTPException
+from typing import List, Optional, Callable, Awaitable
+import re
+import unicodedata
+from collections import Counter
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from .core import db
+
+# ==================== SLUGS ====================
+
+SLUG_INVALID_CHARS_RE = re.compile(r"[^a-z0-9]+")
+SLUG_MAX_ATTEMPTS = 5
+
+DEVANAGARI_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "ng", "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "ny",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n", "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m", "य": "y", "र": "r", "ल": "l", "व": "w", "श": "sh",
+    "ष": "sh", "स": "s", "ह": "h"
+}
+DEVANAGARI_VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "i", "उ": "u", "ऊ": "u", "ऋ": "ri", "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au"
+}
+DEVANAGARI_MATRAS = {
+    "ा": "a", "ि": "i", "ी": "i", "ु": "u", "ू": "u", "ृ": "ri", "े": "e", "ै": "ai", "ो": "o", "ौ": "au"
+}
+DEVANAGARI_SIGNS = {"ं": "n", "ँ": "n", "ः": "h", "०": "0", "१": "1", "२": "2", "३": "3", "४": "4",
+                    "५": "5", "६": "6", "७": "7", "८": "8", "९": "9"}
+DEVANAGARI_VIRAMA = "्"
+
+def transliterate(text: str) -> str:
+    """Romanize Devanagari (Nepali) and strip accents from other scripts"""
+    out = []
+    for i, char in enumerate(text):
+        if char in DEVANAGARI_CONSONANTS:
+            out.append(DEVANAGARI_CONSONANTS[char])
+            following = text[i + 1] if i + 1 < len(text) else ""
+            # Inherent "a" unless a matra or virama follows; dropped at word end as in Nepali
+            if following and following not in DEVANAGARI_MATRAS and following != DEVANAGARI_VIRAMA \
+                    and ("\u0900" <= following <= "\u097f"):
+                out.append("a")
+        elif char in DEVANAGARI_VOWELS:
+            out.append(DEVANAGARI_VOWELS[char])
+        elif char in DEVANAGARI_MATRAS:
+            out.append(DEVANAGARI_MATRAS[char])
+        elif char in DEVANAGARI_SIGNS:
+            out.append(DEVANAGARI_SIGNS[char])
+        elif char == DEVANAGARI_VIRAMA:
+            continue
+        else:
+            out.append(char)
+    return unicodedata.normalize("NFKD", "".join(out)).encode("ascii", "ignore").decode()
+
+def generate_slug(name: str) -> str:
+    """Generate a URL-friendly slug from a name"""
+    return SLUG_INVALID_CHARS_RE.sub("-", transliterate(name).lower()).strip("-")
+
+def slug_has_base(slug: Optional[str], base: str) -> bool:
+    """True for base itself and the base-N slugs allocated from its counter"""
+    return bool(slug) and (slug == base or (slug.startswith(f"{base}-") and slug[len(base) + 1:].isdigit()))
+
+def unchanged_slug(existing: dict, field: str, value: Optional[str]) -> Optional[str]:
+    """The stored slug when the field it was made from is unchanged, so edits keep published URLs"""
+    return existing.get("slug") if existing.get(field) == value else None
+
+async def allocate_slug(collection: str, text: str, current_slug: Optional[str] = None) -> str:
+    """current_slug when given, otherwise the next free slug for text from an upserted per-base counter"""
+    if current_slug:
+        return current_slug
+    base = generate_slug(text) or "item"
+    counter = await db.slug_counters.find_one_and_update(
+        {"_id": f"{collection}:{base}"},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return base if counter["seq"] == 1 else f"{base}-{counter['seq']}"
+
+async def allocate_slugs(collection: str, texts: List[str]) -> List[str]:
+    """Slugs for many new documents: one bulk $inc per distinct base, then one read of the counters.
+
+    An allocation by another writer between the two can overlap a range; the
+    unique slug index rejects those writes and callers retry them one by one.
+    """
+    if not texts:
+        return []
+    bases = [generate_slug(text) or "item" for text in texts]
+    counts = Counter(bases)
+    keys = {f"{collection}:{base}": base for base in counts}
+    await db.slug_counters.bulk_write(
+        [UpdateOne({"_id": key}, {"$inc": {"seq": counts[base]}}, upsert=True) for key, base in keys.items()],
+        ordered=False
+    )
+    next_seq = {}
+    async for counter in db.slug_counters.find({"_id": {"$in": list(keys)}}):
+        base = keys[counter["_id"]]
+        next_seq[base] = counter["seq"] - counts[base] + 1
+    slugs = []
+    for base in bases:
+        seq = next_seq[base]
+        next_seq[base] += 1
+        slugs.append(base if seq == 1 else f"{base}-{seq}")
+    return slugs
+
+async def write_with_unique_slug(collection: str, text: str, write: Callable[[str], Awaitable],
+                                 current_slug: Optional[str] = None) -> str:
+    """Allocate a slug and run write(slug); retries only when a pre-counter document holds it"""
+    for _ in range(SLUG_MAX_ATTEMPTS):
+        slug = await allocate_slug(collection, text, current_slug)
+        try:
+            await write(slug)
+            return slug
+        except DuplicateKeyError as e:
+            if "slug" not in str(e):
+                raise
+            current_slug = None
+    raise HTTPException(status_code=409, detail="Could not allocate a unique slug")
+
+def category_slug_text(name: str) -> str:
+    return name.replace("&", " and ")
+
+async def dedupe_slugs(collection: str, text_for: Callable[[dict], str]) -> List[tuple]:
+    """Give each document sharing a slug, except the oldest, a new one; returns (id, old slug, new slug)"""
+    items = db[collection]
+    pipeline = [
+        {"$match": {"slug": {"$type": "string"}}},
+        {"$group": {"_id": "$slug", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    changes = []
+    async for group in items.aggregate(pipeline):
+        duplicates = await items.find({"_id": {"$in": group["ids"]}}).sort([("created_at", 1), ("_id", 1)]).to_list(None)
+        for doc in duplicates[1:]:
+            # Counters may hand out slugs written before they existed
+            slug = await allocate_slug(collection, text_for(doc))
+            while await items.find_one({"slug": slug}, {"_id": 1}):
+                slug = await allocate_slug(collection, text_for(doc))
+            await items.update_one({"_id": doc["_id"]}, {"$set": {"slug": slug}})
+            changes.append((doc.get("id"), group["_id"], slug))
+    return changes
@@ -0,0 +1,474 @@
+"""Static snapshots of the public storefront pages for crawlers and CDNs.
+
+Each public route gets an index.html with the page content and meta tags
+prerendered, plus an index.json with the data the page is built from:
+
+    /                   home: categories, products, latest blog posts
+    /product/<slug>     one per active product
+    /blog, /blog/<slug> blog index and one per published post
+    /about, /terms      CMS pages
+    /sitemap.xml
+
+A manifest.json next to the snapshots records a content hash per path, so
+a refresh only rewrites the files whose content changed and removes the
+ones that no longer exist. Product writes pass the changed ids along, and
+only those product pages are rendered again, with home and the sitemap.
+Stored HTML (product descriptions, CMS pages) goes through the blog
+sanitizer before it is inlined. Refreshes run as the "snapshots" scheduler job,
+whose lease lets one worker at a time write the files and the manifest.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import datetime, timezone
+from html import escape
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from .core import logger
+from .sanitize import sanitize_html
+from .scheduler import Job
+
+SITE_NAME = "GameShop Nepal"
+SITE_URL = os.environ.get("SITE_URL", "https://gameshopnepal.com").rstrip("/")
+SITE_DESCRIPTION = ("GameShop Nepal - Your trusted source for digital products, gaming subscriptions, "
+                    "OTT services, and software licenses in Nepal since 2021.")
+MANIFEST_NAME = "manifest.json"
+DESCRIPTION_LENGTH = 160
+HOME_BLOG_POSTS = 3
+TAG_RE = re.compile(r"<[^>]+>")
+SNAPSHOT_JOB = "snapshots"
+
+# Which snapshot groups depend on which collections
+GROUP_SOURCES = {
+    "home": {"products", "categories", "blog_posts", "site_settings"},
+    "products": {"products", "categories"},
+    "blog": {"blog_posts"},
+    "pages": {"pages"},
+}
+
+def plain_text(html: str, length: int = DESCRIPTION_LENGTH) -> str:
+    text = " ".join(TAG_RE.sub(" ", html or "").split())
+    return text if len(text) <= length else text[:length].rsplit(" ", 1)[0] + "…"
+
+def groups_for(collections: Iterable[str]) -> set:
+    collections = set(collections)
+    return {group for group, sources in GROUP_SOURCES.items() if sources & collections}
+
+class Snapshot:
+    """One rendered route: HTML document, its data and sitemap lastmod"""
+
+    def __init__(self, path: str, title: str, description: str, body: str, data: dict,
+                 lastmod: Optional[str] = None, image: Optional[str] = None, json_ld: Optional[dict] = None):
+        self.path = path
+        self.title = title
+        self.description = description
+        self.body = body
+        self.data = data
+        self.lastmod = lastmod
+        self.image = image
+        self.json_ld = json_ld
+
+    def head(self) -> str:
+        url = f"{SITE_URL}{self.path}"
+        tags = [
+            f"<title>{escape(self.title)}</title>",
+            f'<meta name="description" content="{escape(self.description)}" />',
+            f'<link rel="canonical" href="{escape(url)}" />',
+            f'<meta property="og:title" content="{escape(self.title)}" />',
+            f'<meta property="og:description" content="{escape(self.description)}" />',
+            f'<meta property="og:url" content="{escape(url)}" />',
+            f'<meta property="og:site_name" content="{SITE_NAME}" />',
+        ]
+        if self.image:
+            tags.append(f'<meta property="og:image" content="{escape(self.image)}" />')
+        if self.json_ld:
+            tags.append(f'<script type="application/ld+json">{_script_json(self.json_ld)}</script>')
+        return "\n".join(tags)
+
+    def render(self, shell: Optional[str]) -> str:
+        data = f'<script id="__SNAPSHOT__" type="application/json">{_script_json(self.data)}</script>'
+        if shell:
+            # Build output of the frontend: swap in our meta tags and prerender into #root
+            document = re.sub(r"<title>.*?</title>", "", shell, count=1, flags=re.DOTALL)
+            document = re.sub(r'<meta name="description"[^>]*>', "", document, count=1)
+            document = document.replace("</head>", f"{self.head()}\n</head>", 1)
+            return document.replace('<div id="root"></div>', f'<div id="root">{self.body}</div>{data}', 1)
+        return (
+            '<!doctype html>\n<html lang="en">\n<head>\n<meta charset="utf-8" />\n'
+            '<meta name="viewport" content="width=device-width, initial-scale=1" />\n'
+            f"{self.head()}\n</head>\n<body>\n<div id=\"root\">{self.body}</div>\n{data}\n</body>\n</html>\n"
+        )
+
+def _script_json(data) -> str:
+    # "</" inside a script element would end it early
+    return json.dumps(data, separators=(",", ":"), default=str, ensure_ascii=False).replace("</", "<\\/")
+
+def product_path(product: dict) -> str:
+    return f"/product/{product.get('slug') or product['id']}"
+
+def product_price_range(product: dict):
+    prices = [v.get("price", 0) for v in product.get("variations", [])]
+    return (min(prices), max(prices)) if prices else (None, None)
+
+class SnapshotBuilder:
+    """Renders snapshots from the database and writes the ones that changed"""
+
+    def __init__(self, db, output_dir: Path, shell_path: Optional[Path] = None):
+        self.db = db
+        self.output_dir = Path(output_dir)
+        self.shell_path = shell_path
+        self._lock = asyncio.Lock()
+
+    # ----- rendering -----
+
+    async def render_home(self) -> Dict[str, Snapshot]:
+        categories = await self.db.categories.find({}, {"_id": 0}).sort("name", 1).to_list(1000)
+        products = await self.db.products.find(
+            {"is_active": True}, {"_id": 0, "id": 1, "name": 1, "slug": 1, "category_id": 1, "image_url": 1,
+                                  "variations": 1, "is_sold_out": 1, "sort_order": 1}
+        ).sort("sort_order", 1).to_list(5000)
+        posts = await self.db.blog_posts.find(
+            {"is_published": True}, {"_id": 0, "title": 1, "slug": 1, "excerpt": 1, "created_at": 1}
+        ).sort("created_at", -1).to_list(HOME_BLOG_POSTS)
+
+        by_category: Dict[str, list] = {}
+        for product in products:
+            by_category.setdefault(product.get("category_id", ""), []).append(product)
+
+        sections = []
+        for category in categories:
+            items = by_category.get(category["id"], [])
+            if not items:
+                continue
+            links = "".join(
+                f'<li><a href="{escape(product_path(p))}">{escape(p["name"])}</a></li>' for p in items
+            )
+            sections.append(f"<section><h2>{escape(category['name'])}</h2><ul>{links}</ul></section>")
+        if posts:
+            links = "".join(f'<li><a href="/blog/{escape(p["slug"])}">{escape(p["title"])}</a></li>' for p in posts)
+            sections.append(f"<section><h2>Blog</h2><ul>{links}</ul></section>")
+
+        for product in products:
+            low, _ = product_price_range(product)
+            product["min_price"] = low
+            product.pop("variations", None)
+        body = f"<main><h1>{SITE_NAME}</h1><p>{escape(SITE_DESCRIPTION)}</p>{''.join(sections)}</main>"
+        data = {"categories": categories, "products": products, "blog_posts": posts}
+        json_ld = {"@context": "https://schema.org", "@type": "Organization", "name": SITE_NAME, "url": SITE_URL}
+        return {"/": Snapshot("/", f"{SITE_NAME} - Digital Products & Gaming Subscriptions", SITE_DESCRIPTION,
+                              body, data, json_ld=json_ld)}
+
+    def render_product(self, product: dict, category: Optional[dict]) -> Snapshot:
+        path = product_path(product)
+        low, high = product_price_range(product)
+        variations = "".join(
+            f"<li>{escape(v.get('name', ''))} - Rs {v.get('price', 0):g}</li>" for v in product.get("variations", [])
+        )
+        crumbs = f"<p>{escape(category['name'])}</p>" if category else ""
+        description = sanitize_html(product.get("description", ""))
+        body = (f"<main><article>{crumbs}<h1>{escape(product['name'])}</h1>"
+                f'<img src="{escape(product.get("image_url", ""))}" alt="{escape(product["name"])}" />'
+                f"<ul>{variations}</ul><div>{description}</div></article></main>")
+        json_ld = {
+            "@context": "https://schema.org",
+            "@type": "Product",
+            "name": product["name"],
+            "image": product.get("image_url"),
+            "description": plain_text(description, 500),
+            "url": f"{SITE_URL}{path}",
+        }
+        if low is not None:
+            json_ld["offers"] = {
+                "@type": "AggregateOffer",
+                "priceCurrency": "NPR",
+                "lowPrice": low,
+                "highPrice": high,
+                "availability": "https://schema.org/OutOfStock" if product.get("is_sold_out")
+                else "https://schema.org/InStock",
+            }
+        return Snapshot(path, f"{product['name']} | {SITE_NAME}",
+                        plain_text(description) or SITE_DESCRIPTION, body, product,
+                        lastmod=product.get("updated_at") or product.get("created_at"),
+                        image=product.get("image_url"), json_ld=json_ld)
+
+    async def render_products(self, product_ids: Optional[Iterable[str]] = None) -> Dict[str, Snapshot]:
+        """Pages of every active product, or of the active ones among product_ids"""
+        categories = {c["id"]: c for c in await self.db.categories.find({}, {"_id": 0}).to_list(1000)}
+        query = {"is_active": True}
+        if product_ids is not None:
+            query["id"] = {"$in": list(product_ids)}
+        snapshots = {}
+        async for product in self.db.products.find(query, {"_id": 0}):
+            snapshot = self.render_product(product, categories.get(product.get("category_id")))
+            snapshots[snapshot.path] = snapshot
+        return snapshots
+
+    async def render_blog(self) -> Dict[str, Snapshot]:
+        posts = await self.db.blog_posts.find({"is_published": True}, {"_id": 0, "content": 0}) \
+            .sort("created_at", -1).to_list(1000)
+        snapshots = {}
+        cards = []
+        for post in posts:
+            path = f"/blog/{post['slug']}"
+            body = (f"<main><article><h1>{escape(post['title'])}</h1><p>{escape(post.get('excerpt', ''))}</p>"
+                    f"<div>{post.get('content_html', '')}</div></article></main>")
+            json_ld = {
+                "@context": "https://schema.org",
+                "@type": "BlogPosting",
+                "headline": post["title"],
+                "image": post.get("image_url"),
+                "datePublished": post.get("created_at"),
+                "dateModified": post.get("updated_at") or post.get("created_at"),
+                "url": f"{SITE_URL}{path}",
+            }
+            snapshots[path] = Snapshot(path, f"{post['title']} | {SITE_NAME} Blog",
+                                       post.get("excerpt") or SITE_DESCRIPTION, body, post,
+                                       lastmod=post.get("updated_at") or post.get("created_at"),
+                                       image=post.get("image_url"), json_ld=json_ld)
+            cards.append({k: post.get(k) for k in ("id", "title", "slug", "excerpt", "image_url", "created_at")})
+            cards[-1]["reading_time_minutes"] = post.get("reading_time_minutes")
+
+        links = "".join(f'<li><a href="/blog/{escape(c["slug"])}">{escape(c["title"])}</a>'
+                        f"<p>{escape(c.get('excerpt') or '')}</p></li>" for c in cards)
+        snapshots["/blog"] = Snapshot("/blog", f"Blog | {SITE_NAME}", f"Guides and news from {SITE_NAME}.",
+                                      f"<main><h1>Blog</h1><ul>{links}</ul></main>", {"posts": cards},
+                                      lastmod=cards[0]["created_at"] if cards else None)
+        return snapshots
+
+    async def render_pages(self) -> Dict[str, Snapshot]:
+        stored = {p["page_key"]: p for p in await self.db.pages.find(
+            {"page_key": {"$in": ["about", "terms"]}}, {"_id": 0}).to_list(10)}
+        snapshots = {}
+        for key, default_title in (("about", "About Us"), ("terms", "Terms and Conditions")):
+            page = stored.get(key, {"page_key": key, "title": default_title, "content": ""})
+            path = f"/{key}"
+            content = sanitize_html(page.get("content", ""))
+            body = f"<main><h1>{escape(page.get('title', default_title))}</h1><div>{content}</div></main>"
+            snapshots[path] = Snapshot(path, f"{page.get('title', default_title)} | {SITE_NAME}",
+                                       plain_text(content) or SITE_DESCRIPTION, body, page,
+                                       lastmod=page.get("updated_at"))
+        return snapshots
+
+    async def render_group(self, group: str) -> Dict[str, Snapshot]:
+        return await {
+            "home": self.render_home,
+            "products": self.render_products,
+            "blog": self.render_blog,
+            "pages": self.render_pages,
+        }[group]()
+
+    # ----- writing -----
+
+    def _read_manifest(self) -> dict:
+        try:
+            return json.loads((self.output_dir / MANIFEST_NAME).read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _target_dir(self, path: str) -> Path:
+        """Directory for a route; slugs containing "/" or ".." would escape their route, so they are refused"""
+        relative = path.strip("/")
+        segments = relative.split("/") if relative else []
+        if len(segments) > 2 or any(segment in ("", ".", "..") or "\\" in segment for segment in segments):
+            raise ValueError(f"Unsafe snapshot path {path!r}")
+        return self.output_dir / relative
+
+    @staticmethod
+    def _write_atomic(target: Path, content: str):
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # A name of its own, so a build-snapshots run next to a worker never shares a temp file
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=target.parent, prefix=f".{target.name}.",
+                                         suffix=".tmp", delete=False) as tmp:
+            tmp.write(content)
+        try:
+            os.replace(tmp.name, target)
+        except OSError:
+            os.unlink(tmp.name)
+            raise
+
+    def _remove(self, path: str):
+        target = self._target_dir(path)
+        for name in ("index.html", "index.json"):
+            (target / name).unlink(missing_ok=True)
+        try:
+            target.rmdir()
+        except OSError:
+            pass
+
+    def _sitemap(self, manifest: dict) -> str:
+        entries = []
+        for path in sorted(manifest):
+            lastmod = manifest[path].get("lastmod")
+            lastmod_tag = f"<lastmod>{escape(lastmod[:10])}</lastmod>" if lastmod else ""
+            entries.append(f"<url><loc>{escape(SITE_URL + path)}</loc>{lastmod_tag}</url>")
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+                + "\n".join(entries) + "\n</urlset>\n")
+
+    def _apply(self, groups: set, rendered: Dict[str, Snapshot], changed_ids: Iterable[str] = ()) -> dict:
+        """Write changed snapshots and drop vanished ones; runs in a thread.
+
+        Vanished means missing from rendered while belonging to one of the fully
+        rendered groups, or to one of changed_ids (a partial product refresh).
+        """
+        changed_ids = set(changed_ids)
+        shell = None
+        if self.shell_path and Path(self.shell_path).is_file():
+            shell = Path(self.shell_path).read_text(encoding="utf-8")
+        manifest = self._read_manifest()
+        written, removed = 0, 0
+
+        for path, snapshot in rendered.items():
+            try:
+                target = self._target_dir(path)
+            except ValueError as e:
+                logger.warning(f"Skipping snapshot: {e}")
+                continue
+            html = snapshot.render(shell)
+            data = _script_json(snapshot.data)
+            digest = hashlib.sha256(f"{html}\0{data}".encode()).hexdigest()
+            entry = manifest.get(path)
+            if entry and entry["hash"] == digest and (target / "index.html").exists():
+                continue
+            self._write_atomic(target / "index.html", html)
+            self._write_atomic(target / "index.json", data)
+            manifest[path] = {"group": snapshot_group(path), "hash": digest, "lastmod": snapshot.lastmod,
+                              "id": snapshot.data.get("id")}
+            written += 1
+
+        vanished = [
+            p for p, entry in manifest.items()
+            if p not in rendered and (entry["group"] in groups or entry.get("id") in changed_ids)
+        ]
+        for path in vanished:
+            self._remove(path)
+            del manifest[path]
+            removed += 1
+
+        if written or removed or not (self.output_dir / "sitemap.xml").exists():
+            self._write_atomic(self.output_dir / "sitemap.xml", self._sitemap(manifest))
+            self._write_atomic(self.output_dir / MANIFEST_NAME, json.dumps(manifest, indent=1, sort_keys=True))
+        return {"written": written, "removed": removed, "total": len(manifest)}
+
+    async def refresh(self, collections: Optional[Iterable[str]] = None,
+                      product_ids: Optional[Iterable[str]] = None) -> dict:
+        """Regenerate the snapshots depending on collections, or everything when None.
+
+        With product_ids, only those products' pages are rendered for a products
+        change; a categories change still renders every product page.
+        """
+        collections = None if collections is None else set(collections)
+        groups = set(GROUP_SOURCES) if collections is None else groups_for(collections)
+        if not groups:
+            return {"written": 0, "removed": 0, "groups": []}
+        partial_ids = None
+        if product_ids is not None and collections is not None and "categories" not in collections:
+            partial_ids = set(product_ids)
+        async with self._lock:
+            started = datetime.now(timezone.utc)
+            rendered: Dict[str, Snapshot] = {}
+            for group in sorted(groups):
+                if group == "products" and partial_ids is not None:
+                    rendered.update(await self.render_products(partial_ids))
+                else:
+                    rendered.update(await self.render_group(group))
+            full_groups = groups - {"products"} if partial_ids is not None else groups
+            result = await asyncio.to_thread(self._apply, full_groups, rendered, partial_ids or ())
+        result["groups"] = sorted(groups)
+        result["duration_ms"] = round((datetime.now(timezone.utc) - started).total_seconds() * 1000, 1)
+        logger.info(f"Snapshots refreshed for {', '.join(result['groups'])}: "
+                    f"{result['written']} written, {result['removed']} removed")
+        return result
+
+def snapshot_group(path: str) -> str:
+    if path == "/":
+        return "home"
+    if path.startswith("/product/"):
+        return "products"
+    if path == "/blog" or path.startswith("/blog/"):
+        return "blog"
+    return "pages"
+
+class SnapshotWorker:
+    """Batches change notifications into runs of the snapshots job, so only the lease holder writes files"""
+
+    def __init__(self, builder: SnapshotBuilder, scheduler, debounce_seconds: float = 2.0):
+        self.builder = builder
+        self.scheduler = scheduler
+        self.debounce_seconds = debounce_seconds
+        self._pending: set = set()
+        # Products changed since the last refresh; None when all of them need rendering
+        self._pending_products: Optional[set] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.job = Job(SNAPSHOT_JOB, self.flush, "every 6h",
+                       description="Regenerate static page snapshots changed on this worker, or all of them")
+
+    def mark(self, collection: str, ids: Optional[Iterable[str]] = None):
+        """Note a change to collection; ids narrows a products change to those products"""
+        if collection in set().union(*GROUP_SOURCES.values()):
+            self._pending.add(collection)
+            if collection == "products":
+                self._merge_products(None if ids is None else set(ids))
+            self._wakeup.set()
+
+    def _merge_products(self, ids: Optional[set]):
+        if ids is None or self._pending_products is None:
+            self._pending_products = None
+        else:
+            self._pending_products |= ids
+
+    def mark_all(self):
+        for collection in set().union(*GROUP_SOURCES.values()):
+            self.mark(collection)
+
+    async def flush(self) -> dict:
+        """Job body: refresh what was marked on this worker, or everything on a scheduled run"""
+        collections, self._pending = self._pending, set()
+        product_ids, self._pending_products = self._pending_products, set()
+        try:
+            return await self.builder.refresh(collections or None, product_ids if collections else None)
+        except Exception:
+            self._pending |= collections
+            if "products" in collections:
+                self._merge_products(product_ids)
+            self._wakeup.set()
+            raise
+
+    async def run_now(self, trigger: str) -> bool:
+        """Start the job on this worker unless another one holds its lease"""
+        return await self.scheduler.claim_and_run(SNAPSHOT_JOB, trigger)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # Let a burst of writes (reorders, syncs) settle into one refresh
+            await asyncio.sleep(self.debounce_seconds)
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+            try:
+                started = await self.run_now("change")
+            except Exception as e:
+                logger.error(f"Could not start snapshot refresh for {sorted(self._pending)}: {e}")
+                started = False
+            if not started:
+                # Another worker is writing snapshots or the job slots are busy; the marks stay pending
+                self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,158 @@
+"""Image upload storage and screenshot compression."""
+from fastapi import HTTPException, Request, UploadFile
+import os
+from pathlib import Path
+from typing import List, Optional
+from python_multipart import MultipartParser
+from python_multipart.multipart import parse_options_header
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import ProcessPoolExecutor
+
+from .core import UPLOADS_DIR
+
+# ==================== IMAGE UPLOAD ====================
+
+ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png", "image/webp", "image/gif"]
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_SCREENSHOT_BYTES = 10 * 1024 * 1024
+# Boundaries, part headers and small form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+SCREENSHOT_MAX_DIMENSION = 1600
+THUMBNAIL_MAX_DIMENSION = 320
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", "2"))
+
+_image_pool: Optional[ProcessPoolExecutor] = None
+
+def get_image_pool() -> ProcessPoolExecutor:
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _image_pool
+
+async def save_upload(file: UploadFile, file_path: Path, max_bytes: Optional[int] = None) -> int:
+    """Stream an upload to disk in chunks, keeping file I/O off the event loop"""
+    written = 0
+    buffer = await run_in_threadpool(open, file_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if max_bytes and written > max_bytes:
+                raise HTTPException(status_code=413, detail=f"File too large. Maximum size is {max_bytes // (1024 * 1024)} MB.")
+            await run_in_threadpool(buffer.write, chunk)
+    except Exception:
+        await run_in_threadpool(buffer.close)
+        file_path.unlink(missing_ok=True)
+        raise
+    await run_in_threadpool(buffer.close)
+    return written
+
+def too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File too large. Maximum size is {max_bytes // (1024 * 1024)} MB.")
+
+async def receive_multipart_file(request: Request, field: str, file_path: Path, max_bytes: int) -> str:
+    """Stream one file field of a multipart body to disk and return its content type.
+
+    Unlike request.form(), nothing is buffered: the body is parsed as it
+    arrives and reading stops with a 413 as soon as it passes max_bytes, or
+    before reading anything when Content-Length already does.
+    """
+    body_limit = max_bytes + MULTIPART_OVERHEAD_BYTES
+    try:
+        content_length = int(request.headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    if content_length > body_limit:
+        raise too_large(max_bytes)
+    _, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if not boundary:
+        raise HTTPException(status_code=400, detail="Missing multipart boundary")
+
+    part = {}
+    found = {}
+    pending: List[bytes] = []
+    header_field = bytearray()
+    header_value = bytearray()
+
+    def on_part_begin():
+        part.clear()
+        part["headers"] = {}
+
+    def on_header_field(data, start, end):
+        header_field.extend(data[start:end])
+
+    def on_header_value(data, start, end):
+        header_value.extend(data[start:end])
+
+    def on_header_end():
+        part["headers"][bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        if disposition.get(b"name") == field.encode() and b"filename" in disposition and not found:
+            part["target"] = True
+            found["content_type"] = part["headers"].get(b"content-type", b"").decode("latin-1").strip()
+
+    def on_part_data(data, start, end):
+        if part.get("target"):
+            pending.append(data[start:end])
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+    received = 0
+    written = 0
+    buffer = await run_in_threadpool(open, file_path, "wb")
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > body_limit:
+                raise too_large(max_bytes)
+            parser.write(chunk)
+            if pending:
+                data = b"".join(pending)
+                pending.clear()
+                written += len(data)
+                if written > max_bytes:
+                    raise too_large(max_bytes)
+                await run_in_threadpool(buffer.write, data)
+        parser.finalize()
+    except Exception:
+        await run_in_threadpool(buffer.close)
+        file_path.unlink(missing_ok=True)
+        raise
+    await run_in_threadpool(buffer.close)
+    if not found:
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail="No file provided")
+    return found["content_type"]
+
+def compress_screenshot(source_path: str, output_stem: str) -> tuple:
+    """Downscale and recompress an image plus a thumbnail; runs in a worker process"""
+    from PIL import Image, ImageOps
+
+    full_path = UPLOADS_DIR / f"{output_stem}_full.jpg"
+    thumb_path = UPLOADS_DIR / f"{output_stem}_thumb.jpg"
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    image.thumbnail((SCREENSHOT_MAX_DIMENSION, SCREENSHOT_MAX_DIMENSION))
+    image.save(full_path, "JPEG", quality=80, optimize=True, progressive=True)
+    image.thumbnail((THUMBNAIL_MAX_DIMENSION, THUMBNAIL_MAX_DIMENSION))
+    image.save(thumb_path, "JPEG", quality=70, optimize=True)
+    return full_path.name, thumb_path.name
+
+def shutdown_image_pool():
+    global _image_pool
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False)
+        _image_pool = None
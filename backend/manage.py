@@ -0,0 +1,98 @@
+"""Maintenance commands for the backend.
+
+Usage: python manage.py rebuild-review-stats
+       python manage.py build-snapshots [--output DIR]
+       python manage.py dedupe-slugs
+       python manage.py migrate-uncategorized
+Needs MONGO_URL and DB_NAME, same as the server, and the same
+CACHE_BUS_BACKEND so running workers hear about the changes.
+"""
+import argparse
+import asyncio
+from pathlib import Path
+
+from gameshop.cache import CACHE_BUS_BACKEND, SNAPSHOT_DIR, SNAPSHOT_SHELL, cache_bus, invalidate
+from gameshop.core import client, db
+from gameshop.indexes import products_changed
+from gameshop.models import UNCATEGORIZED_ID
+from gameshop.routers.content import format_review_stats, rebuild_review_stats as rebuild_stats
+from gameshop.slugs import category_slug_text, dedupe_slugs as dedupe_collection_slugs
+from gameshop.snapshots import SnapshotBuilder
+
+# Field each collection's slugs are made from
+SLUG_SOURCES = {
+    "products": lambda doc: doc.get("name", ""),
+    "categories": lambda doc: category_slug_text(doc.get("name", "")),
+    "blog_posts": lambda doc: doc.get("title", ""),
+}
+
+
+async def rebuild_review_stats(args):
+    doc = await rebuild_stats()
+    stats = format_review_stats(doc)
+    print(f"Rebuilt review stats: {stats['count']} reviews, average {stats['average_rating']}")
+
+
+async def build_snapshots(args):
+    output = args.output or SNAPSHOT_DIR
+    if not output:
+        raise SystemExit("Pass --output or set SNAPSHOT_DIR")
+    builder = SnapshotBuilder(db, Path(output), SNAPSHOT_SHELL)
+    result = await builder.refresh()
+    print(f"Snapshots in {output}: {result['written']} written, {result['removed']} removed, {result['total']} total")
+
+
+async def dedupe_slugs(args):
+    """One-off migration: make slugs unique, then create the unique slug indexes"""
+    for collection, text_for in SLUG_SOURCES.items():
+        changes = await dedupe_collection_slugs(collection, text_for)
+        for item_id, old, new in changes:
+            print(f"{collection} {item_id}: {old} -> {new}")
+        if changes:
+            if collection == "products":
+                await products_changed([item_id for item_id, _, _ in changes])
+            else:
+                await invalidate(collection)
+        await db[collection].create_index("slug", unique=True, partialFilterExpression={"slug": {"$type": "string"}})
+        print(f"{collection}: {len(changes)} slugs changed, unique slug index in place")
+
+
+async def migrate_uncategorized(args):
+    """One-off migration: move products left with an empty category id to UNCATEGORIZED_ID"""
+    query = {"category_id": {"$in": ["", None]}}
+    product_ids = [doc["id"] async for doc in db.products.find(query, {"_id": 0, "id": 1})]
+    if product_ids:
+        await db.products.update_many(query, {"$set": {"category_id": UNCATEGORIZED_ID}})
+        await products_changed(product_ids)
+    print(f"{len(product_ids)} products moved to category {UNCATEGORIZED_ID!r}")
+
+
+COMMANDS = {
+    "rebuild-review-stats": rebuild_review_stats,
+    "build-snapshots": build_snapshots,
+    "dedupe-slugs": dedupe_slugs,
+    "migrate-uncategorized": migrate_uncategorized,
+}
+
+
+async def run(command, args):
+    # Invalidations go out on the shared bus, like a server write would
+    await cache_bus.prepare()
+    if CACHE_BUS_BACKEND == "local":
+        print("CACHE_BUS_BACKEND=local: running servers are not notified, restart them to pick up changes")
+    await COMMANDS[command](args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--output", help="snapshot directory for build-snapshots, defaults to SNAPSHOT_DIR")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.command, args))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,11 @@ import { Link } from 'react-router-dom';
 import { Badge } from '@/components/ui/badge';
 
 export default function ProductCard({ product }) {
-  const lowestPrice = product.variations?.length > 0
+  // Summaries ship min_price/variation_count; full products still carry variations
+  const lowestPrice = product.min_price ?? (product.variations?.length > 0
     ? Math.min(...product.variations.map(v => v.price))
-    : 0;
+    : 0);
+  const variationCount = product.variation_count ?? product.variations?.length ?? 0;
 
   const tags = product.tags || [];
   
@@ -41,7 +43,7 @@ export default function ProductCard({ product }) {
         <h3 className="font-heading text-sm lg:text-base font-semibold text-white truncate group-hover:text-gold-500 transition-colors">{product.name}</h3>
         <div className="mt-1 flex items-baseline gap-1 lg:gap-2">
           <span className="text-gold-500 font-bold text-sm lg:text-base">Rs {lowestPrice.toLocaleString()}</span>
-          {product.variations?.length > 1 && <span className="text-white/40 text-[10px] lg:text-xs">onwards</span>}
+          {variationCount > 1 && <span className="text-white/40 text-[10px] lg:text-xs">onwards</span>}
         </div>
       </div>
     </Link>
@@ -36,17 +36,26 @@ export const uploadAPI = {
 };
 
 export const productsAPI = {
-  getAll: (categoryId = null, activeOnly = true) => {
+  getAll: (categoryId = null, activeOnly = true, soldOutLast = false) => {
     const params = new URLSearchParams();
     if (categoryId) params.append('category_id', categoryId);
     if (activeOnly) params.append('active_only', 'true');
+    if (soldOutLast) params.append('sold_out_last', 'true');
     return api.get(`/products?${params.toString()}`);
   },
+  getSummaries: (categoryId = null) =>
+    api.get(categoryId ? `/products/summary?category_id=${categoryId}` : '/products/summary'),
   getOne: (id) => api.get(`/products/${id}`),
+  search: (query, categoryId = null, limit = 20) => {
+    const params = new URLSearchParams({ q: query, limit });
+    if (categoryId) params.append('category_id', categoryId);
+    return api.get(`/products/search?${params.toString()}`);
+  },
   create: (data) => api.post('/products', data),
   update: (id, data) => api.put(`/products/${id}`, data),
   delete: (id) => api.delete(`/products/${id}`),
   reorder: (productIds) => api.put('/products/reorder', { product_ids: productIds }),
+  move: (id, afterId) => api.put(`/products/${id}/move`, { after_id: afterId }),
 };
 
 export const categoriesAPI = {
@@ -58,6 +67,8 @@ export const categoriesAPI = {
 
 export const reviewsAPI = {
   getAll: () => api.get('/reviews'),
+  getStats: () => api.get('/reviews/stats'),
+  rebuildStats: () => api.post('/reviews/stats/rebuild'),
   create: (data) => api.post('/reviews', data),
   update: (id, data) => api.put(`/reviews/${id}`, data),
   delete: (id) => api.delete(`/reviews/${id}`),
@@ -71,6 +82,7 @@ export const faqsAPI = {
   update: (id, data) => api.put(`/faqs/${id}`, data),
   delete: (id) => api.delete(`/faqs/${id}`),
   reorder: (faqIds) => api.put('/faqs/reorder', faqIds),
+  move: (id, afterId) => api.put(`/faqs/${id}/move`, { after_id: afterId }),
 };
 
 export const pagesAPI = {
@@ -101,12 +113,62 @@ export const takeappAPI = {
 };
 
 export const ordersAPI = {
-  create: (data) => api.post('/orders/create', data),
-  getAll: () => api.get('/orders'),
+  create: (data, idempotencyKey = null) =>
+    api.post('/orders/create', data, idempotencyKey ? { headers: { 'Idempotency-Key': idempotencyKey } } : undefined),
+  getAll: (status = null) => api.get(status ? `/orders?status=${status}` : '/orders'),
+  updateStatuses: (updates) => api.patch('/orders/status', { updates }),
+  // Live new/changed orders. EventSource cannot send headers, so it connects with a short-lived stream
+  // token in the URL, fetched again whenever the connection has to be reopened. onStatus(true/false)
+  // reports whether the stream is connected, so callers can poll while it is not. Call .close() when done.
+  // With the default local order feed (ORDER_FEED_BACKEND=local) the stream only carries orders written
+  // by the worker it is connected to; run the changestream feed when there is more than one worker.
+  stream: (onOrder, onReset, onStatus) => {
+    let source = null;
+    let closed = false;
+    let lastEventId = '';
+    const connect = async () => {
+      const { data } = await api.post('/orders/stream/token');
+      if (closed) return;
+      const params = new URLSearchParams({ token: data.token });
+      if (lastEventId) params.set('last_event_id', lastEventId);
+      source = new EventSource(`${API_URL}/orders/stream?${params}`);
+      if (onStatus) source.onopen = () => onStatus(true);
+      source.addEventListener('order', (event) => {
+        lastEventId = event.lastEventId || lastEventId;
+        onOrder(JSON.parse(event.data));
+      });
+      if (onReset) source.addEventListener('reset', onReset);
+      // A reconnect refused once the token expired closes the source for good
+      source.onerror = () => {
+        if (onStatus) onStatus(false);
+        if (source.readyState === EventSource.CLOSED) reconnect();
+      };
+    };
+    const reconnect = () => {
+      if (closed) return;
+      if (onStatus) onStatus(false);
+      setTimeout(() => connect().catch(reconnect), 3000);
+    };
+    connect().catch(reconnect);
+    return {
+      close: () => {
+        closed = true;
+        if (source) source.close();
+      },
+    };
+  },
   uploadPaymentScreenshot: (orderId, screenshotUrl) =>
     api.post(`/orders/${orderId}/payment-screenshot`, { screenshot_url: screenshotUrl }),
 };
 
+export const variationsAPI = {
+  getPrices: (variationIds) => api.get(`/variations/prices?ids=${variationIds.map(encodeURIComponent).join(',')}`),
+};
+
+export const cartAPI = {
+  quote: (items, promoCode = null) => api.post('/cart/quote', { items, promo_code: promoCode }),
+};
+
 export const promoCodesAPI = {
   getAll: () => api.get('/promo-codes'),
   create: (data) => api.post('/promo-codes', data),
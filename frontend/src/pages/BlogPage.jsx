@@ -50,7 +50,7 @@ export default function BlogPage() {
                     <div className="flex-1 min-w-0">
                       <h2 className="font-heading text-xl font-semibold text-white group-hover:text-gold-500 transition-colors">{post.title}</h2>
                       <p className="text-white/60 text-sm mt-2 line-clamp-2">{post.excerpt}</p>
-                      <div className="flex items-center gap-2 mt-3 text-gold-500 text-sm">Read more <ArrowRight className="h-4 w-4 group-hover:translate-x-1 transition-transform" /></div>
+                      <div className="flex items-center gap-2 mt-3 text-gold-500 text-sm">Read more <ArrowRight className="h-4 w-4 group-hover:translate-x-1 transition-transform" />{post.reading_time_minutes && <span className="text-white/40 ml-2">{post.reading_time_minutes} min read</span>}</div>
                     </div>
                   </div>
                 </Link>
@@ -56,8 +56,19 @@ export default function BlogPostPage() {
           <Link to="/blog" className="inline-flex items-center text-white/60 hover:text-gold-500 mb-6 transition-colors"><ArrowLeft className="h-4 w-4 mr-2" />Back to Blog</Link>
           {post.image_url && <img src={post.image_url} alt={post.title} className="w-full h-64 object-cover rounded-lg mb-6" />}
           <h1 className="font-heading text-3xl md:text-4xl font-bold text-white mb-4">{post.title}</h1>
-          <p className="text-white/60 text-lg mb-8">{post.excerpt}</p>
-          <div className="prose prose-invert prose-gold max-w-none rich-text-content" dangerouslySetInnerHTML={{ __html: post.content }} />
+          <p className="text-white/60 text-lg mb-2">{post.excerpt}</p>
+          {post.reading_time_minutes && <p className="text-white/40 text-sm mb-8">{post.reading_time_minutes} min read</p>}
+          {post.toc?.length > 1 && (
+            <nav className="bg-card border border-white/10 rounded-lg p-4 mb-8">
+              <p className="text-white font-semibold mb-2">Contents</p>
+              <ul className="space-y-1">
+                {post.toc.map((item) => (
+                  <li key={item.id} className={item.level > 2 ? 'pl-4' : ''}><a href={`#${item.id}`} className="text-white/60 hover:text-gold-500 text-sm">{item.text}</a></li>
+                ))}
+              </ul>
+            </nav>
+          )}
+          <div className="prose prose-invert prose-gold max-w-none rich-text-content" dangerouslySetInnerHTML={{ __html: post.content_html ?? post.content }} />
         </article>
       </main>
       <Footer />
@@ -9,6 +9,9 @@ import { Button } from '@/components/ui/button';
 import { productsAPI, categoriesAPI, reviewsAPI, notificationBarAPI, blogAPI, paymentMethodsAPI } from '@/lib/api';
 
 const TRUSTPILOT_URL = "https://www.trustpilot.com/review/gameshopnepal.com";
+const SEARCH_DEBOUNCE_MS = 250;
+// The server's cap; the home grid filters every product, so take as many matches as allowed
+const SEARCH_LIMIT = 100;
 
 const TRUST_FEATURES = [
   { icon: Shield, title: 'Secure Payments', desc: '100% safe & encrypted' },
@@ -27,13 +30,14 @@ export default function HomePage() {
   const [isLoading, setIsLoading] = useState(true);
   const [selectedCategory, setSelectedCategory] = useState(null);
   const [searchQuery, setSearchQuery] = useState('');
+  const [searchMatchIds, setSearchMatchIds] = useState(new Set());
   const productsSectionRef = useRef(null);
 
   useEffect(() => {
     const fetchData = async () => {
       try {
         const [productsRes, categoriesRes, reviewsRes, notifRes, blogRes, paymentRes] = await Promise.all([
-          productsAPI.getAll(),
+          productsAPI.getSummaries(),
           categoriesAPI.getAll(),
           reviewsAPI.getAll(),
           notificationBarAPI.get().catch(() => ({ data: null })),
@@ -59,9 +63,28 @@ export default function HomePage() {
     if (search) setSearchQuery(search);
   }, []);
 
+  // Summaries carry no description, so description matches come from the server-side search,
+  // asked once typing pauses; a response for an older query is dropped
+  useEffect(() => {
+    if (!searchQuery.trim()) {
+      setSearchMatchIds(new Set());
+      return;
+    }
+    let stale = false;
+    const timer = setTimeout(() => {
+      productsAPI.search(searchQuery, null, SEARCH_LIMIT)
+        .then(res => { if (!stale) setSearchMatchIds(new Set(res.data.results.map(p => p.id))); })
+        .catch(() => { if (!stale) setSearchMatchIds(new Set()); });
+    }, SEARCH_DEBOUNCE_MS);
+    return () => {
+      stale = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery]);
+
   const filteredProducts = products.filter(product => {
     const matchesCategory = !selectedCategory || product.category_id === selectedCategory;
-    const matchesSearch = !searchQuery || product.name.toLowerCase().includes(searchQuery.toLowerCase()) || product.description?.toLowerCase().includes(searchQuery.toLowerCase());
+    const matchesSearch = !searchQuery || product.name.toLowerCase().includes(searchQuery.toLowerCase()) || searchMatchIds.has(product.id);
     return matchesCategory && matchesSearch;
   });
 
@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { useParams, Link } from 'react-router-dom';
 import { ArrowLeft, Check, ShoppingCart, Loader2, ExternalLink, AlertCircle, Ticket, X } from 'lucide-react';
 import Navbar from '@/components/Navbar';
@@ -11,7 +11,7 @@ import { Input } from '@/components/ui/input';
 import { Textarea } from '@/components/ui/textarea';
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from '@/components/ui/dialog';
 import { toast } from 'sonner';
-import { productsAPI, ordersAPI, promoCodesAPI, settingsAPI } from '@/lib/api';
+import { productsAPI, ordersAPI, cartAPI, settingsAPI } from '@/lib/api';
 
 export default function ProductPage() {
   const { productSlug } = useParams();
@@ -30,6 +30,8 @@ export default function ProductPage() {
   const [isValidatingPromo, setIsValidatingPromo] = useState(false);
   
   // Pricing settings
+  // One key per checkout attempt so retried submissions don't create duplicate orders
+  const idempotencyKeyRef = useRef(null);
   const [pricingSettings, setPricingSettings] = useState({ service_charge: 0, tax_percentage: 0, tax_label: 'Tax' });
 
   useEffect(() => {
@@ -62,13 +64,29 @@ export default function ProductPage() {
   const taxAmount = afterDiscount * (taxPercentage / 100);
   const total = afterDiscount + serviceCharge + taxAmount;
 
+  // The server quote prices the cart the same way the order will be charged
+  const quotePromo = async (code, variationId) => {
+    const res = await cartAPI.quote([{ variation_id: variationId, quantity: 1 }], code);
+    return { code: res.data.promo_code, discount_amount: res.data.discount_amount, variation_id: variationId };
+  };
+
+  useEffect(() => {
+    if (!promoDiscount || !selectedVariation || promoDiscount.variation_id === selectedVariation) return;
+    quotePromo(promoDiscount.code, selectedVariation)
+      .then(setPromoDiscount)
+      .catch(error => {
+        toast.error(error.response?.data?.detail || 'Promo code does not apply to this option');
+        setPromoDiscount(null);
+      });
+  }, [selectedVariation, promoDiscount]);
+
   const handleApplyPromo = async () => {
-    if (!promoCode.trim()) return;
+    if (!promoCode.trim() || !selectedVariation) return;
     setIsValidatingPromo(true);
     try {
-      const res = await promoCodesAPI.validate(promoCode.trim(), subtotal);
-      setPromoDiscount(res.data);
-      toast.success(`Promo code applied! You save Rs ${res.data.discount_amount}`);
+      const discount = await quotePromo(promoCode.trim(), selectedVariation);
+      setPromoDiscount(discount);
+      toast.success(`Promo code applied! You save Rs ${discount.discount_amount}`);
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Invalid promo code');
       setPromoDiscount(null);
@@ -108,12 +126,14 @@ export default function ProductPage() {
         customer_name: orderForm.customer_name,
         customer_phone: orderForm.customer_phone,
         customer_email: orderForm.customer_email || null,
-        items: [{ name: product.name, price: currentVariation.price, quantity: 1, variation: currentVariation.name }],
+        items: [{ name: product.name, price: currentVariation.price, quantity: 1, variation: currentVariation.name, variation_id: currentVariation.id }],
         total_amount: total,
+        promo_code: promoDiscount?.code || null,
         remark: fullRemark.trim() || null
       };
 
-      const res = await ordersAPI.create(orderPayload);
+      if (!idempotencyKeyRef.current) idempotencyKeyRef.current = crypto.randomUUID();
+      const res = await ordersAPI.create(orderPayload, idempotencyKeyRef.current);
       setOrderData({ order_id: res.data.order_id, takeapp_order_id: res.data.takeapp_order_id, payment_url: res.data.payment_url });
       setOrderStep('payment');
       if (!res.data.payment_url) toast.warning('Order created but payment link not available. Please contact support.');
@@ -134,6 +154,7 @@ export default function ProductPage() {
     setIsOrderDialogOpen(false);
     setOrderStep('form');
     setOrderData(null);
+    idempotencyKeyRef.current = null;
     setOrderForm({ customer_name: '', customer_phone: '', customer_email: '', custom_fields: {}, remark: '' });
     setPromoCode('');
     setPromoDiscount(null);
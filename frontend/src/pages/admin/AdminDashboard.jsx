@@ -1,12 +1,20 @@
 import { useEffect, useState } from 'react';
-import { Package, FolderOpen, Star, Share2 } from 'lucide-react';
+import { Package, FolderOpen, Star, Share2, ShoppingCart } from 'lucide-react';
 import { Link } from 'react-router-dom';
 import AdminLayout from '@/components/AdminLayout';
-import { productsAPI, categoriesAPI, reviewsAPI, socialLinksAPI } from '@/lib/api';
+import { productsAPI, categoriesAPI, reviewsAPI, socialLinksAPI, ordersAPI } from '@/lib/api';
+
+// Polling only runs while the order stream is disconnected
+const ORDERS_FALLBACK_POLL_MS = 30000;
+const RECENT_ORDERS_SHOWN = 10;
+
+const byNewest = (a, b) => (b.created_at || '').localeCompare(a.created_at || '');
 
 export default function AdminDashboard() {
   const [stats, setStats] = useState({ products: 0, categories: 0, reviews: 0, socialLinks: 0 });
   const [isLoading, setIsLoading] = useState(true);
+  const [orders, setOrders] = useState([]);
+  const [isLive, setIsLive] = useState(false);
 
   useEffect(() => {
     const fetchStats = async () => {
@@ -27,6 +35,36 @@ export default function AdminDashboard() {
     fetchStats();
   }, []);
 
+  useEffect(() => {
+    let pollTimer = null;
+    const loadOrders = async () => {
+      try {
+        const res = await ordersAPI.getAll();
+        setOrders([...res.data].sort(byNewest));
+      } catch (error) {
+        console.error('Error fetching orders:', error);
+      }
+    };
+    const applyEvent = ({ order }) => {
+      setOrders((current) => [order, ...current.filter((o) => o.id !== order.id)].sort(byNewest));
+    };
+    const onStatus = (connected) => {
+      setIsLive(connected);
+      if (connected && pollTimer) {
+        clearInterval(pollTimer);
+        pollTimer = null;
+      } else if (!connected && !pollTimer) {
+        pollTimer = setInterval(loadOrders, ORDERS_FALLBACK_POLL_MS);
+      }
+    };
+    loadOrders();
+    const stream = ordersAPI.stream(applyEvent, loadOrders, onStatus);
+    return () => {
+      stream.close();
+      if (pollTimer) clearInterval(pollTimer);
+    };
+  }, []);
+
   const statCards = [
     { label: 'Categories', value: stats.categories, icon: FolderOpen, color: 'bg-purple-500/10 text-purple-500', link: '/admin/categories' },
     { label: 'Products', value: stats.products, icon: Package, color: 'bg-blue-500/10 text-blue-500', link: '/admin/products' },
@@ -50,6 +88,23 @@ export default function AdminDashboard() {
           })}
         </div>
 
+        <div className="bg-card border border-white/10 rounded-lg p-4 lg:p-6" data-testid="recent-orders">
+          <div className="flex items-center justify-between mb-4">
+            <div className="flex items-center gap-3"><ShoppingCart className="h-5 w-5 text-gold-500" /><h2 className="font-heading text-lg lg:text-xl font-semibold text-white uppercase">Recent Orders</h2></div>
+            <span className={`text-xs ${isLive ? 'text-green-500' : 'text-white/40'}`}>{isLive ? 'Live' : 'Refreshing every 30s'}</span>
+          </div>
+          {orders.length === 0 ? <p className="text-white/40 text-center py-4">No orders yet</p> : (
+            <div className="space-y-2 max-h-80 overflow-y-auto">
+              {orders.slice(0, RECENT_ORDERS_SHOWN).map((order) => (
+                <div key={order.id} className="bg-black/50 rounded-lg p-3 flex items-center justify-between">
+                  <div><p className="text-white text-sm font-medium">{order.customer_name}</p><p className="text-white/40 text-xs">{order.items_text}</p></div>
+                  <div className="text-right"><p className="text-gold-500 font-medium">Rs {order.total_amount}</p><p className="text-white/40 text-xs">{order.status}</p></div>
+                </div>
+              ))}
+            </div>
+          )}
+        </div>
+
         <div className="bg-card border border-white/10 rounded-lg p-4 lg:p-6">
           <h2 className="font-heading text-lg lg:text-xl font-semibold text-white uppercase mb-4">Quick Actions</h2>
           <div className="grid grid-cols-1 sm:grid-cols-3 gap-3 lg:gap-4">
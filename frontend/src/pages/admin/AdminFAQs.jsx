@@ -52,7 +52,7 @@ export default function AdminFAQs() {
     const [removed] = newFaqs.splice(startIndex, 1);
     newFaqs.splice(endIndex, 0, removed);
     setFaqs(newFaqs);
-    try { await faqsAPI.reorder(newFaqs.map(f => f.id)); toast.success('Order updated'); } catch (error) { toast.error('Failed to reorder'); fetchFAQs(); }
+    try { await faqsAPI.move(removed.id, newFaqs[endIndex - 1]?.id ?? null); toast.success('Order updated'); } catch (error) { toast.error('Failed to reorder'); fetchFAQs(); }
   };
 
   return (
@@ -87,7 +87,7 @@ export default function AdminProducts() {
     if (newIndex < 0 || newIndex >= products.length) return;
     [newProducts[index], newProducts[newIndex]] = [newProducts[newIndex], newProducts[index]];
     setProducts(newProducts);
-    try { await productsAPI.reorder(newProducts.map(p => p.id)); } catch (error) { toast.error('Failed to reorder'); fetchData(); }
+    try { await productsAPI.move(newProducts[newIndex].id, newProducts[newIndex - 1]?.id ?? null); } catch (error) { toast.error('Failed to reorder'); fetchData(); }
   };
 
   const getCategoryName = (categoryId) => categories.find(c => c.id === categoryId)?.name || categoryId;
@@ -0,0 +1,10 @@
+"""Puts the backend package on the path. The Mongo client connects lazily, so importing needs no server."""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "gameshop_test")
+# One process, nothing to broadcast to
+os.environ.setdefault("CACHE_BUS_BACKEND", "local")
@@ -0,0 +1,132 @@
+"""Invalidation bus behaviour, using the in-process bus as two workers sharing a hub."""
+import asyncio
+
+import pytest
+
+from gameshop import cache
+from gameshop.cache import LocalInvalidationBus
+
+
+@pytest.fixture(autouse=True)
+def short_debounce(monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_BUS_DEBOUNCE_SECONDS", 0.01)
+
+
+def make_workers(*collections):
+    hub = []
+    workers = [LocalInvalidationBus(hub), LocalInvalidationBus(hub)]
+    reloads = [[], []]
+    for worker, calls in zip(workers, reloads):
+        async def listener(collection, calls=calls):
+            calls.append(collection)
+
+        worker.subscribe(listener, *collections)
+    return workers, reloads
+
+
+def test_burst_of_changes_reloads_once():
+    async def scenario():
+        (writer, reader), (writer_reloads, reader_reloads) = make_workers("products")
+        for _ in range(1000):
+            await writer.publish("products")
+        await reader.drain()
+        assert reader_reloads == ["products"]
+        assert reader.version("products") == 1000
+        # The writer refreshed its own caches before publishing
+        assert writer_reloads == []
+
+    asyncio.run(scenario())
+
+
+def test_change_during_reload_reloads_again():
+    async def scenario():
+        (writer, reader), _ = make_workers()
+        started = asyncio.Event()
+        release = asyncio.Event()
+        calls = []
+
+        async def slow_listener(collection):
+            calls.append(collection)
+            started.set()
+            await release.wait()
+
+        reader.subscribe(slow_listener, "products")
+        await writer.publish("products")
+        await started.wait()
+        for _ in range(10):
+            await writer.publish("products")
+        release.set()
+        await reader.drain()
+        assert calls == ["products", "products"]
+
+    asyncio.run(scenario())
+
+
+def test_unwatched_collections_only_bump_versions():
+    async def scenario():
+        (writer, reader), (_, reader_reloads) = make_workers("products")
+        await writer.publish("orders")
+        await reader.drain()
+        assert reader_reloads == []
+        assert reader.version("orders") == 1
+
+    asyncio.run(scenario())
+
+
+def test_changes_already_applied_are_skipped():
+    async def scenario():
+        (_, reader), (_, reader_reloads) = make_workers("products")
+        reader.mark_applied("products", 10)
+        await reader._receive("products", 7)
+        await reader._receive("products", 10)
+        await reader.drain()
+        assert reader_reloads == []
+        await reader._receive("products", 11)
+        await reader.drain()
+        assert reader_reloads == ["products"]
+
+    asyncio.run(scenario())
+
+
+def test_failing_listener_does_not_block_others():
+    async def scenario():
+        (writer, reader), (_, reader_reloads) = make_workers("promo_codes")
+
+        async def broken(collection):
+            raise RuntimeError("boom")
+
+        reader._listeners.insert(0, (broken, {"promo_codes"}))
+        await writer.publish("promo_codes")
+        await reader.drain()
+        assert reader_reloads == ["promo_codes"]
+
+    asyncio.run(scenario())
+
+
+def test_bus_without_broadcast_fails_on_construction():
+    class IncompleteBus(cache.InvalidationBus):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteBus()
+
+
+def test_local_bus_refuses_several_workers(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    with pytest.raises(RuntimeError):
+        cache.create_invalidation_bus("local")
+
+
+def test_reads_go_to_the_primary_right_after_a_change(monkeypatch):
+    primary, secondary = object(), object()
+    bus = LocalInvalidationBus([])
+    monkeypatch.setattr(cache, "cache_bus", bus)
+    monkeypatch.setattr(cache, "db", primary)
+    assert cache.fresh_read_db("products", secondary) is secondary
+
+    asyncio.run(bus.publish("products"))
+    assert cache.fresh_read_db("products", secondary) is primary
+    assert cache.fresh_read_db("faqs", secondary) is secondary
+
+    bus.changed_at["products"] -= cache.MAX_STALENESS_SECONDS
+    assert cache.fresh_read_db("products", secondary) is secondary
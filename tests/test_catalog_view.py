@@ -0,0 +1,43 @@
+"""Products moved out of a deleted category are listed as their own slice."""
+import asyncio
+import json
+
+from gameshop.indexes import CatalogView
+from gameshop.models import UNCATEGORIZED_ID
+
+
+def product(product_id, category_id):
+    return {"id": product_id, "name": product_id, "slug": product_id, "description": "", "image_url": "",
+            "category_id": category_id, "variations": [], "created_at": "2026-01-01T00:00:00+00:00"}
+
+
+def listed_ids(view, category_id):
+    return sorted(p["id"] for p in json.loads(view.listing(category_id)))
+
+
+def test_uncategorized_products_have_their_own_listing():
+    async def scenario():
+        view = CatalogView()
+        view.build([product("a", "games"), product("b", UNCATEGORIZED_ID)])
+        assert listed_ids(view, UNCATEGORIZED_ID) == ["b"]
+        assert listed_ids(view, "games") == ["a"]
+        assert listed_ids(view, None) == ["a", "b"]
+
+        view.upsert(product("a", UNCATEGORIZED_ID))
+        assert listed_ids(view, UNCATEGORIZED_ID) == ["a", "b"]
+        assert listed_ids(view, "games") == []
+
+    asyncio.run(scenario())
+
+
+def test_unknown_category_ids_are_not_cached():
+    async def scenario():
+        view = CatalogView()
+        view.set_categories([{"id": "games", "name": "Games", "slug": "games"}])
+        view.build([product("a", "games")])
+        for n in range(100):
+            assert view.listing(f"random-{n}") == b"[]"
+        assert listed_ids(view, "games") == ["a"]
+        assert {key[0] for key in view._slices} == {"games"}
+
+    asyncio.run(scenario())
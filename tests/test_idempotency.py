@@ -0,0 +1,59 @@
+"""Idempotency-Key claims left behind by a crashed worker are taken over by a retry."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from gameshop.routers import orders  # noqa: E402
+from gameshop.routers.orders import IdempotencyStore  # noqa: E402
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(orders, "IDEMPOTENCY_WAIT_SECONDS", 0.3)
+    database = mongomock_motor.AsyncMongoMockClient()["idempotency_test"]
+
+    async def setup():
+        await database.idempotency_keys.create_index("key", unique=True)
+
+    asyncio.run(setup())
+    return IdempotencyStore(database)
+
+
+def abandoned_claim(age_seconds, fingerprint="f1"):
+    claimed_at = datetime.now(timezone.utc) - timedelta(seconds=age_seconds)
+    return {"key": "k1", "fingerprint": fingerprint, "state": "in_progress", "claim_id": "dead",
+            "claimed_at": claimed_at, "created_at": claimed_at}
+
+
+def test_retry_takes_over_a_stale_claim(store):
+    async def scenario():
+        await store._db.idempotency_keys.insert_one(abandoned_claim(orders.IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS + 5))
+
+        async def compute():
+            return {"order_id": "o1"}
+
+        result = await store.run("k1", "f1", compute)
+        return result, await store._db.idempotency_keys.find_one({"key": "k1"})
+
+    (response, replayed), stored = asyncio.run(scenario())
+
+    assert (response, replayed) == ({"order_id": "o1"}, False)
+    assert stored["state"] == "completed"
+
+
+def test_recent_claim_is_not_taken_over(store):
+    async def scenario():
+        await store._db.idempotency_keys.insert_one(abandoned_claim(1))
+
+        async def compute():
+            raise AssertionError("the claim is still live")
+
+        with pytest.raises(HTTPException) as raised:
+            await store.run("k1", "f1", compute)
+        return raised.value
+
+    assert asyncio.run(scenario()).status_code == 409
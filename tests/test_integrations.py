@@ -0,0 +1,288 @@
+"""Take.app and Trustpilot syncs against a local HTTP stub standing in for the real services."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import HTTPException
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from gameshop import indexes, ordering, slugs  # noqa: E402
+from gameshop.routers import content, integrations  # noqa: E402
+
+# Modules whose database handles the sync code paths read and write through
+DATABASE_HANDLES = [
+    (integrations, "db"), (content, "db"), (content, "read_db"), (indexes, "db"), (ordering, "db"), (slugs, "db"),
+]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        self.server.requests.append((path, query))
+        status, body, delay = self.server.routes.get(path, (404, "", 0))
+        time.sleep(delay)
+        payload = body if isinstance(body, str) else json.dumps(body)
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html" if isinstance(body, str) else "application/json")
+            self.end_headers()
+            self.wfile.write(payload.encode())
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up after its timeout
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.routes = {}
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Point the sync code paths at one in-memory database"""
+    database = mongomock_motor.AsyncMongoMockClient()["integrations_test"]
+    for module, attr in DATABASE_HANDLES:
+        monkeypatch.setattr(module, attr, database)
+    return database
+
+
+@pytest.fixture
+def takeapp(stub, monkeypatch):
+    monkeypatch.setattr(integrations, "TAKEAPP_API_KEY", "test-key")
+    monkeypatch.setattr(integrations, "TAKEAPP_BASE_URL", stub.url)
+    monkeypatch.setattr(integrations, "TAKEAPP_TIMEOUT_SECONDS", 0.3)
+    return stub
+
+
+@pytest.fixture
+def trustpilot(stub, monkeypatch):
+    monkeypatch.setattr(integrations, "TRUSTPILOT_SITE_URL", stub.url)
+    monkeypatch.setattr(integrations, "TRUSTPILOT_TIMEOUT_SECONDS", 0.3)
+    return stub
+
+
+def inventory_item(item_id, name, price, quantity=5):
+    return {"id": item_id, "name": name, "price": price, "quantity": quantity, "description": f"{name} top-up"}
+
+
+def trustpilot_page(*reviews):
+    next_data = {"props": {"pageProps": {"reviews": [
+        {
+            "consumer": {"displayName": reviewer},
+            "rating": rating,
+            "text": text,
+            "dates": {"publishedDate": "2024-05-01T10:00:00Z"},
+        }
+        for reviewer, rating, text in reviews
+    ]}}}
+    return f'<html><script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data)}</script></html>'
+
+
+def test_takeapp_product_sync_adds_updates_and_removes(takeapp, database):
+    async def scenario():
+        takeapp.routes["/inventory"] = (200, [
+            inventory_item("a1", "PUBG UC", 1000),
+            inventory_item("b2", "Free Fire Diamonds", 500),
+            inventory_item("c3", "Steam Wallet", 2000),
+            inventory_item("d4", "Netflix", 1500),
+        ], 0)
+        first = await integrations.sync_takeapp_products(current_user={})
+        products = await database.products.find({}, {"_id": 0}).to_list(None)
+
+        takeapp.routes["/inventory"] = (200, [
+            inventory_item("a1", "PUBG UC", 1200),
+            inventory_item("c3", "Steam Wallet", 2000),
+            inventory_item("d4", "Netflix", 1500),
+        ], 0)
+        second = await integrations.sync_takeapp_products(current_user={})
+        remaining = await database.products.find({}, {"_id": 0}).sort("takeapp_id", 1).to_list(None)
+        return first, products, second, remaining
+
+    first, products, second, remaining = asyncio.run(scenario())
+
+    assert first["success"] is True
+    assert (first["added"], first["updated"], first["removed"]) == (4, 0, 0)
+    assert sorted(p["takeapp_id"] for p in products) == ["a1", "b2", "c3", "d4"]
+    assert len({p["slug"] for p in products}) == 4
+    assert (second["added"], second["updated"], second["removed"], second["unchanged"]) == (0, 1, 1, 2)
+    assert [p["takeapp_id"] for p in remaining] == ["a1", "c3", "d4"]
+    assert remaining[0]["variations"][0]["price"] == 1200
+    assert all(query == "api_key=test-key" for _, query in takeapp.requests)
+
+
+def test_takeapp_product_sync_skips_malformed_items_and_creates_its_category(takeapp, database):
+    async def scenario():
+        takeapp.routes["/inventory"] = (200, [
+            inventory_item("a1", "PUBG UC", 1000),
+            inventory_item("a2", "PUBG UC", 2000),
+            {"name": "No id", "price": 10},
+            inventory_item("b2", "Broken price", "n/a"),
+        ], 0)
+        result = await integrations.sync_takeapp_products(current_user={})
+        products = await database.products.find({}, {"_id": 0}).sort("takeapp_id", 1).to_list(None)
+        categories = await database.categories.find({}, {"_id": 0}).to_list(None)
+        return result, products, categories
+
+    result, products, categories = asyncio.run(scenario())
+
+    assert result["success"] is True
+    assert (result["added"], result["skipped"], result["unchanged"]) == (2, 2, 0)
+    assert [p["slug"] for p in products] == ["pubg-uc", "pubg-uc-2"]
+    assert categories == [{"id": integrations.TAKEAPP_SYNC_CATEGORY_ID, "name": integrations.TAKEAPP_SYNC_CATEGORY_NAME, "slug": "take-app"}]
+    assert {p["category_id"] for p in products} == {integrations.TAKEAPP_SYNC_CATEGORY_ID}
+
+
+def test_takeapp_product_sync_of_unchanged_catalog_writes_nothing(takeapp, database, monkeypatch):
+    takeapp.routes["/inventory"] = (200, [
+        inventory_item("a1", "PUBG UC", 1000),
+        inventory_item("b2", "Free Fire Diamonds", 500),
+    ], 0)
+    asyncio.run(integrations.sync_takeapp_products(current_user={}))
+
+    writes = []
+
+    async def bulk_write(self, operations, **kwargs):
+        writes.append(operations)
+
+    monkeypatch.setattr(type(database.products), "bulk_write", bulk_write)
+    result = asyncio.run(integrations.sync_takeapp_products(current_user={}))
+
+    assert writes == []
+    assert (result["added"], result["updated"], result["removed"], result["writes"]) == (0, 0, 0, 0)
+    assert result["unchanged"] == 2
+
+
+@pytest.mark.parametrize("inventory", [
+    [],
+    [inventory_item("a1", "PUBG UC", 1000)],
+], ids=["empty", "truncated"])
+def test_takeapp_product_sync_keeps_products_missing_from_a_shrunken_inventory(takeapp, database, inventory):
+    async def scenario():
+        takeapp.routes["/inventory"] = (200, [
+            inventory_item("a1", "PUBG UC", 1000),
+            inventory_item("b2", "Free Fire Diamonds", 500),
+            inventory_item("c3", "Steam Wallet", 2000),
+        ], 0)
+        await integrations.sync_takeapp_products(current_user={})
+        takeapp.routes["/inventory"] = (200, inventory, 0)
+        kept = await integrations.sync_takeapp_products(current_user={})
+        count_after_kept = await database.products.count_documents({})
+        forced = await integrations.sync_takeapp_products(allow_mass_removal=True, current_user={})
+        return kept, count_after_kept, forced, await database.products.count_documents({})
+
+    kept, count_after_kept, forced, count_after_forced = asyncio.run(scenario())
+
+    assert (kept["removed"], kept["removal_skipped"]) == (0, 3 - len(inventory))
+    assert count_after_kept == 3
+    assert (forced["removed"], forced["removal_skipped"]) == (3 - len(inventory), 0)
+    assert count_after_forced == len(inventory)
+
+
+def test_takeapp_product_sync_error_leaves_products_alone(takeapp, database):
+    async def scenario():
+        await database.products.insert_one({"id": "local-1", "takeapp_id": "a1", "takeapp_hash": "x"})
+        takeapp.routes["/inventory"] = (500, {"error": "boom"}, 0)
+        with pytest.raises(HTTPException) as raised:
+            await integrations.sync_takeapp_products(current_user={})
+        return raised.value, await database.products.count_documents({})
+
+    error, count = asyncio.run(scenario())
+
+    assert error.status_code == 500
+    assert error.detail == "Failed to fetch inventory"
+    assert count == 1
+
+
+def test_takeapp_product_sync_timeout(takeapp, database):
+    takeapp.routes["/inventory"] = (200, [], 1.0)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(integrations.sync_takeapp_products(current_user={}))
+
+    assert raised.value.status_code == 504
+
+
+def test_takeapp_order_sync_upserts_and_reports_errors(takeapp, database):
+    async def scenario():
+        takeapp.routes["/orders"] = (200, [{"id": "o1", "status": "paid"}, {"id": "o2", "status": "new"}], 0)
+        first = await integrations.sync_takeapp_orders()
+        takeapp.routes["/orders"] = (200, [{"id": "o2", "status": "paid"}], 0)
+        await integrations.sync_takeapp_orders()
+        orders = await database.takeapp_orders.find({}, {"_id": 0}).sort("id", 1).to_list(None)
+
+        takeapp.routes["/orders"] = (401, {"error": "bad key"}, 0)
+        with pytest.raises(HTTPException) as raised:
+            await integrations.sync_takeapp_orders()
+        return first, orders, raised.value
+
+    first, orders, error = asyncio.run(scenario())
+
+    assert first == {"fetched": 2}
+    assert orders == [{"id": "o1", "status": "paid"}, {"id": "o2", "status": "paid"}]
+    assert error.status_code == 401
+
+
+def test_trustpilot_sync_stores_new_reviews_once(trustpilot, database):
+    trustpilot.routes[f"/review/{integrations.TRUSTPILOT_DOMAIN}"] = (200, trustpilot_page(
+        ("Aayush", 5, "Fast delivery"),
+        ("Sita", 4, "Good prices"),
+    ), 0)
+
+    async def scenario():
+        first = await integrations.sync_trustpilot()
+        second = await integrations.sync_trustpilot()
+        reviews = await database.reviews.find({}, {"_id": 0}).sort("reviewer_name", 1).to_list(None)
+        last_sync = await database.trustpilot_config.find_one({"key": "last_sync"})
+        stats = await database.review_stats.find_one({"id": content.REVIEW_STATS_ID}, {"_id": 0})
+        return first, second, reviews, last_sync, stats
+
+    first, second, reviews, last_sync, stats = asyncio.run(scenario())
+
+    assert (first["synced_count"], first["total_found"]) == (2, 2)
+    assert (second["synced_count"], second["total_found"]) == (0, 2)
+    assert [(r["reviewer_name"], r["rating"], r["source"]) for r in reviews] == [
+        ("Aayush", 5, "trustpilot"),
+        ("Sita", 4, "trustpilot"),
+    ]
+    assert last_sync is not None
+    # Counted once, although the second sync saw the same reviews again
+    assert stats["by_source"] == {"trustpilot": {"count": 2, "rating_sum": 9, "histogram": {"5": 1, "4": 1}}}
+
+
+def test_trustpilot_sync_error_status(trustpilot, database):
+    trustpilot.routes[f"/review/{integrations.TRUSTPILOT_DOMAIN}"] = (503, "<html>busy</html>", 0)
+
+    async def scenario():
+        with pytest.raises(HTTPException) as raised:
+            await integrations.sync_trustpilot_reviews(current_user={})
+        return raised.value, await database.trustpilot_config.find_one({"key": "last_sync"})
+
+    error, last_sync = asyncio.run(scenario())
+
+    assert error.status_code == 502
+    assert last_sync is None
+
+
+def test_trustpilot_sync_timeout(trustpilot, database):
+    trustpilot.routes[f"/review/{integrations.TRUSTPILOT_DOMAIN}"] = (200, trustpilot_page(), 1.0)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(integrations.sync_trustpilot())
+
+    assert raised.value.status_code == 504
@@ -0,0 +1,91 @@
+"""Gapped sort orders: appends, single-write moves and renumbering once a gap is used up."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from gameshop import ordering  # noqa: E402
+from gameshop.ordering import SORT_ORDER_GAP  # noqa: E402
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient()["ordering_test"]
+    monkeypatch.setattr(ordering, "db", database)
+    return database
+
+
+async def add(database, *item_ids):
+    for item_id in item_ids:
+        await database.faqs.insert_one({"id": item_id, "sort_order": await ordering.next_sort_order("faqs")})
+
+
+async def listed(database):
+    return [item["id"] for item in await database.faqs.find({}, {"_id": 0, "id": 1}).sort("sort_order", 1).to_list(None)]
+
+
+def test_new_items_are_appended_one_gap_apart(database):
+    async def scenario():
+        await database.faqs.insert_one({"id": "legacy", "sort_order": 5})
+        await add(database, "a", "b")
+        return await database.faqs.find({}, {"_id": 0}).sort("sort_order", 1).to_list(None)
+
+    items = asyncio.run(scenario())
+    # The first allocation starts past positions written before the counter existed
+    assert [(item["id"], item["sort_order"]) for item in items] == [
+        ("legacy", 5), ("a", 2 * SORT_ORDER_GAP), ("b", 3 * SORT_ORDER_GAP),
+    ]
+
+
+def test_move_writes_the_midpoint_between_the_new_neighbours(database):
+    async def scenario():
+        await add(database, "a", "b", "c", "d")
+        middle = await ordering.move_after("faqs", "d", "a")
+        first = await ordering.move_after("faqs", "c", None)
+        last = await ordering.move_after("faqs", "c", "b")
+        return middle, first, last, await listed(database)
+
+    middle, first, last, order = asyncio.run(scenario())
+    assert middle == 1.5 * SORT_ORDER_GAP
+    assert first == 0
+    # Last in the list: a fresh position from the counter
+    assert last == 5 * SORT_ORDER_GAP
+    assert order == ["a", "d", "b", "c"]
+
+
+def test_repeated_moves_into_one_spot_renumber_the_list(database):
+    async def scenario():
+        await add(database, "a", "b", "c")
+        # Alternating moves keep halving the gap right behind "a"
+        for _ in range(40):
+            await ordering.move_after("faqs", "c", "a")
+            await ordering.move_after("faqs", "b", "a")
+        items = await database.faqs.find({}, {"_id": 0}).sort("sort_order", 1).to_list(None)
+        appended = await ordering.next_sort_order("faqs")
+        return items, appended
+
+    items, appended = asyncio.run(scenario())
+    assert [item["id"] for item in items] == ["a", "b", "c"]
+    gaps = [b["sort_order"] - a["sort_order"] for a, b in zip(items, items[1:])]
+    assert min(gaps) >= ordering.SORT_ORDER_MIN_GAP
+    assert appended > items[-1]["sort_order"]
+
+
+def test_renumber_follows_the_given_ids(database):
+    async def scenario():
+        await add(database, "a", "b", "c")
+        await ordering.renumber_sort_orders("faqs", ["c", "a", "b"])
+        return await database.faqs.find({}, {"_id": 0}).sort("sort_order", 1).to_list(None)
+
+    items = asyncio.run(scenario())
+    assert [(item["id"], item["sort_order"]) for item in items] == [
+        ("c", SORT_ORDER_GAP), ("a", 2 * SORT_ORDER_GAP), ("b", 3 * SORT_ORDER_GAP),
+    ]
+
+
+def test_moving_a_missing_item_is_a_404(database):
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(ordering.move_after("faqs", "nope", None))
+    assert raised.value.status_code == 404
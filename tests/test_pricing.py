@@ -0,0 +1,103 @@
+"""Server-side cart pricing and the atomic promo code use counter."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from gameshop import cache, indexes, pricing  # noqa: E402
+from gameshop.pricing import CartItem  # noqa: E402
+
+
+def product(product_id, variations, **fields):
+    return {"id": product_id, "name": product_id.title(), "slug": product_id, "description": "", "image_url": "",
+            "category_id": "games", "variations": variations, "created_at": "2026-01-01T00:00:00+00:00", **fields}
+
+
+def variation(variation_id, price):
+    return {"id": variation_id, "name": variation_id, "price": price}
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient()["pricing_test"]
+    store = cache.ConfigStore(database)
+    promos = pricing.PromoCodeCache(database)
+    monkeypatch.setattr(pricing, "db", database)
+    monkeypatch.setattr(indexes, "db", database)
+    monkeypatch.setattr(indexes, "product_indexes_loaded", False)
+    monkeypatch.setattr(pricing, "config_store", store)
+    monkeypatch.setattr(pricing, "promo_code_cache", promos)
+    monkeypatch.setattr(pricing, "single_flight", cache.SingleFlight())
+
+    async def seed():
+        await database.products.insert_many([
+            product("pubg", [variation("uc-60", 100), variation("uc-325", 450)]),
+            product("netflix", [variation("nf-1m", 1200)], is_sold_out=True),
+            product("steam", [variation("st-10", 1500)], is_active=False),
+        ])
+        await database.site_settings.insert_one({"id": "main", "service_charge": 20, "tax_percentage": 13, "tax_label": "VAT"})
+        await database.promo_codes.insert_many([
+            {"id": "p1", "code": "TENOFF", "discount_type": "percentage", "discount_value": 10, "is_active": True,
+             "used_count": 0, "max_uses": 2, "min_order_amount": 0},
+            {"id": "p2", "code": "BIG", "discount_type": "fixed", "discount_value": 50, "is_active": True,
+             "used_count": 0, "max_uses": None, "min_order_amount": 1000},
+        ])
+
+    asyncio.run(seed())
+    return database
+
+
+def test_cart_is_priced_from_the_catalog(database):
+    quote = asyncio.run(pricing.price_cart([CartItem(variation_id="uc-60", quantity=2), CartItem(variation_id="uc-325")], "tenoff"))
+
+    assert [(line["name"], line["price"], line["line_total"]) for line in quote["items"]] == [
+        ("Pubg", 100, 200), ("Pubg", 450, 450),
+    ]
+    assert quote["subtotal"] == 650
+    assert (quote["promo_code"], quote["discount_amount"]) == ("TENOFF", 65)
+    assert (quote["service_charge"], quote["tax_label"], quote["tax_amount"]) == (20, "VAT", 76.05)
+    assert quote["total"] == 681.05
+
+
+@pytest.mark.parametrize("items, promo, status, detail", [
+    ([CartItem(variation_id="missing")], None, 400, "not found"),
+    ([CartItem(variation_id="st-10")], None, 400, "not found"),
+    ([CartItem(variation_id="nf-1m")], None, 400, "sold out"),
+    ([CartItem(variation_id="uc-60")], "BIG", 400, "Minimum order amount"),
+    ([CartItem(variation_id="uc-60")], "NOPE", 404, "Invalid promo code"),
+])
+def test_cart_that_cannot_be_priced_is_rejected(database, items, promo, status, detail):
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(pricing.price_cart(items, promo))
+    assert raised.value.status_code == status
+    assert detail in raised.value.detail
+
+
+def test_quantity_must_be_positive():
+    with pytest.raises(ValueError):
+        CartItem(variation_id="uc-60", quantity=0)
+
+
+def test_promo_uses_are_reserved_atomically_up_to_max_uses(database):
+    async def scenario():
+        results = await asyncio.gather(*(pricing.reserve_promo_use("TENOFF") for _ in range(5)), return_exceptions=True)
+        reserved = [r for r in results if not isinstance(r, Exception)]
+        refused = [r for r in results if isinstance(r, HTTPException)]
+        after_reserve = await database.promo_codes.find_one({"code": "TENOFF"})
+
+        await pricing.release_promo_use("TENOFF")
+        after_release = await database.promo_codes.find_one({"code": "TENOFF"})
+        cached = await pricing.promo_code_cache.get("TENOFF")
+        return len(reserved), len(refused), after_reserve["used_count"], after_release["used_count"], cached["used_count"]
+
+    assert asyncio.run(scenario()) == (2, 3, 2, 1, 1)
+
+
+def test_released_use_never_goes_below_zero(database):
+    async def scenario():
+        await pricing.release_promo_use("BIG")
+        return (await database.promo_codes.find_one({"code": "BIG"}))["used_count"]
+
+    assert asyncio.run(scenario()) == 0
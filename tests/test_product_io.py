@@ -0,0 +1,112 @@
+"""Bulk product import and export: formats, validation errors and an export/import round trip."""
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from gameshop import indexes, ordering, product_io, slugs  # noqa: E402
+from gameshop.models import UNCATEGORIZED_ID  # noqa: E402
+from gameshop.product_io import ROW_READERS, ProductImporter, export_chunks  # noqa: E402
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient()["product_io_test"]
+    for module in (product_io, indexes, ordering, slugs):
+        monkeypatch.setattr(module, "db", database)
+    asyncio.run(database.categories.insert_one({"id": "cat-games", "name": "Mobile Games", "slug": "mobile-games"}))
+    return database
+
+
+async def chunked(body: bytes, size: int = 7):
+    # Small chunks, so rows and quoted cells are split across reads
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+async def run_import(fmt: str, body: bytes, dry_run: bool = False) -> dict:
+    importer = ProductImporter(dry_run=dry_run)
+    await importer.start()
+    async for row_number, data, error in ROW_READERS[fmt](chunked(body)):
+        await importer.add(row_number, data, error)
+    await importer.flush()
+    return await importer.finish()
+
+
+async def run_export(fmt: str) -> bytes:
+    return b"".join([chunk async for chunk in export_chunks(fmt)])
+
+
+def row(name, **fields):
+    return {"name": name, "description": f"{name}, multi\nline \"quoted\"", "image_url": "", "category_id": "Mobile Games",
+            "variations": [{"id": f"{name}-v", "name": "Default", "price": 100}], "tags": ["top-up", "fast"], **fields}
+
+
+def ndjson(*rows) -> bytes:
+    return "\n".join(json.dumps(r) for r in rows).encode()
+
+
+def test_import_reports_each_invalid_row_and_writes_the_rest(database):
+    body = b"\n".join([
+        json.dumps(row("PUBG UC")).encode(),
+        b"{not json",
+        b"[1, 2]",
+        json.dumps(row("")).encode(),
+        json.dumps(row("Steam", category_id="nope")).encode(),
+        json.dumps(row("Netflix", variations=[{"name": "1 month", "price": "free"}])).encode(),
+        json.dumps(row("Loose", category_id="")).encode(),
+    ])
+
+    async def scenario():
+        report = await run_import("ndjson", body)
+        products = await database.products.find({}, {"_id": 0}).sort("sort_order", 1).to_list(None)
+        return report, products
+
+    report, products = asyncio.run(scenario())
+    assert (report["received"], report["valid"], report["inserted"], report["failed"]) == (7, 2, 2, 5)
+    errors = {error["row"]: error["error"] for error in report["errors"]}
+    assert sorted(errors) == [2, 3, 4, 5, 6]
+    assert errors[2].startswith("Invalid JSON")
+    assert errors[3] == "Expected a JSON object"
+    assert errors[4].startswith("name:")
+    assert errors[5] == "Unknown category: nope"
+    assert errors[6].startswith("variations.0.price:")
+    assert [(p["name"], p["slug"], p["category_id"]) for p in products] == [
+        ("PUBG UC", "pubg-uc", "cat-games"), ("Loose", "loose", UNCATEGORIZED_ID),
+    ]
+
+
+def test_dry_run_validates_without_writing(database):
+    async def scenario():
+        report = await run_import("ndjson", ndjson(row("PUBG UC"), row("")), dry_run=True)
+        return report, await database.products.count_documents({})
+
+    report, count = asyncio.run(scenario())
+    assert (report["dry_run"], report["valid"], report["failed"], report["inserted"]) == (True, 1, 1, 0)
+    assert count == 0
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson", "json"])
+def test_export_then_import_round_trips(database, fmt):
+    async def scenario():
+        await run_import("ndjson", ndjson(row("PUBG UC"), row("Free Fire", is_sold_out=True), row("Netflix", tags=[])))
+        exported = await run_export(fmt)
+        before = await database.products.find({}, {"_id": 0}).sort("sort_order", 1).to_list(None)
+
+        report = await run_import(fmt, exported)
+        after = await database.products.find({}, {"_id": 0}).sort("sort_order", 1).to_list(None)
+        return report, before, after
+
+    report, before, after = asyncio.run(scenario())
+    assert (report["failed"], report["inserted"], report["updated"]) == (0, 0, 3)
+    assert after == before
+    assert [p["name"] for p in after] == ["PUBG UC", "Free Fire", "Netflix"]
+
+
+def test_csv_needs_a_name_column(database):
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(run_import("csv", b"title,price\nPUBG,100\n"))
+    assert raised.value.status_code == 400
@@ -0,0 +1,44 @@
+"""Rate limit policies: shared budgets and the login body cap."""
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from gameshop.ratelimit import (
+    RATE_LIMIT_MAX_BODY_BYTES,
+    RATE_LIMIT_POLICIES,
+    MemoryRateLimitBackend,
+    RateLimitMiddleware,
+)
+
+
+async def ok(request):
+    await request.body()
+    return JSONResponse({"ok": True})
+
+
+def make_client():
+    app = Starlette(routes=[
+        Route("/api/promo-codes/validate", ok, methods=["POST"]),
+        Route("/api/cart/quote", ok, methods=["POST"]),
+        Route("/api/auth/login", ok, methods=["POST"]),
+    ])
+    return TestClient(RateLimitMiddleware(app, backend=MemoryRateLimitBackend()))
+
+
+def test_cart_quote_shares_the_promo_validate_budget():
+    client = make_client()
+    limit = RATE_LIMIT_POLICIES[("POST", "/api/promo-codes/validate")].limit
+    for _ in range(limit):
+        assert client.post("/api/promo-codes/validate", json={"code": "X"}).status_code == 200
+    response = client.post("/api/cart/quote", json={"items": [], "promo_code": "Y"})
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+
+
+def test_oversized_login_body_is_refused_without_buffering():
+    client = make_client()
+    response = client.post("/api/auth/login", content=b"x" * (RATE_LIMIT_MAX_BODY_BYTES + 1),
+                           headers={"content-type": "application/json"})
+    assert response.status_code == 413
+    assert client.post("/api/auth/login", json={"email": "admin", "password": "pw"}).status_code == 200
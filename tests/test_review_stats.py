@@ -0,0 +1,72 @@
+"""Review stats counters follow review writes, and the public read never writes."""
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from gameshop.models import ReviewCreate  # noqa: E402
+from gameshop.routers import content  # noqa: E402
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient()["review_stats_test"]
+    monkeypatch.setattr(content, "db", database)
+    monkeypatch.setattr(content, "read_db", database)
+    return database
+
+
+async def stored_stats(database):
+    doc = await database.review_stats.find_one({"id": content.REVIEW_STATS_ID}, {"_id": 0})
+    return doc["by_source"]
+
+
+async def recomputed_stats(database):
+    return (await content.compute_review_stats(database))["by_source"]
+
+
+def test_counters_follow_create_update_and_delete(database):
+    async def scenario():
+        first = await content.create_review(ReviewCreate(reviewer_name="Aayush", rating=5, comment="Fast"), current_user={})
+        await content.create_review(ReviewCreate(reviewer_name="Sita", rating=3, comment="Okay"), current_user={})
+        assert await stored_stats(database) == {"manual": {"count": 2, "rating_sum": 8, "histogram": {"5": 1, "3": 1}}}
+
+        updated = await content.update_review(first.id, ReviewCreate(reviewer_name="Aayush", rating=4, comment="Fast"), current_user={})
+        assert updated["review_date"] == first.review_date
+        assert await stored_stats(database) == {"manual": {"count": 2, "rating_sum": 7, "histogram": {"5": 0, "4": 1, "3": 1}}}
+
+        await content.delete_review(first.id, current_user={})
+        stats = content.format_review_stats({"by_source": await stored_stats(database)})
+        assert (stats["count"], stats["average_rating"]) == (1, 3)
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_rating_edits_keep_the_counters_exact(database):
+    async def scenario():
+        review = await content.create_review(ReviewCreate(reviewer_name="Aayush", rating=5, comment="Fast"), current_user={})
+        await asyncio.gather(*(
+            content.update_review(review.id, ReviewCreate(reviewer_name="Aayush", rating=rating, comment="Fast"), current_user={})
+            for rating in (1, 2, 3, 4, 1, 2)
+        ))
+        stats = content.format_review_stats({"by_source": await stored_stats(database)})
+        recomputed = content.format_review_stats({"by_source": await recomputed_stats(database)})
+        assert stats == recomputed
+        assert stats["count"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_missing_stats_are_aggregated_without_writing(database):
+    async def scenario():
+        await database.reviews.insert_many([
+            {"id": "r1", "reviewer_name": "A", "rating": 5, "comment": "", "source": "trustpilot"},
+            {"id": "r2", "reviewer_name": "B", "rating": 4, "comment": ""},
+        ])
+        stats = await content.get_review_stats()
+        assert (stats["count"], stats["average_rating"]) == (2, 4.5)
+        assert stats["by_source"]["trustpilot"]["count"] == 1
+        assert await database.review_stats.count_documents({}) == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,50 @@
+"""Blog rendering: allowlist sanitizing, heading anchors, table of contents and reading time."""
+import pytest
+
+from gameshop.sanitize import BLOG_WORDS_PER_MINUTE, render_blog_content, sanitize_html
+
+
+@pytest.mark.parametrize("html, expected", [
+    ("<p>Hi<script>alert(1)</script> there</p>", "<p>Hi there</p>"),
+    ("<p onclick=\"steal()\" class=\"lead\">Hi</p>", '<p class="lead">Hi</p>'),
+    ('<a href="javascript:alert(1)">x</a>', "<a>x</a>"),
+    ('<a href="&#106;avascript:alert(1)">x</a>', "<a>x</a>"),
+    ('<img src="data:image/svg+xml;base64,AAAA" alt="x">', '<img alt="x">'),
+    ('<a href="/shop" target="_blank" rel="opener">x</a>', '<a href="/shop" target="_blank" rel="noopener noreferrer">x</a>'),
+    ("<iframe src=\"https://evil\"><p>inside</p></iframe><p>after</p>", "<p>after</p>"),
+    ("<marquee>old</marquee> &lt;b&gt;", "old &lt;b&gt;"),
+    ("<ul><li>one<li>two</ul>", "<ul><li>one<li>two</li></li></ul>"),
+    ("<p>unclosed <strong>bold", "<p>unclosed <strong>bold</strong></p>"),
+])
+def test_sanitize_keeps_only_allowed_markup(html, expected):
+    assert sanitize_html(html) == expected
+
+
+def test_headings_get_unique_anchors_and_a_table_of_contents():
+    rendered = render_blog_content(
+        "<h2>Getting started</h2><p>Intro</p>"
+        "<h3 class=\"sub\">Top up <em>PUBG</em></h3>"
+        "<h2>Getting started</h2><h4>Not listed</h4><h2></h2>"
+    )
+    assert rendered["content_html"] == (
+        '<h2 id="getting-started">Getting started</h2><p>Intro</p>'
+        '<h3 id="top-up-pubg" class="sub">Top up <em>PUBG</em></h3>'
+        '<h2 id="getting-started-2">Getting started</h2><h4>Not listed</h4><h2 id="section"></h2>'
+    )
+    assert rendered["toc"] == [
+        {"level": 2, "id": "getting-started", "text": "Getting started"},
+        {"level": 3, "id": "top-up-pubg", "text": "Top up PUBG"},
+        {"level": 2, "id": "getting-started-2", "text": "Getting started"},
+    ]
+
+
+def test_reading_time_and_excerpt_come_from_the_text():
+    words = " ".join(["word"] * (BLOG_WORDS_PER_MINUTE * 2 + 1))
+    rendered = render_blog_content(f"<p>{words}</p><script>{words}</script>")
+    assert rendered["word_count"] == BLOG_WORDS_PER_MINUTE * 2 + 1
+    assert rendered["reading_time_minutes"] == 3
+    assert len(rendered["excerpt"]) <= 160 and rendered["excerpt"].endswith("word")
+
+    short = render_blog_content("<p>Short <b>post</b></p>", excerpt="Given")
+    assert (short["word_count"], short["reading_time_minutes"], short["excerpt"]) == (2, 1, "Given")
+    assert render_blog_content("<p>Short <b>post</b></p>")["excerpt"] == "Short post"
@@ -0,0 +1,156 @@
+"""Scheduler: schedule parsing, one run per due time across workers, and the run history."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from gameshop import scheduler as scheduler_module  # noqa: E402
+from gameshop.scheduler import CronTrigger, IntervalTrigger, Job, Scheduler, parse_schedule  # noqa: E402
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("expression, after, expected", [
+    ("*/15 * * * *", utc(2026, 1, 1, 10, 7), utc(2026, 1, 1, 10, 15)),
+    ("0 3 * * *", utc(2026, 1, 1, 3, 0), utc(2026, 1, 2, 3, 0)),
+    ("30 2 1 * *", utc(2026, 1, 31, 23, 0), utc(2026, 2, 1, 2, 30)),
+    # 2026-03-01 is a Sunday; weekday 7 means Sunday too
+    ("0 0 * * 7", utc(2026, 2, 27, 12, 0), utc(2026, 3, 1, 0, 0)),
+    ("0 9-17/4 * * 1-5", utc(2026, 1, 2, 17, 30), utc(2026, 1, 5, 9, 0)),
+    # Both day fields restricted: either one matching is enough
+    ("0 0 15 * 1", utc(2026, 1, 6, 0, 0), utc(2026, 1, 12, 0, 0)),
+    ("0 0 29 2 *", utc(2026, 3, 1, 0, 0), utc(2028, 2, 29, 0, 0)),
+])
+def test_cron_next_run(expression, after, expected):
+    assert CronTrigger(expression).next_after(after) == expected
+
+
+@pytest.mark.parametrize("schedule", ["* * * *", "60 * * * *", "0 24 * * *", "5-1 * * * *", "*/0 * * * *",
+                                      "0 0 30 2 *", "every 0m", "every 10x", "daily"])
+def test_invalid_schedules_are_rejected(schedule):
+    with pytest.raises(ValueError):
+        parse_schedule(schedule)
+
+
+def test_interval_schedule():
+    trigger = parse_schedule("every 10m")
+    assert isinstance(trigger, IntervalTrigger)
+    assert trigger.next_after(utc(2026, 1, 1, 10, 7)) == utc(2026, 1, 1, 10, 17)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "SCHEDULER_ENABLED", False)
+    return mongomock_motor.AsyncMongoMockClient()["scheduler_test"]
+
+
+def make_workers(database, *jobs, count=3):
+    workers = [Scheduler(database, max_concurrency=2) for _ in range(count)]
+    for worker in workers:
+        for job in jobs:
+            worker.add_job(job)
+    return workers
+
+
+async def make_due(database, name):
+    await database.scheduled_jobs.update_one({"_id": name}, {"$set": {"next_run_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+
+
+async def settle(workers):
+    for worker in workers:
+        await asyncio.gather(*list(worker.running.values()), return_exceptions=True)
+
+
+def test_a_due_job_runs_on_exactly_one_worker(database):
+    runs = []
+
+    async def sync():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return {"synced": 3}
+
+    async def scenario():
+        workers = make_workers(database, Job("sync", sync, "every 1h"))
+        for worker in workers:
+            await worker.start()
+        await make_due(database, "sync")
+        await asyncio.gather(*(worker.run_due() for worker in workers))
+        # The lease also keeps a manual trigger from starting a second copy while it runs
+        started_again = await workers[0].claim_and_run("sync", "manual")
+        await settle(workers)
+        history = await workers[0].runs("sync")
+        registry = await database.scheduled_jobs.find_one({"_id": "sync"})
+        return started_again, history, registry
+
+    started_again, history, registry = asyncio.run(scenario())
+    assert len(runs) == 1
+    assert started_again is False
+    assert [(run["trigger"], run["status"], run["result"]) for run in history] == [("schedule", "success", {"synced": 3})]
+    assert registry["last_status"] == "success"
+    assert "lease_owner" not in registry
+    assert registry["next_run_at"].replace(tzinfo=timezone.utc) > datetime.now(timezone.utc) + timedelta(minutes=59)
+
+
+def test_failures_and_timeouts_are_recorded(database):
+    async def broken():
+        raise RuntimeError("Take.app unreachable")
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def scenario():
+        [worker] = make_workers(database, Job("broken", broken, "every 1h"), Job("slow", slow, "every 1h", timeout_seconds=0.05), count=1)
+        await worker.start()
+        assert await worker.claim_and_run("broken", "manual")
+        assert await worker.claim_and_run("slow", "manual")
+        await settle([worker])
+        # Leases were released, so both can run again right away
+        assert await worker.claim_and_run("broken", "manual")
+        await settle([worker])
+        return {job["name"]: job for job in await worker.list_jobs()}, await worker.runs("slow")
+
+    jobs, slow_runs = asyncio.run(scenario())
+    assert (jobs["broken"]["runs"], jobs["broken"]["failures"], jobs["broken"]["last_error"]) == (2, 2, "Take.app unreachable")
+    assert (jobs["slow"]["last_status"], jobs["slow"]["running"]) == ("timeout", False)
+    assert slow_runs[0]["error"] == "Timed out after 0.05s"
+
+
+def test_expired_lease_of_a_dead_worker_is_taken_over(database):
+    async def job():
+        return None
+
+    async def scenario():
+        [worker] = make_workers(database, Job("sync", job, "every 1h"), count=1)
+        await worker.start()
+        await database.scheduled_jobs.update_one({"_id": "sync"}, {"$set": {
+            "lease_owner": "dead", "lease_until": datetime.now(timezone.utc) + timedelta(minutes=5)
+        }})
+        blocked = await worker.claim_and_run("sync", "manual")
+        await database.scheduled_jobs.update_one({"_id": "sync"}, {"$set": {
+            "lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)
+        }})
+        taken_over = await worker.claim_and_run("sync", "manual")
+        await settle([worker])
+        return blocked, taken_over
+
+    assert asyncio.run(scenario()) == (False, True)
+
+
+def test_admin_schedule_change_is_validated_and_moves_the_next_run(database):
+    async def job():
+        return None
+
+    async def scenario():
+        [worker] = make_workers(database, Job("sync", job, "every 1h"), count=1)
+        await worker.start()
+        with pytest.raises(ValueError):
+            await worker.update_job("sync", schedule="every never")
+        return await worker.update_job("sync", enabled=False, schedule="every 5m")
+
+    doc = asyncio.run(scenario())
+    assert (doc["enabled"], doc["schedule"], doc["default_schedule"]) == (False, "every 5m", "every 1h")
+    assert doc["next_run_at"].replace(tzinfo=timezone.utc) < datetime.now(timezone.utc) + timedelta(minutes=6)
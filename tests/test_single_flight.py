@@ -0,0 +1,114 @@
+"""Request coalescing: concurrent identical reads share one database query."""
+import asyncio
+
+import pytest
+
+from gameshop.cache import SingleFlight
+
+
+class CountingLoader:
+    """Stands in for a database read; holds every caller until released"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return [{"id": "p1"}]
+
+
+def test_concurrent_requests_run_one_query():
+    async def scenario():
+        flight = SingleFlight()
+        loader = CountingLoader()
+        requests = [asyncio.create_task(flight.do("/products", loader)) for _ in range(1000)]
+        await asyncio.sleep(0)
+        loader.release.set()
+        results = await asyncio.gather(*requests)
+        assert loader.calls == 1
+        assert all(result == [{"id": "p1"}] for result in results)
+        assert flight.metrics["/products"] == {"calls": 1000, "executions": 1, "shared": 999}
+        assert not flight._inflight
+
+    asyncio.run(scenario())
+
+
+def test_different_keys_do_not_share():
+    async def scenario():
+        flight = SingleFlight()
+        loader = CountingLoader()
+        loader.release.set()
+        await asyncio.gather(flight.do("/products?category_id=a", loader), flight.do("/products?category_id=b", loader))
+        assert loader.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_later_requests_query_again():
+    async def scenario():
+        flight = SingleFlight()
+        loader = CountingLoader()
+        loader.release.set()
+        await flight.do("/reviews", loader)
+        await flight.do("/reviews", loader)
+        assert loader.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_failure_reaches_every_waiter():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise RuntimeError("database down")
+
+        requests = [asyncio.create_task(flight.do("/faqs", failing)) for _ in range(10)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*requests, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert not flight._inflight
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_the_query():
+    async def scenario():
+        flight = SingleFlight()
+        loader = CountingLoader()
+        first = asyncio.create_task(flight.do("/blog", loader))
+        second = asyncio.create_task(flight.do("/blog", loader))
+        await asyncio.sleep(0)
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        loader.release.set()
+        assert await first == [{"id": "p1"}]
+        assert loader.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_leader_does_not_fail_followers():
+    async def scenario():
+        flight = SingleFlight()
+        loader = CountingLoader()
+        leader = asyncio.create_task(flight.do("/products", loader))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.do("/products", loader)) for _ in range(10)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        loader.release.set()
+        results = await asyncio.gather(*followers)
+        assert all(result == [{"id": "p1"}] for result in results)
+        assert loader.calls == 1
+        assert not flight._inflight
+
+    asyncio.run(scenario())
@@ -0,0 +1,97 @@
+"""Concurrent identical GET requests against the catalog routes issue one database query per key."""
+import asyncio
+import json
+from collections import Counter
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from gameshop import cache, indexes  # noqa: E402
+from gameshop.routers import catalog  # noqa: E402
+
+CONCURRENT_REQUESTS = 1000
+
+
+class CountingCollection:
+    """Counts find/find_one calls and holds each one briefly, like a network round trip"""
+
+    def __init__(self, collection, queries):
+        self._collection = collection
+        self._queries = queries
+
+    async def find_one(self, *args, **kwargs):
+        self._queries[(self._collection.name, "find_one")] += 1
+        await asyncio.sleep(0.01)
+        return await self._collection.find_one(*args, **kwargs)
+
+    def find(self, *args, **kwargs):
+        self._queries[(self._collection.name, "find")] += 1
+        return self._collection.find(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+class CountingDatabase:
+    def __init__(self, database):
+        self._database = database
+        self.queries = Counter()
+
+    def __getattr__(self, name):
+        return CountingCollection(self._database[name], self.queries)
+
+
+def product(product_id, category_id):
+    return {
+        "id": product_id, "name": f"Product {product_id}", "slug": f"product-{product_id}",
+        "description": "", "image_url": "", "category_id": category_id,
+        "variations": [{"id": f"{product_id}-v", "name": "Default", "price": 100}],
+    }
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient()["single_flight_routes_test"]
+    counting = CountingDatabase(database)
+    monkeypatch.setattr(catalog, "read_db", counting)
+    monkeypatch.setattr(indexes, "db", counting)
+    monkeypatch.setattr(cache, "db", counting)
+    monkeypatch.setattr(indexes, "product_indexes_loaded", False)
+    monkeypatch.setattr(cache, "single_flight", cache.SingleFlight())
+    monkeypatch.setattr(catalog, "single_flight", cache.single_flight)
+
+    async def seed():
+        await database.products.insert_many([product("p1", "c1"), product("p2", "c2")])
+        await database.categories.insert_many([{"id": "c1", "name": "One", "slug": "one"}, {"id": "c2", "name": "Two", "slug": "two"}])
+
+    asyncio.run(seed())
+    return counting
+
+
+def test_concurrent_product_reads_run_one_query_per_key(database):
+    async def scenario():
+        requests = [catalog.get_product("product-p1") for _ in range(CONCURRENT_REQUESTS)]
+        requests += [catalog.get_product("product-p2") for _ in range(CONCURRENT_REQUESTS)]
+        return await asyncio.gather(*requests)
+
+    responses = asyncio.run(scenario())
+
+    assert database.queries == Counter({("products", "find_one"): 2})
+    bodies = {json.loads(response.body)["id"] for response in responses}
+    assert bodies == {"p1", "p2"}
+
+
+def test_concurrent_listing_reads_load_the_catalog_once(database):
+    async def scenario():
+        requests = [catalog.get_products() for _ in range(CONCURRENT_REQUESTS)]
+        requests += [catalog.get_products(category_id="c1") for _ in range(CONCURRENT_REQUESTS)]
+        requests += [catalog.get_categories() for _ in range(CONCURRENT_REQUESTS)]
+        return await asyncio.gather(*requests)
+
+    responses = asyncio.run(scenario())
+
+    assert database.queries == Counter({("products", "find"): 1, ("categories", "find"): 1})
+    assert [p["id"] for p in json.loads(responses[0].body)] == ["p1", "p2"]
+    assert [p["id"] for p in json.loads(responses[CONCURRENT_REQUESTS].body)] == ["p1"]
+    assert sorted(c["id"] for c in responses[-1]) == ["c1", "c2"]
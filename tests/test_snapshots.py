@@ -0,0 +1,102 @@
+"""Snapshot refreshes render only the changed products and never inline unsanitized HTML."""
+import asyncio
+import json
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from gameshop.snapshots import SnapshotBuilder, SnapshotWorker  # noqa: E402
+
+
+def product(product_id, slug, description="<p>Top-up</p>"):
+    return {"id": product_id, "name": f"Product {product_id}", "slug": slug, "description": description,
+            "image_url": "", "category_id": "c1", "is_active": True, "sort_order": 0,
+            "variations": [{"id": f"{product_id}-v", "name": "Default", "price": 100}]}
+
+
+@pytest.fixture
+def builder(tmp_path):
+    database = mongomock_motor.AsyncMongoMockClient()["snapshots_test"]
+
+    async def seed():
+        await database.categories.insert_one({"id": "c1", "name": "Games", "slug": "games"})
+        await database.products.insert_many([product("p1", "pubg"), product("p2", "free-fire")])
+
+    asyncio.run(seed())
+    return SnapshotBuilder(database, tmp_path)
+
+
+def test_product_change_renders_only_that_product(builder, tmp_path, monkeypatch):
+    async def scenario():
+        await builder.refresh()
+        await builder.db.products.update_one({"id": "p1"}, {"$set": {"slug": "pubg-uc", "name": "PUBG UC"}})
+        rendered = []
+        render_product = builder.render_product
+
+        def spy(item, category):
+            rendered.append(item["id"])
+            return render_product(item, category)
+
+        monkeypatch.setattr(builder, "render_product", spy)
+        result = await builder.refresh(["products"], product_ids=["p1"])
+        return rendered, result
+
+    rendered, result = asyncio.run(scenario())
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+
+    assert rendered == ["p1"]
+    assert (result["written"], result["removed"]) == (2, 1)
+    assert "/product/pubg-uc" in manifest and "/product/pubg" not in manifest
+    assert "/product/free-fire" in manifest
+    assert not (tmp_path / "product" / "pubg").exists()
+    assert "/product/pubg-uc" in (tmp_path / "sitemap.xml").read_text()
+
+
+def test_worker_passes_marked_product_ids(builder):
+    calls = []
+
+    async def refresh(collections=None, product_ids=None):
+        calls.append((collections, product_ids))
+
+    builder.refresh = refresh
+    worker = SnapshotWorker(builder, scheduler=None)
+    worker.mark("products", ["p1"])
+    worker.mark("products", ["p2"])
+    asyncio.run(worker.flush())
+    worker.mark("products", ["p1"])
+    worker.mark("products")
+    asyncio.run(worker.flush())
+
+    assert calls == [({"products"}, {"p1", "p2"}), ({"products"}, None)]
+
+
+def test_stored_html_is_sanitized(builder, tmp_path):
+    async def scenario():
+        await builder.db.products.update_one(
+            {"id": "p1"}, {"$set": {"description": '<p onclick="x()">Hi</p><script>alert(1)</script>'}}
+        )
+        await builder.db.pages.insert_one({"page_key": "about", "title": "About", "content": "<img src=javascript:x>"})
+        await builder.refresh()
+
+    asyncio.run(scenario())
+    # The page data travels as JSON in a script element; only the rendered markup is checked
+    product_html = (tmp_path / "product" / "pubg" / "index.html").read_text().split("__SNAPSHOT__")[0]
+    about_html = (tmp_path / "about" / "index.html").read_text().split("__SNAPSHOT__")[0]
+
+    assert "<p>Hi</p>" in product_html
+    assert "alert(1)" not in product_html and "onclick" not in product_html
+    assert "javascript:" not in about_html
+
+
+@pytest.mark.parametrize("slug", ["../../etc", "a/b", ".."])
+def test_unsafe_slugs_are_not_written(builder, tmp_path, slug):
+    async def scenario():
+        await builder.db.products.insert_one(product("p3", slug))
+        return await builder.refresh()
+
+    asyncio.run(scenario())
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+
+    assert sorted(p for p in manifest if p.startswith("/product/")) == ["/product/free-fire", "/product/pubg"]
+    assert not (tmp_path.parent / "etc").exists()
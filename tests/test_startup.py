@@ -0,0 +1,37 @@
+"""Readiness stays 503 while a warmup step has failed, and recovers once a retry succeeds."""
+import asyncio
+
+from fastapi import Response
+
+from gameshop import main
+
+
+def test_failed_step_keeps_ready_endpoint_unavailable_until_retried(monkeypatch):
+    monkeypatch.setattr(main, "STARTUP_STEP_RETRY_SECONDS", 0)
+    state = main.StartupState()
+    monkeypatch.setattr(main, "startup_state", state)
+    attempts = []
+
+    async def create_indexes():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("index build failed")
+
+    async def scenario():
+        await state.step("indexes", create_indexes)
+        state.ready = True
+        response = Response()
+        body = await main.health_ready(response)
+        assert response.status_code == 503
+        assert body["status"] == "failed"
+        assert body["failed_steps"] == {"indexes": "index build failed"}
+
+        await state.retry_failed()
+        response = Response()
+        body = await main.health_ready(response)
+        assert response.status_code != 503
+        assert body["status"] == "ready"
+        assert body["failed_steps"] == {}
+
+    asyncio.run(scenario())
+    assert len(attempts) == 2
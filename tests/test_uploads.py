@@ -0,0 +1,81 @@
+"""Streaming multipart uploads stop reading at the size cap."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from gameshop.uploads import receive_multipart_file
+
+BOUNDARY = "test-boundary"
+
+
+def multipart_body(content: bytes, content_type="image/png") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="note"\r\n\r\n'
+        "hello\r\n"
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="shot.png"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def make_request(body: bytes, chunk_size=1024, content_length=None):
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    sent = []
+
+    async def receive():
+        chunk = chunks[len(sent)]
+        sent.append(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": len(sent) < len(chunks)}
+
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers}, receive), sent
+
+
+def test_file_part_is_written_to_disk(tmp_path):
+    content = bytes(range(256)) * 40
+    request, _ = make_request(multipart_body(content))
+    target = tmp_path / "upload"
+
+    content_type = asyncio.run(receive_multipart_file(request, "file", target, max_bytes=1024 * 1024))
+
+    assert content_type == "image/png"
+    assert target.read_bytes() == content
+
+
+def test_stops_reading_once_over_the_cap(tmp_path):
+    body = multipart_body(b"x" * 200_000)
+    request, sent = make_request(body, content_length=None)
+    target = tmp_path / "upload"
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(receive_multipart_file(request, "file", target, max_bytes=50_000))
+
+    assert raised.value.status_code == 413
+    assert sum(len(chunk) for chunk in sent) < len(body)
+    assert not target.exists()
+
+
+def test_content_length_over_the_cap_is_rejected_before_reading(tmp_path):
+    body = multipart_body(b"x" * 200_000)
+    request, sent = make_request(body, content_length=len(body))
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(receive_multipart_file(request, "file", tmp_path / "upload", max_bytes=50_000))
+
+    assert raised.value.status_code == 413
+    assert sent == []
+
+
+def test_missing_file_field(tmp_path):
+    request, _ = make_request(multipart_body(b"data").replace(b'name="file"', b'name="other"'))
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(receive_multipart_file(request, "file", tmp_path / "upload", max_bytes=1024))
+
+    assert raised.value.status_code == 400
+    assert not (tmp_path / "upload").exists()